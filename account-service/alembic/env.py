@@ -5,7 +5,7 @@ from sqlalchemy import pool
 from sqlalchemy.engine import Connection
 
 from app.db.session import Base
-from app.models import WalletRegistry, Account, PaymentReference  # noqa: F401
+from app.models import WalletRegistry, Account, PaymentReference, PaymentTransId, OutboxEvent, CallbackInbox  # noqa: F401
 from app.config import get_settings
 
 config = context.config
@@ -0,0 +1,25 @@
+"""Replace ix_accounts_wallet_id with a unique (wallet_id, sequence_no) index for keyset pagination.
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-16
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision = "002"
+down_revision: Union[str, None] = "001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_accounts_wallet_id_sequence_no", "accounts", ["wallet_id", "sequence_no"], unique=True)
+    op.drop_index("ix_accounts_wallet_id", table_name="accounts")
+
+
+def downgrade() -> None:
+    op.create_index("ix_accounts_wallet_id", "accounts", ["wallet_id"], unique=False)
+    op.drop_index("ix_accounts_wallet_id_sequence_no", table_name="accounts")
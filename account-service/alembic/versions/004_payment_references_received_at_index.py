@@ -0,0 +1,23 @@
+"""Index payment_references.received_at for warming the TransID cache with recent payments.
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-16
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision = "004"
+down_revision: Union[str, None] = "003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_payment_references_received_at", "payment_references", ["received_at"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_payment_references_received_at", table_name="payment_references")
@@ -0,0 +1,114 @@
+"""Partition payment_references by month on received_at; TransID idempotency moves to payment_trans_ids.
+
+A unique key on a partitioned table has to include the partition key, so (trans_id) alone can no longer be
+the primary key. payment_trans_ids holds one row per TransID (pruned to PAYMENT_DEDUP_WINDOW_DAYS by the
+service) and callbacks claim it with INSERT ... ON CONFLICT DO NOTHING before writing payment_references.
+
+Existing rows are copied into monthly partitions (from the oldest payment's month to three months ahead;
+the service creates later ones) and every existing TransID is claimed, so nothing already recorded can be
+recorded again. The copy runs in the migration's transaction and holds payment_references for its duration.
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-16
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "006"
+down_revision: Union[str, None] = "005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MONTHS_AHEAD = 3
+
+
+def _rename_indexes(table: str, suffix: str) -> None:
+    op.execute(f"ALTER TABLE {table} RENAME CONSTRAINT payment_references_pkey TO payment_references{suffix}_pkey")
+    op.execute(f"ALTER INDEX ix_payment_references_account_no RENAME TO ix_payment_references{suffix}_account_no")
+    op.execute(f"ALTER INDEX ix_payment_references_received_at RENAME TO ix_payment_references{suffix}_received_at")
+
+
+def upgrade() -> None:
+    op.rename_table("payment_references", "payment_references_unpartitioned")
+    _rename_indexes("payment_references_unpartitioned", "_unpartitioned")
+
+    op.create_table(
+        "payment_references",
+        sa.Column("trans_id", sa.String(64), nullable=False),
+        sa.Column("account_no", sa.String(32), nullable=False),
+        sa.Column("amount", sa.Numeric(18, 2), nullable=False),
+        sa.Column("received_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.PrimaryKeyConstraint("trans_id", "received_at"),
+        postgresql_partition_by="RANGE (received_at)",
+    )
+    op.create_index("ix_payment_references_account_no", "payment_references", ["account_no"], unique=False)
+    op.create_index("ix_payment_references_received_at", "payment_references", ["received_at"], unique=False)
+    # Monthly partitions payment_references_YYYY_MM, bounds in UTC, as app/services/payment_partitions.py names them
+    op.execute(
+        f"""
+        DO $$
+        DECLARE
+            m date := date_trunc('month', coalesce(
+                (SELECT min(received_at) FROM payment_references_unpartitioned), now()) AT TIME ZONE 'UTC');
+            last_month date := date_trunc('month', now() AT TIME ZONE 'UTC') + interval '{MONTHS_AHEAD} months';
+        BEGIN
+            WHILE m <= last_month LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF payment_references FOR VALUES FROM (%L) TO (%L)',
+                    'payment_references_' || to_char(m, 'YYYY_MM'),
+                    m::text || ' 00:00:00+00',
+                    (m + interval '1 month')::date::text || ' 00:00:00+00'
+                );
+                m := m + interval '1 month';
+            END LOOP;
+        END $$
+        """
+    )
+
+    op.create_table(
+        "payment_trans_ids",
+        sa.Column("trans_id", sa.String(64), nullable=False),
+        sa.Column("received_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.PrimaryKeyConstraint("trans_id"),
+    )
+    op.create_index("ix_payment_trans_ids_received_at", "payment_trans_ids", ["received_at"], unique=False)
+
+    op.execute(
+        "INSERT INTO payment_references (trans_id, account_no, amount, received_at) "
+        "SELECT trans_id, account_no, amount, received_at FROM payment_references_unpartitioned"
+    )
+    op.execute(
+        "INSERT INTO payment_trans_ids (trans_id, received_at) "
+        "SELECT trans_id, received_at FROM payment_references_unpartitioned"
+    )
+    op.drop_table("payment_references_unpartitioned")
+
+
+def downgrade() -> None:
+    op.rename_table("payment_references", "payment_references_partitioned")
+    _rename_indexes("payment_references_partitioned", "_partitioned")
+
+    op.create_table(
+        "payment_references",
+        sa.Column("trans_id", sa.String(64), nullable=False),
+        sa.Column("account_no", sa.String(32), nullable=False),
+        sa.Column("amount", sa.Numeric(18, 2), nullable=False),
+        sa.Column("received_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.PrimaryKeyConstraint("trans_id"),
+    )
+    op.create_index("ix_payment_references_account_no", "payment_references", ["account_no"], unique=False)
+    op.create_index("ix_payment_references_received_at", "payment_references", ["received_at"], unique=False)
+    # Attached partitions only; detached ones are left as they are. A TransID recorded again after its dedup
+    # window expired keeps its first payment.
+    op.execute(
+        "INSERT INTO payment_references (trans_id, account_no, amount, received_at) "
+        "SELECT DISTINCT ON (trans_id) trans_id, account_no, amount, received_at FROM payment_references_partitioned "
+        "ORDER BY trans_id, received_at"
+    )
+    op.drop_table("payment_references_partitioned")
+    op.drop_index("ix_payment_trans_ids_received_at", table_name="payment_trans_ids")
+    op.drop_table("payment_trans_ids")
@@ -0,0 +1,37 @@
+"""Add a DEFAULT partition to payment_references, so an insert for a month without a partition still lands.
+
+Rows only reach it when partition maintenance has fallen behind; the service moves them into their monthly
+partition once that month is created and logs an error while any are there.
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-16
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision = "007"
+down_revision: Union[str, None] = "006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE TABLE payment_references_default PARTITION OF payment_references DEFAULT")
+
+
+def downgrade() -> None:
+    # Refuse rather than drop payments: create their monthly partitions first (the service does it on its next run)
+    op.execute(
+        """
+        DO $$
+        BEGIN
+            IF EXISTS (SELECT 1 FROM payment_references_default) THEN
+                RAISE EXCEPTION 'payment_references_default holds payments; move them to monthly partitions first';
+            END IF;
+        END $$
+        """
+    )
+    op.execute("DROP TABLE payment_references_default")
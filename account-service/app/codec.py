@@ -0,0 +1,28 @@
+"""
+JSON codec (orjson) for everything this service encodes or decodes outside pydantic: event bodies,
+consumed messages and raw request bodies. HTTP responses use FastAPI's ORJSONResponse, the same library.
+Swap the implementation here to change codecs.
+"""
+
+from decimal import Decimal
+from typing import Any
+
+import orjson
+
+# Raised by loads; a ValueError subclass, like json.JSONDecodeError
+JSONDecodeError = orjson.JSONDecodeError
+
+
+def _default(o: Any) -> Any:
+    if isinstance(o, Decimal):
+        return str(o)
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any) -> bytes:
+    """UUIDs, datetimes (ISO 8601) and dataclasses are encoded natively; Decimals as strings."""
+    return orjson.dumps(obj, default=_default)
+
+
+def loads(data: bytes | bytearray | memoryview | str) -> Any:
+    return orjson.loads(data)
@@ -1,6 +1,7 @@
 """Application configuration."""
 
 from functools import lru_cache
+from typing import Literal
 
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -23,11 +24,71 @@ class Settings(BaseSettings):
         alias="RABBITMQ_URL",
     )
     rabbitmq_exchange: str = Field(default="wallet.events", alias="RABBITMQ_EXCHANGE")
+    # Publisher: one connection per process fed through a bounded queue; each publish waits for the broker's confirm
+    rabbitmq_publish_queue_size: int = Field(default=10_000, ge=1, alias="RABBITMQ_PUBLISH_QUEUE_SIZE")
+    rabbitmq_publish_max_in_flight: int = Field(default=1000, ge=1, alias="RABBITMQ_PUBLISH_MAX_IN_FLIGHT")
+    rabbitmq_publish_timeout_seconds: float = Field(default=5.0, gt=0.0, alias="RABBITMQ_PUBLISH_TIMEOUT_SECONDS")
+    rabbitmq_reconnect_max_seconds: float = Field(default=30.0, gt=0.0, alias="RABBITMQ_RECONNECT_MAX_SECONDS")
+
+    # wallet.created consumer: unacknowledged deliveries in flight, and how they are batched into registry inserts
+    wallet_consumer_prefetch: int = Field(default=200, ge=1, le=65535, alias="WALLET_CONSUMER_PREFETCH")
+    wallet_consumer_batch_size: int = Field(default=100, ge=1, alias="WALLET_CONSUMER_BATCH_SIZE")
+    wallet_consumer_batch_wait_seconds: float = Field(default=0.05, ge=0.0, alias="WALLET_CONSUMER_BATCH_WAIT_SECONDS")
+    # Failed messages wait in delay queues (exponential backoff) and are dead-lettered after max_attempts failures
+    wallet_consumer_max_attempts: int = Field(default=5, ge=1, le=20, alias="WALLET_CONSUMER_MAX_ATTEMPTS")
+    wallet_consumer_retry_delay_seconds: float = Field(default=2.0, ge=0.001, alias="WALLET_CONSUMER_RETRY_DELAY_SECONDS")
+    wallet_consumer_retry_max_delay_seconds: float = Field(
+        default=300.0, ge=0.001, alias="WALLET_CONSUMER_RETRY_MAX_DELAY_SECONDS"
+    )
+
+    # Outbox relay: events are written to the outbox table with the request's rows and published from there
+    outbox_relay_enabled: bool = Field(default=True, alias="OUTBOX_RELAY_ENABLED")
+    outbox_batch_size: int = Field(default=200, ge=1, le=10_000, alias="OUTBOX_BATCH_SIZE")
+    # Fallback poll for rows committed by other replicas (this process's own commits wake the relay at once)
+    outbox_poll_interval_seconds: float = Field(default=1.0, gt=0.0, alias="OUTBOX_POLL_INTERVAL_SECONDS")
+
+    # account_no -> (account_id, is_active) for callback validation; invalidated by account events across replicas
+    account_cache_enabled: bool = Field(default=True, alias="ACCOUNT_CACHE_ENABLED")
+    account_cache_max_size: int = Field(default=100_000, ge=1, alias="ACCOUNT_CACHE_MAX_SIZE")
+    account_cache_ttl_seconds: float = Field(default=60.0, gt=0.0, alias="ACCOUNT_CACHE_TTL_SECONDS")
+
+    # Recently processed M-PESA TransIDs, so retried callbacks are answered without a transaction
+    trans_id_cache_enabled: bool = Field(default=True, alias="TRANS_ID_CACHE_ENABLED")
+    trans_id_cache_max_size: int = Field(default=200_000, ge=1, alias="TRANS_ID_CACHE_MAX_SIZE")
+    trans_id_cache_warm_hours: float = Field(default=24.0, ge=0.0, alias="TRANS_ID_CACHE_WARM_HOURS")
+
+    # inline: the callback is recorded before M-PESA gets its answer; staged: it is committed to callback_inbox,
+    # answered at once and recorded by a pool of background workers
+    callback_ingest_mode: Literal["inline", "staged"] = Field(default="inline", alias="CALLBACK_INGEST_MODE")
+    callback_inbox_workers: int = Field(default=4, ge=1, le=64, alias="CALLBACK_INBOX_WORKERS")
+    callback_inbox_batch_size: int = Field(default=100, ge=1, le=10_000, alias="CALLBACK_INBOX_BATCH_SIZE")
+    callback_inbox_poll_interval_seconds: float = Field(default=1.0, gt=0.0, alias="CALLBACK_INBOX_POLL_INTERVAL_SECONDS")
+    callback_inbox_max_attempts: int = Field(default=10, ge=1, alias="CALLBACK_INBOX_MAX_ATTEMPTS")
+    # Backpressure: at this many staged callbacks new ones get a 503 so M-PESA retries later
+    callback_inbox_max_backlog: int = Field(default=50_000, ge=1, alias="CALLBACK_INBOX_MAX_BACKLOG")
+
+    # payment_references is partitioned by month on received_at: partitions are created this many months ahead, and
+    # those older than the retention are detached (left as standalone tables to archive) or dropped
+    payment_partition_maintenance_enabled: bool = Field(default=True, alias="PAYMENT_PARTITION_MAINTENANCE_ENABLED")
+    payment_partition_maintenance_interval_seconds: float = Field(
+        default=3600.0, gt=0.0, alias="PAYMENT_PARTITION_MAINTENANCE_INTERVAL_SECONDS"
+    )
+    payment_partitions_ahead_months: int = Field(default=3, ge=1, le=24, alias="PAYMENT_PARTITIONS_AHEAD_MONTHS")
+    payment_retention_months: int = Field(default=13, ge=1, alias="PAYMENT_RETENTION_MONTHS")
+    payment_partition_archive: Literal["detach", "drop"] = Field(default="detach", alias="PAYMENT_PARTITION_ARCHIVE")
+    # A TransID is recorded at most once within this window (payment_trans_ids is pruned beyond it)
+    payment_dedup_window_days: int = Field(default=90, ge=1, alias="PAYMENT_DEDUP_WINDOW_DAYS")
 
     account_no_padding: int = Field(default=6, ge=1, le=12, alias="ACCOUNT_NO_PADDING")
+    # gapless: lock the wallet row per account (serialized); reclaim/allow: hi/lo blocks per process,
+    # reclaim hands unused numbers back on clean shutdown, allow leaves the gap. Deployments opt in to either
+    account_no_gap_policy: Literal["gapless", "reclaim", "allow"] = Field(default="gapless", alias="ACCOUNT_NO_GAP_POLICY")
+    account_no_block_size: int = Field(default=20, ge=1, le=10_000, alias="ACCOUNT_NO_BLOCK_SIZE")
 
     internal_api_key: str = Field(..., min_length=1, alias="INTERNAL_API_KEY")
 
+    metrics_enabled: bool = Field(default=True, alias="METRICS_ENABLED")
+
 
 @lru_cache
 def get_settings() -> Settings:
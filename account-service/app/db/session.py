@@ -9,7 +9,9 @@ from sqlalchemy.ext.asyncio import (
 )
 from sqlalchemy.orm import DeclarativeBase
 
+from app.codec import dumps, loads
 from app.config import get_settings
+from app.metrics import register_pool_metrics
 
 
 def _get_async_url() -> str:
@@ -30,8 +32,13 @@ _engine = create_async_engine(
     pool_pre_ping=True,
     pool_size=5,
     max_overflow=10,
+    # JSONB columns (outbox payloads, staged callbacks)
+    json_serializer=lambda obj: dumps(obj).decode(),
+    json_deserializer=loads,
 )
 
+register_pool_metrics(_engine.sync_engine.pool)
+
 async_session_factory = async_sessionmaker(
     _engine,
     class_=AsyncSession,
@@ -1,4 +1,21 @@
-from app.events.publisher import EventPublisher, get_event_publisher
+from app.events.publisher import EventPublisher, PublishError, get_event_publisher
+from app.events.cache_invalidation import start_cache_invalidator, stop_cache_invalidator
 from app.events.consumer import start_wallet_consumer, stop_wallet_consumer
+from app.events.dead_letters import peek_dead_letters, replay_dead_letters
+from app.events.outbox import OutboxRelay, enqueue_event, enqueue_events, get_outbox_relay
 
-__all__ = ["EventPublisher", "get_event_publisher", "start_wallet_consumer", "stop_wallet_consumer"]
+__all__ = [
+    "EventPublisher",
+    "OutboxRelay",
+    "PublishError",
+    "enqueue_event",
+    "enqueue_events",
+    "get_event_publisher",
+    "get_outbox_relay",
+    "peek_dead_letters",
+    "replay_dead_letters",
+    "start_cache_invalidator",
+    "start_wallet_consumer",
+    "stop_cache_invalidator",
+    "stop_wallet_consumer",
+]
@@ -0,0 +1,110 @@
+"""
+Base for RabbitMQ consumers that run on the application's event loop (pika AsyncioConnection).
+
+AsyncioConsumer owns the connection and reopens it RECONNECT_SECONDS after it drops. Subclasses declare
+their topology and start consuming in _setup, returning the background tasks that serve the channel.
+"""
+
+import abc
+import asyncio
+import logging
+
+import pika
+from pika.adapters.asyncio_connection import AsyncioConnection
+from pika.channel import Channel
+
+logger = logging.getLogger(__name__)
+
+RECONNECT_SECONDS = 5.0
+
+
+class AsyncioConsumer(abc.ABC):
+    def __init__(self, rabbitmq_url: str):
+        self._params = pika.URLParameters(rabbitmq_url)
+        self._params.heartbeat = 600
+        self._connection: AsyncioConnection | None = None
+        self._waiters: set[asyncio.Future] = set()
+        self._task: asyncio.Task | None = None
+        self._stopping = False
+
+    def start(self) -> None:
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        if self._task is None:
+            return
+        self._stopping = True
+        if self._connection is not None and self._connection.is_open:
+            # Unacknowledged deliveries (and an uncommitted transaction) go back to the queue
+            self._connection.close()
+        try:
+            await asyncio.wait_for(self._task, timeout)
+        except (TimeoutError, asyncio.CancelledError):
+            pass
+        self._task = None
+
+    @abc.abstractmethod
+    async def _setup(self, channel: Channel) -> list[asyncio.Task]:
+        """Declare, start consuming and return the tasks serving the channel; they should only end by raising."""
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await self._consume()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if self._stopping:
+                    break
+                logger.warning("%s error, reconnecting: %r", type(self).__name__, e)
+            if not self._stopping:
+                await asyncio.sleep(RECONNECT_SECONDS)
+
+    def _pending(self) -> asyncio.Future:
+        """A future that fails if the connection closes before it is resolved."""
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.add(future)
+        future.add_done_callback(self._waiters.discard)
+        # Mark the exception retrieved: futures nobody awaits any more must not log on close
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        return future
+
+    def _rpc(self, method, *args, **kwargs) -> asyncio.Future:
+        future = self._pending()
+        method(*args, callback=lambda frame: future.done() or future.set_result(frame), **kwargs)
+        return future
+
+    def _on_closed(self, _connection, reason: Exception) -> None:
+        error = ConnectionError(f"RabbitMQ connection closed: {reason}")
+        for future in list(self._waiters):
+            if not future.done():
+                future.set_exception(error)
+
+    async def _consume(self) -> None:
+        opened = self._pending()
+        closed = self._pending()
+        self._connection = connection = AsyncioConnection(
+            self._params,
+            on_open_callback=lambda c: opened.done() or opened.set_result(c),
+            on_open_error_callback=lambda c, e: opened.done() or opened.set_exception(ConnectionError(e)),
+            on_close_callback=self._on_closed,
+            custom_ioloop=asyncio.get_running_loop(),
+        )
+        tasks: list[asyncio.Task] = []
+        try:
+            await opened
+            channel_opened = self._pending()
+            connection.channel(on_open_callback=lambda ch: channel_opened.done() or channel_opened.set_result(ch))
+            channel: Channel = await channel_opened
+            channel.add_on_close_callback(lambda _ch, _reason: connection.is_open and connection.close())
+            tasks = await self._setup(channel)
+            # Nothing here returns normally: closed fails when the connection closes, the tasks only end by raising
+            await asyncio.gather(closed, *tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            if connection.is_open:
+                connection.close()
+            self._connection = None
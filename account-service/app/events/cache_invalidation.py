@@ -0,0 +1,70 @@
+"""
+Keeps every replica's active-account cache in step: each process binds its own exclusive, auto-delete
+queue to account.created and account.deleted and drops the account_no they name. Deliveries are
+auto-acked (an invalidation is idempotent and the cache TTL bounds a lost one); the cache is cleared
+whenever the subscription is (re)established, since events may have been missed while disconnected.
+"""
+
+import asyncio
+import logging
+
+from pika.channel import Channel
+
+from app.codec import loads
+from app.config import get_settings
+from app.events.amqp import AsyncioConsumer
+from app.services.account_cache import ActiveAccountCache, get_account_cache
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_KEYS = ("account.created", "account.deleted")
+
+
+class AccountCacheInvalidator(AsyncioConsumer):
+    def __init__(self, cache: ActiveAccountCache, *, rabbitmq_url: str, exchange: str):
+        super().__init__(rabbitmq_url)
+        self._cache = cache
+        self._exchange = exchange
+
+    def _on_message(self, _channel, _method, _properties, body: bytes) -> None:
+        try:
+            msg = loads(body)
+            account_no = (msg.get("payload") or msg).get("account_no")
+        except (ValueError, AttributeError):
+            logger.warning("Account event without a usable account_no: %r", body[:200])
+            return
+        if account_no:
+            self._cache.invalidate(str(account_no))
+
+    async def _setup(self, channel: Channel) -> list[asyncio.Task]:
+        await self._rpc(channel.exchange_declare, exchange=self._exchange, exchange_type="topic", durable=True)
+        frame = await self._rpc(channel.queue_declare, queue="", exclusive=True, auto_delete=True)
+        queue = frame.method.queue
+        for key in INVALIDATION_KEYS:
+            await self._rpc(channel.queue_bind, queue=queue, exchange=self._exchange, routing_key=key)
+        self._cache.clear()
+        channel.basic_consume(queue=queue, on_message_callback=self._on_message, auto_ack=True)
+        logger.info("Account cache invalidation subscribed (%s)", ", ".join(INVALIDATION_KEYS))
+        return []
+
+
+_invalidator: AccountCacheInvalidator | None = None
+
+
+def start_cache_invalidator() -> None:
+    """Subscribe to account events for cache invalidation; does nothing when the cache is disabled."""
+    global _invalidator
+    cache = get_account_cache()
+    if cache is None:
+        return
+    if _invalidator is None:
+        settings = get_settings()
+        _invalidator = AccountCacheInvalidator(
+            cache, rabbitmq_url=settings.rabbitmq_url, exchange=settings.rabbitmq_exchange
+        )
+    _invalidator.start()
+
+
+async def stop_cache_invalidator() -> None:
+    if _invalidator is not None:
+        await _invalidator.stop()
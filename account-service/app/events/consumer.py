@@ -1,97 +1,340 @@
-"""Consumes wallet.created from RabbitMQ and populates WalletRegistry."""
+"""
+Consumes wallet.created from RabbitMQ and populates WalletRegistry.
+
+Runs on the application's event loop (pika AsyncioConnection). Up to WALLET_CONSUMER_PREFETCH messages
+are delivered unacknowledged; they are collected into batches of up to WALLET_CONSUMER_BATCH_SIZE
+(waiting at most WALLET_CONSUMER_BATCH_WAIT_SECONDS for a batch to fill), written with one multi-row
+INSERT ... ON CONFLICT DO NOTHING and acknowledged together (basic_ack multiple=True).
+
+Failed messages are never requeued in place. A message that failed n times is republished to a delay
+queue (TTL min(WALLET_CONSUMER_RETRY_DELAY_SECONDS * 2**(n-1), WALLET_CONSUMER_RETRY_MAX_DELAY_SECONDS))
+that dead-letters it back to the main queue; after WALLET_CONSUMER_MAX_ATTEMPTS failures, or at once if
+it cannot be parsed, it goes to the dead-letter exchange. The channel is transactional, so those
+republishes and the batch's ack are committed together. Only failures of the rows themselves count: while
+the database is unreachable the batch is held unacknowledged and its write retried, without using up attempts.
+"""
 
 import asyncio
-import json
 import logging
-import threading
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any
 from uuid import UUID
 
 import pika
+from pika.channel import Channel
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
+from app.codec import loads
 from app.config import get_settings
 from app.db.session import async_session_factory
+from app.events.amqp import AsyncioConsumer
+from app.metrics import (
+    CONSUMER_BATCH_SIZE,
+    CONSUMER_DEAD_LETTERS,
+    CONSUMER_QUEUE_DEPTH,
+    CONSUMER_RETRIES,
+    observe_event_lag,
+)
 from app.models.wallet_registry import WalletRegistry
 
 logger = logging.getLogger(__name__)
 
-_consumer_thread: threading.Thread | None = None
-_stop_event = threading.Event()
+QUEUE_NAME = "account-service-wallet-created"
+DEAD_LETTER_EXCHANGE = "account-service.dead-letter"
+DEAD_LETTER_QUEUE = f"{QUEUE_NAME}.dead"
+# Headers set on retried and dead-lettered messages
+ATTEMPTS_HEADER = "x-attempts"
+ERROR_HEADER = "x-last-error"
+DEAD_LETTERED_AT_HEADER = "x-dead-lettered-at"
+# How often to sample the queue depth (a passive queue.declare round trip)
+QUEUE_DEPTH_INTERVAL_SECONDS = 15.0
+MAX_ERROR_LENGTH = 500
+
+
+def retry_queue_name(delay_ms: int) -> str:
+    return f"{QUEUE_NAME}.retry.{delay_ms}ms"
+
+
+@dataclass(slots=True)
+class _Delivery:
+    delivery_tag: int
+    body: bytes
+    properties: pika.BasicProperties
+    attempts: int  # failures before this delivery
+    row: dict[str, Any] | None  # None: invalid event, dead-lettered without a write
+    error: str | None = None
+
+
+def _registry_row(body: bytes) -> dict[str, Any]:
+    """Parse a wallet.created message into a WalletRegistry row; raises ValueError if it is unusable."""
+    try:
+        msg = loads(body)
+    except ValueError:
+        raise ValueError("Not valid JSON") from None
+    if not isinstance(msg, dict):
+        raise ValueError("Not a JSON object")
+    observe_event_lag(QUEUE_NAME, msg.get("occurred_at"))
+    payload = msg.get("payload") or msg
+    if not isinstance(payload, dict):
+        raise ValueError("payload is not a JSON object")
+    wallet_id = payload.get("wallet_id")
+    company_id = payload.get("company_id")
+    company_account_number = payload.get("company_account_number") or ""
+    if not wallet_id or not company_id:
+        raise ValueError("Missing wallet_id or company_id")
+    if not isinstance(wallet_id, str) or not isinstance(company_id, str):
+        raise ValueError("Invalid wallet_id or company_id")
+    try:
+        wallet_id, company_id = UUID(wallet_id), UUID(company_id)
+    except ValueError:
+        raise ValueError("Invalid wallet_id or company_id") from None
+    prefix = str(company_account_number or "")[:3].ljust(3, "0") or "000"
+    return {"wallet_id": wallet_id, "company_id": company_id, "company_account_prefix": prefix, "sequence_no": 0}
 
 
-def _on_wallet_created(ch, method, properties, body):
+def _delivery(method, properties: pika.BasicProperties, body: bytes) -> _Delivery:
+    try:
+        attempts = int((properties.headers or {}).get(ATTEMPTS_HEADER, 0))
+    except (TypeError, ValueError):
+        attempts = 0
     try:
-        msg = json.loads(body)
-        payload = msg.get("payload") or msg
-        wallet_id = payload.get("wallet_id")
-        company_id = payload.get("company_id")
-        company_account_number = payload.get("company_account_number") or ""
-        if not wallet_id or not company_id:
-            logger.warning("wallet.created missing wallet_id or company_id: %s", payload)
-            ch.basic_ack(method.delivery_tag)
-            return
-
-        prefix = str(company_account_number or "")[:3].ljust(3, "0") or "000"
-
-        async def insert():
-            async with async_session_factory() as session:
-                from sqlalchemy import select
-                r = await session.execute(
-                    select(WalletRegistry).where(WalletRegistry.wallet_id == UUID(wallet_id))
-                )
-                if r.scalar_one_or_none():
-                    logger.info("Wallet %s already in registry, skip", wallet_id)
-                    return
-                reg = WalletRegistry(
-                    wallet_id=UUID(wallet_id),
-                    company_id=UUID(company_id),
-                    company_account_prefix=prefix,
-                    sequence_no=0,
-                )
-                session.add(reg)
-                await session.commit()
-                logger.info("WalletRegistry updated for wallet_id=%s prefix=%s", wallet_id, prefix)
-
-        asyncio.run(insert())
-        ch.basic_ack(method.delivery_tag)
+        return _Delivery(method.delivery_tag, body, properties, attempts, _registry_row(body))
+    except ValueError as e:
+        return _Delivery(method.delivery_tag, body, properties, attempts, None, str(e))
     except Exception as e:
-        logger.exception("wallet.created handler failed: %s", e)
-        ch.basic_nack(method.delivery_tag, requeue=True)
+        # Whatever else a malformed message trips over, it must reach the batch (and the dead-letter queue):
+        # raising here would leave it to be acked by the next batch's multiple=True ack
+        logger.exception("Could not parse wallet.created message")
+        return _Delivery(method.delivery_tag, body, properties, attempts, None, _describe(e))
+
+
+def _describe(e: Exception) -> str:
+    # DBAPIError's str appends the SQL and a docs link; the driver's first line is what identifies the failure
+    detail = e.orig if isinstance(e, DBAPIError) and e.orig is not None else e
+    first_line = next(iter(str(detail).splitlines()), "")
+    return f"{type(e).__name__}: {first_line}"[:MAX_ERROR_LENGTH]
+
+
+def _is_transient(e: Exception) -> bool:
+    """Connection-level failures: every row would fail the same way, and none of them is at fault."""
+    if isinstance(e, DBAPIError) and e.connection_invalidated:
+        return True
+    return isinstance(e, (OSError, TimeoutError, OperationalError, InterfaceError))
+
+
+class WalletCreatedConsumer(AsyncioConsumer):
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        *,
+        rabbitmq_url: str,
+        exchange: str,
+        prefetch: int,
+        batch_size: int,
+        batch_wait: float,
+        max_attempts: int,
+        retry_delay: float,
+        retry_max_delay: float,
+    ):
+        super().__init__(rabbitmq_url)
+        self._session_factory = session_factory
+        self._exchange = exchange
+        self._prefetch = prefetch
+        self._batch_size = batch_size
+        self._batch_wait = batch_wait
+        self._max_attempts = max_attempts
+        self._retry_delay = retry_delay
+        self._retry_max_delay = retry_max_delay
+
+    def _retry_delay_ms(self, failures: int) -> int:
+        return int(min(self._retry_delay * 2 ** (failures - 1), self._retry_max_delay) * 1000)
 
+    async def _declare(self, channel: Channel) -> None:
+        await self._rpc(channel.exchange_declare, exchange=self._exchange, exchange_type="topic", durable=True)
+        await self._rpc(channel.queue_declare, queue=QUEUE_NAME, durable=True)
+        await self._rpc(channel.queue_bind, queue=QUEUE_NAME, exchange=self._exchange, routing_key="wallet.created")
+        await self._rpc(channel.exchange_declare, exchange=DEAD_LETTER_EXCHANGE, exchange_type="direct", durable=True)
+        await self._rpc(channel.queue_declare, queue=DEAD_LETTER_QUEUE, durable=True)
+        await self._rpc(channel.queue_bind, queue=DEAD_LETTER_QUEUE, exchange=DEAD_LETTER_EXCHANGE, routing_key=QUEUE_NAME)
+        # One delay queue per backoff step, so every message in a queue expires in order; the name carries the TTL
+        # because a queue cannot be redeclared with different arguments
+        for delay_ms in sorted({self._retry_delay_ms(n) for n in range(1, self._max_attempts)}):
+            await self._rpc(
+                channel.queue_declare,
+                queue=retry_queue_name(delay_ms),
+                durable=True,
+                arguments={
+                    "x-message-ttl": delay_ms,
+                    "x-dead-letter-exchange": "",
+                    "x-dead-letter-routing-key": QUEUE_NAME,
+                },
+            )
 
-def _run_consumer():
-    settings = get_settings()
-    params = pika.URLParameters(settings.rabbitmq_url)
-    params.heartbeat = 600
-    while not _stop_event.is_set():
+    async def _setup(self, channel: Channel) -> list[asyncio.Task]:
+        await self._declare(channel)
+        await self._rpc(channel.basic_qos, prefetch_count=self._prefetch)
+        # Retry/dead-letter publishes and the batch's ack are committed together
+        await self._rpc(channel.tx_select)
+
+        deliveries: asyncio.Queue[_Delivery] = asyncio.Queue()
+        channel.basic_consume(
+            queue=QUEUE_NAME,
+            on_message_callback=lambda _ch, method, props, body: deliveries.put_nowait(_delivery(method, props, body)),
+        )
+        logger.info("Consuming wallet.created (prefetch %d, batches of up to %d)", self._prefetch, self._batch_size)
+        return [
+            asyncio.create_task(self._flush_batches(channel, deliveries)),
+            asyncio.create_task(self._sample_depth(channel)),
+        ]
+
+    async def _next_batch(self, deliveries: asyncio.Queue[_Delivery]) -> list[_Delivery]:
+        batch = [await deliveries.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self._batch_wait
+        while len(batch) < self._batch_size:
+            if not deliveries.empty():
+                batch.append(deliveries.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(deliveries.get(), remaining))
+            except TimeoutError:
+                break
+        return batch
+
+    async def _flush_batches(self, channel: Channel, deliveries: asyncio.Queue[_Delivery]) -> None:
+        # One batch at a time, in delivery order, so an ack with multiple=True only covers handled messages
+        while True:
+            batch = await self._next_batch(deliveries)
+            CONSUMER_BATCH_SIZE.labels(QUEUE_NAME).observe(len(batch))
+            failed = [(d, d.error) for d in batch if d.row is None]
+            groups: dict[UUID, list[_Delivery]] = {}
+            for d in batch:
+                if d.row is not None:
+                    groups.setdefault(d.row["wallet_id"], []).append(d)
+            failed += await self._write_groups(groups)
+            for delivery, error in failed:
+                self._reject(channel, delivery, error)
+            channel.basic_ack(batch[-1].delivery_tag, multiple=True)
+            await self._rpc(channel.tx_commit)
+            logger.info(
+                "WalletRegistry: %d wallet.created events, %d rows offered, %d failed",
+                len(batch), len(groups), len(failed),
+            )
+
+    async def _write_groups(self, groups: dict[UUID, list[_Delivery]]) -> list[tuple[_Delivery, str]]:
+        """Write one row per wallet (the latest delivery wins); returns the deliveries that failed, with the error."""
+        if not groups:
+            return []
         try:
-            conn = pika.BlockingConnection(params)
-            ch = conn.channel()
-            ch.exchange_declare(exchange=settings.rabbitmq_exchange, exchange_type="topic", durable=True)
-            q = ch.queue_declare(queue="account-service-wallet-created", durable=True).method.queue
-            ch.queue_bind(queue=q, exchange=settings.rabbitmq_exchange, routing_key="wallet.created")
-            ch.basic_consume(queue=q, on_message_callback=_on_wallet_created)
-            logger.info("Consuming wallet.created")
-            while not _stop_event.is_set():
-                conn.process_data_events(time_limit=1)
+            await self._write_when_reachable([g[-1].row for g in groups.values()])
+            return []
         except Exception as e:
-            if _stop_event.is_set():
-                break
-            logger.warning("Consumer error, reconnecting: %s", e)
-            _stop_event.wait(5)
+            if len(groups) == 1:
+                logger.warning("wallet.created row failed: %s", _describe(e))
+                return [(d, _describe(e)) for g in groups.values() for d in g]
+            logger.warning("wallet.created batch of %d rows failed, writing them one at a time: %s", len(groups), _describe(e))
+        # Isolate the poison rows so the rest of the batch is not retried with them
+        failed = []
+        for group in groups.values():
+            try:
+                await self._write_when_reachable([group[-1].row])
+            except Exception as e:
+                failed += [(d, _describe(e)) for d in group]
+        return failed
+
+    async def _write_when_reachable(self, rows: list[dict[str, Any]]) -> None:
+        """
+        _write, waiting out connection-level failures with backoff. Those say nothing about the rows, so they must
+        not use up the messages' attempts; meanwhile the batch stays unacknowledged and, with the prefetch limit
+        reached, consumption pauses. Raises only errors caused by the rows themselves.
+        """
+        backoff = self._retry_delay
+        while True:
+            try:
+                await self._write(rows)
+                return
+            except Exception as e:
+                if not _is_transient(e):
+                    raise
+                logger.warning("Database unavailable for wallet.created, retrying in %.1fs: %s", backoff, _describe(e))
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, self._retry_max_delay)
+
+    def _reject(self, channel: Channel, delivery: _Delivery, error: str) -> None:
+        """Republish a failed delivery to its next delay queue, or to the dead-letter exchange. Acked with the batch."""
+        attempts = delivery.attempts + 1
+        props = delivery.properties
+        headers = dict(props.headers or {})
+        headers[ATTEMPTS_HEADER] = attempts
+        headers[ERROR_HEADER] = error
+        if delivery.row is None or attempts >= self._max_attempts:
+            headers[DEAD_LETTERED_AT_HEADER] = datetime.now(timezone.utc).isoformat()
+            exchange, routing_key = DEAD_LETTER_EXCHANGE, QUEUE_NAME
+            CONSUMER_DEAD_LETTERS.labels(QUEUE_NAME).inc()
+            logger.warning("wallet.created dead-lettered after %d attempt(s): %s", attempts, error)
+        else:
+            exchange, routing_key = "", retry_queue_name(self._retry_delay_ms(attempts))
+            CONSUMER_RETRIES.labels(QUEUE_NAME).inc()
+        channel.basic_publish(
+            exchange,
+            routing_key,
+            delivery.body,
+            pika.BasicProperties(
+                content_type=props.content_type or "application/json",
+                delivery_mode=2,
+                message_id=props.message_id,
+                headers=headers,
+            ),
+        )
+
+    async def _write(self, rows: list[dict[str, Any]]) -> None:
+        # Existing wallets are left alone, so redelivered events are harmless
+        async with self._session_factory() as session:
+            await session.execute(
+                pg_insert(WalletRegistry).values(rows).on_conflict_do_nothing(index_elements=[WalletRegistry.wallet_id])
+            )
+            await session.commit()
+
+    async def _sample_depth(self, channel: Channel) -> None:
+        while channel.is_open:
+            frame = await self._rpc(channel.queue_declare, queue=QUEUE_NAME, passive=True)
+            CONSUMER_QUEUE_DEPTH.labels(QUEUE_NAME).set(frame.method.message_count)
+            frame = await self._rpc(channel.queue_declare, queue=DEAD_LETTER_QUEUE, passive=True)
+            CONSUMER_QUEUE_DEPTH.labels(DEAD_LETTER_QUEUE).set(frame.method.message_count)
+            await asyncio.sleep(QUEUE_DEPTH_INTERVAL_SECONDS)
+
+
+_consumer: WalletCreatedConsumer | None = None
+
+
+def get_wallet_consumer() -> WalletCreatedConsumer:
+    global _consumer
+    if _consumer is None:
+        settings = get_settings()
+        _consumer = WalletCreatedConsumer(
+            async_session_factory,
+            rabbitmq_url=settings.rabbitmq_url,
+            exchange=settings.rabbitmq_exchange,
+            prefetch=settings.wallet_consumer_prefetch,
+            batch_size=settings.wallet_consumer_batch_size,
+            batch_wait=settings.wallet_consumer_batch_wait_seconds,
+            max_attempts=settings.wallet_consumer_max_attempts,
+            retry_delay=settings.wallet_consumer_retry_delay_seconds,
+            retry_max_delay=settings.wallet_consumer_retry_max_delay_seconds,
+        )
+    return _consumer
 
 
 def start_wallet_consumer() -> None:
-    global _consumer_thread
-    if _consumer_thread is not None:
-        return
-    _stop_event.clear()
-    _consumer_thread = threading.Thread(target=_run_consumer, daemon=True)
-    _consumer_thread.start()
-
-
-def stop_wallet_consumer() -> None:
-    global _consumer_thread
-    _stop_event.set()
-    if _consumer_thread:
-        _consumer_thread.join(timeout=5)
-    _consumer_thread = None
+    get_wallet_consumer().start()
+
+
+async def stop_wallet_consumer() -> None:
+    if _consumer is not None:
+        await _consumer.stop()
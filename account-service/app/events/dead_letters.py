@@ -0,0 +1,102 @@
+"""
+Inspect and replay dead-lettered wallet.created events.
+
+Admin operations, so they use a short-lived BlockingConnection; call them from a worker thread.
+Inspecting takes messages with basic_get and closes the channel without acking, which puts them back.
+Replaying moves messages to the main queue with their attempt count reset, in AMQP transactions of
+REPLAY_COMMIT_EVERY messages, so a message is never both replayed and left in the dead-letter queue.
+"""
+
+from typing import Any
+
+import pika
+
+from app.codec import loads
+from app.config import get_settings
+from app.events.consumer import (
+    ATTEMPTS_HEADER,
+    DEAD_LETTER_QUEUE,
+    DEAD_LETTERED_AT_HEADER,
+    ERROR_HEADER,
+    QUEUE_NAME,
+)
+
+REPLAY_COMMIT_EVERY = 100
+
+
+def _connect() -> pika.BlockingConnection:
+    params = pika.URLParameters(get_settings().rabbitmq_url)
+    params.blocked_connection_timeout = 30
+    return pika.BlockingConnection(params)
+
+
+def _describe(properties: pika.BasicProperties, body: bytes) -> dict[str, Any]:
+    headers = properties.headers or {}
+    try:
+        event = loads(body)
+    except ValueError:
+        event = body.decode("utf-8", errors="replace")
+    return {
+        "event_id": event.get("event_id") if isinstance(event, dict) else None,
+        "attempts": headers.get(ATTEMPTS_HEADER, 0),
+        "error": headers.get(ERROR_HEADER),
+        "dead_lettered_at": headers.get(DEAD_LETTERED_AT_HEADER),
+        "event": event,
+    }
+
+
+def peek_dead_letters(limit: int) -> tuple[int, list[dict[str, Any]]]:
+    """The dead-letter queue's depth and up to limit messages from its head, left in place."""
+    connection = _connect()
+    try:
+        channel = connection.channel()
+        total = channel.queue_declare(queue=DEAD_LETTER_QUEUE, durable=True).method.message_count
+        items = []
+        for _ in range(min(limit, total)):
+            method, properties, body = channel.basic_get(queue=DEAD_LETTER_QUEUE, auto_ack=False)
+            if method is None:
+                break
+            items.append(_describe(properties, body))
+        return total, items
+    finally:
+        # Closing without acking returns the messages to the queue
+        connection.close()
+
+
+def replay_dead_letters(limit: int) -> int:
+    """Move up to limit dead letters back to the consumer's queue for a fresh set of attempts; returns how many."""
+    connection = _connect()
+    try:
+        channel = connection.channel()
+        # Publishing to the default exchange silently drops the message if the queue does not exist
+        channel.queue_declare(queue=QUEUE_NAME, durable=True)
+        channel.tx_select()
+        replayed = 0
+        while replayed < limit:
+            method, properties, body = channel.basic_get(queue=DEAD_LETTER_QUEUE, auto_ack=False)
+            if method is None:
+                break
+            headers = {
+                k: v
+                for k, v in (properties.headers or {}).items()
+                if k not in (ATTEMPTS_HEADER, ERROR_HEADER, DEAD_LETTERED_AT_HEADER)
+            }
+            channel.basic_publish(
+                "",
+                QUEUE_NAME,
+                body,
+                pika.BasicProperties(
+                    content_type=properties.content_type,
+                    delivery_mode=2,
+                    message_id=properties.message_id,
+                    headers=headers or None,
+                ),
+            )
+            channel.basic_ack(method.delivery_tag)
+            replayed += 1
+            if replayed % REPLAY_COMMIT_EVERY == 0:
+                channel.tx_commit()
+        channel.tx_commit()
+        return replayed
+    finally:
+        connection.close()
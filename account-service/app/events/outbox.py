@@ -0,0 +1,165 @@
+"""
+Transactional outbox. Services write events into the outbox table in the request transaction; OutboxRelay
+publishes them after commit, so a rollback never emits an event and a broker outage never loses one.
+
+Delivery is at least once: if the relay fails between the broker's confirm and deleting the rows,
+the batch is published again. Consumers deduplicate on event_id.
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Any
+from uuid import uuid4
+
+from sqlalchemy import delete, event, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.db.session import async_session_factory
+from app.events.publisher import EventPublisher, build_envelope, get_event_publisher
+from app.metrics import OUTBOX_RELAY_DELAY, OUTBOX_RELAY_FAILURES
+from app.models.outbox import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+# Rows per multi-row INSERT from enqueue_events
+INSERT_CHUNK = 1000
+MAX_BACKOFF_SECONDS = 30.0
+# session.info flag: this transaction wrote outbox rows, wake the relay when it commits
+_PENDING = "outbox_pending"
+
+
+def enqueue_event(session: AsyncSession, event_type: str, payload: dict[str, Any]) -> None:
+    """Add an event to the session's transaction; it is published once the transaction commits."""
+    session.add(
+        OutboxEvent(event_id=uuid4(), event_type=event_type, payload=payload, occurred_at=datetime.now(timezone.utc))
+    )
+    session.info[_PENDING] = True
+
+
+async def enqueue_events(session: AsyncSession, event_type: str, payloads: list[dict[str, Any]]) -> None:
+    """enqueue_event for many payloads, as multi-row INSERTs."""
+    now = datetime.now(timezone.utc)
+    rows = [{"event_id": uuid4(), "event_type": event_type, "payload": p, "occurred_at": now} for p in payloads]
+    for start in range(0, len(rows), INSERT_CHUNK):
+        await session.execute(insert(OutboxEvent).values(rows[start:start + INSERT_CHUNK]))
+    session.info[_PENDING] = True
+
+
+class OutboxRelay:
+    """Publishes outbox rows in id order, batch_size at a time, and deletes them once the broker has confirmed them."""
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        publisher: EventPublisher,
+        *,
+        batch_size: int,
+        poll_interval: float,
+    ):
+        self._session_factory = session_factory
+        self._publisher = publisher
+        self._batch_size = batch_size
+        self._poll_interval = poll_interval
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task: asyncio.Task | None = None
+        self.relayed = 0
+
+    def notify(self) -> None:
+        self._wakeup.set()
+
+    async def relay_batch(self) -> int:
+        """Publish and delete one batch; returns the number of events relayed."""
+        async with self._session_factory() as session:
+            # SKIP LOCKED: replicas relaying at the same time take disjoint batches
+            rows = (
+                await session.execute(
+                    select(OutboxEvent)
+                    .order_by(OutboxEvent.id)
+                    .limit(self._batch_size)
+                    .with_for_update(skip_locked=True)
+                )
+            ).scalars().all()
+            if not rows:
+                return 0
+            messages = [
+                (r.event_type, build_envelope(r.event_type, r.payload, event_id=r.event_id, occurred_at=r.occurred_at))
+                for r in rows
+            ]
+            # The rows stay locked until every message is confirmed
+            await self._publisher.publish_confirmed(messages)
+            await session.execute(delete(OutboxEvent).where(OutboxEvent.id.in_([r.id for r in rows])))
+            await session.commit()
+
+        now = datetime.now(timezone.utc)
+        for r in rows:
+            OUTBOX_RELAY_DELAY.labels(r.event_type).observe(max((now - r.occurred_at).total_seconds(), 0.0))
+        self.relayed += len(rows)
+        return len(rows)
+
+    async def _run(self) -> None:
+        backoff = self._poll_interval
+        while not self._stopping:
+            # Cleared before the batch so a commit during it still triggers another pass
+            self._wakeup.clear()
+            try:
+                relayed = await self.relay_batch()
+            except Exception as e:
+                OUTBOX_RELAY_FAILURES.inc()
+                logger.warning("Outbox relay failed, retrying in %.1fs: %s", backoff, e)
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, MAX_BACKOFF_SECONDS)
+                continue
+            backoff = self._poll_interval
+            if relayed < self._batch_size:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self._poll_interval)
+                except TimeoutError:
+                    pass
+
+    def start(self) -> None:
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        """Let the current batch finish (up to timeout), then stop."""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        try:
+            await asyncio.wait_for(self._task, timeout)
+        except TimeoutError:
+            logger.warning("Outbox relay did not stop within %.0fs; unconfirmed rows will be relayed again", timeout)
+        self._task = None
+
+
+_relay: OutboxRelay | None = None
+
+
+def get_outbox_relay() -> OutboxRelay:
+    global _relay
+    if _relay is None:
+        settings = get_settings()
+        _relay = OutboxRelay(
+            async_session_factory,
+            get_event_publisher(),
+            batch_size=settings.outbox_batch_size,
+            poll_interval=settings.outbox_poll_interval_seconds,
+        )
+    return _relay
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_relay(session: Session) -> None:
+    if session.info.pop(_PENDING, False) and _relay is not None:
+        _relay.notify()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session) -> None:
+    session.info.pop(_PENDING, None)
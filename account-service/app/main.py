@@ -4,24 +4,47 @@ import asyncio
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 
 from app.config import get_settings
+from app.db.session import async_session_factory
+from app.events.cache_invalidation import start_cache_invalidator, stop_cache_invalidator
 from app.events.consumer import start_wallet_consumer, stop_wallet_consumer
+from app.events.outbox import get_outbox_relay
 from app.events.publisher import get_event_publisher
+from app.metrics import metrics_response
 from app.middleware.api_key import InternalAPIKeyMiddleware
-from app.routers import accounts, callbacks
+from app.middleware.metrics import MetricsMiddleware
+from app.routers import accounts, admin, callbacks
+from app.services.account_number import get_account_number_allocator
+from app.services.callback_inbox import get_callback_inbox_worker
+from app.services.payment_partitions import get_payment_partition_maintainer
+from app.services.recent_payments import warm_recent_trans_ids
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    try:
-        await asyncio.to_thread(get_event_publisher().declare_exchange)
-    except Exception as e:
-        import logging
-        logging.getLogger("app.events.publisher").warning("RabbitMQ declare failed: %s", e)
+    # Connects in the background and keeps reconnecting; publishes wait for it up to RABBITMQ_PUBLISH_TIMEOUT_SECONDS
+    get_event_publisher().start()
     start_wallet_consumer()
+    start_cache_invalidator()
+    if get_settings().outbox_relay_enabled:
+        get_outbox_relay().start()
+    if get_settings().callback_ingest_mode == "staged":
+        get_callback_inbox_worker().start()
+    if get_settings().payment_partition_maintenance_enabled:
+        get_payment_partition_maintainer().start()
+    # In the background: callbacks are served (from the database) while it loads
+    warm_task = asyncio.create_task(warm_recent_trans_ids(async_session_factory))
     yield
-    stop_wallet_consumer()
-    get_event_publisher().close()
+    warm_task.cancel()
+    await get_payment_partition_maintainer().stop()
+    # Before the relay stops, so the events of the last batches are still relayed
+    await get_callback_inbox_worker().stop()
+    await get_outbox_relay().stop()
+    await stop_cache_invalidator()
+    await stop_wallet_consumer()
+    await get_account_number_allocator().close()
+    await asyncio.to_thread(get_event_publisher().close)
 
 
 app = FastAPI(
@@ -32,13 +55,26 @@ app = FastAPI(
     redoc_url="/redoc",
     openapi_url="/openapi.json",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 app.add_middleware(InternalAPIKeyMiddleware)
+if get_settings().metrics_enabled:
+    # Added last so it is outermost and also times requests rejected by the API key check
+    app.add_middleware(MetricsMiddleware)
 app.include_router(accounts.router)
 app.include_router(callbacks.router)
+app.include_router(callbacks.admin_router)
+app.include_router(admin.router)
 
 
 @app.get("/health")
 async def health():
     return {"status": "ok", "service": get_settings().service_name}
+
+
+if get_settings().metrics_enabled:
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        return metrics_response()
@@ -0,0 +1,116 @@
+"""Prometheus metrics: request latency, DB pool usage, RabbitMQ publish, outbox relay, consumer lag, callback caches and the callback inbox."""
+
+from datetime import datetime, timezone
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest
+from sqlalchemy.pool import Pool
+from starlette.responses import Response
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time to handle a request, by route and response status",
+    ["method", "route", "status"],
+)
+REQUESTS_IN_FLIGHT = Gauge("http_requests_in_flight", "Requests currently being handled")
+
+DB_POOL_CONNECTIONS = Gauge(
+    "db_pool_connections",
+    "SQLAlchemy pool connections (checked_out, checked_in, overflow beyond pool_size, pool_size)",
+    ["state"],
+)
+
+PUBLISH_LATENCY = Histogram(
+    "rabbitmq_publish_duration_seconds",
+    "Time from queueing an event for RabbitMQ until the broker confirmed it",
+    ["event_type"],
+)
+PUBLISH_PENDING = Gauge("rabbitmq_publish_pending", "Events queued for RabbitMQ or awaiting the broker's confirm")
+PUBLISH_FAILURES = Counter("rabbitmq_publish_failures_total", "Events that failed to publish", ["event_type"])
+
+OUTBOX_RELAY_DELAY = Histogram(
+    "outbox_relay_delay_seconds",
+    "Time from an outbox event's occurred_at until the broker confirmed it",
+    ["event_type"],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0, float("inf")),
+)
+OUTBOX_RELAY_FAILURES = Counter("outbox_relay_failures_total", "Outbox batches that failed and will be retried")
+
+CONSUMER_LAG = Histogram(
+    "rabbitmq_consumer_lag_seconds",
+    "Delay between an event's occurred_at and its consumption",
+    ["queue"],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0, float("inf")),
+)
+CONSUMER_BATCH_SIZE = Histogram(
+    "rabbitmq_consumer_batch_size",
+    "Messages written and acknowledged together",
+    ["queue"],
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000, float("inf")),
+)
+CONSUMER_RETRIES = Counter(
+    "rabbitmq_consumer_retries_total", "Messages that failed and were sent to a delay queue for another attempt", ["queue"]
+)
+CONSUMER_DEAD_LETTERS = Counter(
+    "rabbitmq_consumer_dead_letters_total", "Messages sent to the dead-letter exchange", ["queue"]
+)
+CONSUMER_QUEUE_DEPTH = Gauge("rabbitmq_consumer_queue_depth", "Messages ready in a consumed queue", ["queue"])
+
+ACCOUNT_CACHE_LOOKUPS = Counter("account_cache_lookups_total", "Active-account cache lookups", ["result"])
+ACCOUNT_CACHE_HIT_RATIO = Gauge("account_cache_hit_ratio", "Share of active-account cache lookups that hit, since start")
+ACCOUNT_CACHE_SIZE = Gauge("account_cache_entries", "Entries in the active-account cache")
+TRANS_ID_CACHE_LOOKUPS = Counter(
+    "trans_id_cache_lookups_total", "Callback TransID lookups; a hit is a duplicate answered without the database", ["result"]
+)
+TRANS_ID_CACHE_SIZE = Gauge("trans_id_cache_entries", "Recently processed TransIDs held in memory")
+
+CALLBACK_INBOX_BACKLOG = Gauge(
+    "callback_inbox_backlog", "Staged M-PESA callbacks waiting to be processed (counted up to CALLBACK_INBOX_MAX_BACKLOG)"
+)
+CALLBACK_INBOX_PROCESSED = Counter("callback_inbox_processed_total", "Staged callbacks processed, by outcome", ["outcome"])
+CALLBACK_INBOX_FAILURES = Counter("callback_inbox_failures_total", "Staged callbacks that failed and will be retried")
+CALLBACK_INBOX_REJECTED = Counter("callback_inbox_rejected_total", "Callbacks turned away because the backlog was full")
+CALLBACK_INBOX_DELAY = Histogram(
+    "callback_inbox_delay_seconds",
+    "Time from staging a callback until it was recorded",
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0, float("inf")),
+)
+
+PAYMENT_PARTITIONS = Gauge("payment_reference_partitions", "Monthly partitions attached to payment_references")
+# Alert when this is less than a month from time(): it stops moving if maintenance stops running
+PAYMENT_PARTITION_HORIZON = Gauge(
+    "payment_reference_partition_horizon_timestamp_seconds",
+    "End of the furthest payment_references monthly partition (Unix time)",
+)
+PAYMENT_PARTITION_DEFAULT_ROWS = Gauge(
+    "payment_reference_default_partition_rows", "Payments in payment_references_default, outside any monthly partition"
+)
+PAYMENT_PARTITIONS_DETACHED = Counter(
+    "payment_reference_partitions_detached_total", "payment_references partitions detached past the retention"
+)
+PAYMENT_TRANS_IDS_PRUNED = Counter("payment_trans_ids_pruned_total", "TransIDs pruned from payment_trans_ids past the dedup window")
+
+
+def register_pool_metrics(pool: Pool) -> None:
+    """Read pool counters at scrape time (no per-checkout cost)."""
+    DB_POOL_CONNECTIONS.labels("checked_out").set_function(pool.checkedout)
+    DB_POOL_CONNECTIONS.labels("checked_in").set_function(pool.checkedin)
+    # overflow() is negative until pool_size connections have been opened
+    DB_POOL_CONNECTIONS.labels("overflow").set_function(lambda: max(pool.overflow(), 0))
+    DB_POOL_CONNECTIONS.labels("pool_size").set_function(pool.size)
+
+
+def observe_event_lag(queue: str, occurred_at: object) -> None:
+    """Best effort: a missing or malformed occurred_at is skipped, a naive one is taken as UTC."""
+    if not isinstance(occurred_at, str) or not occurred_at:
+        return
+    try:
+        occurred = datetime.fromisoformat(occurred_at)
+    except ValueError:
+        return
+    if occurred.tzinfo is None:
+        occurred = occurred.replace(tzinfo=timezone.utc)
+    CONSUMER_LAG.labels(queue).observe(max((datetime.now(timezone.utc) - occurred).total_seconds(), 0.0))
+
+
+def metrics_response() -> Response:
+    return Response(content=generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
@@ -1,3 +1,4 @@
 from app.middleware.api_key import InternalAPIKeyMiddleware
+from app.middleware.metrics import MetricsMiddleware
 
-__all__ = ["InternalAPIKeyMiddleware"]
+__all__ = ["InternalAPIKeyMiddleware", "MetricsMiddleware"]
@@ -1,17 +1,37 @@
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
+import hmac
+
 from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 from app.config import get_settings
 
-SKIP_PATHS = ("/health", "/docs", "/redoc", "/openapi.json", "/callbacks/mpesa")
+HEADER_INTERNAL_API_KEY = b"x-internal-api-key"
+SKIP_PATHS = frozenset(("/health", "/metrics", "/docs", "/redoc", "/openapi.json", "/callbacks/mpesa"))
+SKIP_PREFIXES = ("/callbacks/",)
+
+# Stateless, so one instance serves every rejected request
+_UNAUTHORIZED = JSONResponse(status_code=401, content={"detail": "Missing or invalid internal API key"})
+
+
+class InternalAPIKeyMiddleware:
+    """Pure ASGI: checks X-Internal-API-Key from the scope headers (constant-time compare), no extra task per request."""
 
+    def __init__(self, app: ASGIApp, api_key: str | None = None):
+        self.app = app
+        self._expected = (api_key or get_settings().internal_api_key).encode()
 
-class InternalAPIKeyMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        if request.url.path.rstrip("/") in SKIP_PATHS or request.url.path.startswith("/callbacks/"):
-            return await call_next(request)
-        key = request.headers.get("X-Internal-API-Key")
-        if not key or key != get_settings().internal_api_key:
-            return JSONResponse(status_code=401, content={"detail": "Missing or invalid internal API key"})
-        return await call_next(request)
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        path = scope["path"]
+        if path.rstrip("/") in SKIP_PATHS or path.startswith(SKIP_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+        for name, value in scope["headers"]:
+            if name == HEADER_INTERNAL_API_KEY:
+                if hmac.compare_digest(value, self._expected):
+                    await self.app(scope, receive, send)
+                    return
+                break
+        await _UNAUTHORIZED(scope, receive, send)
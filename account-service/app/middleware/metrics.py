@@ -0,0 +1,39 @@
+"""Request latency and in-flight metrics (pure ASGI, so it adds no per-request task or body copy)."""
+
+import time
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.metrics import REQUEST_LATENCY, REQUESTS_IN_FLIGHT
+
+
+class MetricsMiddleware:
+    """
+    Records latency by method, route template and status. Using the matched route's template
+    (e.g. /accounts/{account_id}) rather than the raw path keeps label cardinality bounded.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            REQUEST_LATENCY.labels(scope["method"], route, str(status)).observe(time.perf_counter() - started)
@@ -1,5 +1,8 @@
 from app.models.wallet_registry import WalletRegistry
 from app.models.account import Account
 from app.models.payment_reference import PaymentReference
+from app.models.payment_trans_id import PaymentTransId
+from app.models.outbox import OutboxEvent
+from app.models.callback_inbox import CallbackInbox
 
-__all__ = ["WalletRegistry", "Account", "PaymentReference"]
+__all__ = ["WalletRegistry", "Account", "PaymentReference", "PaymentTransId", "OutboxEvent", "CallbackInbox"]
@@ -3,7 +3,7 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import Boolean, DateTime, ForeignKey, Integer, String, func
+from sqlalchemy import Boolean, DateTime, ForeignKey, Index, Integer, String, func
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -12,6 +12,8 @@ from app.db.session import Base
 
 class Account(Base):
     __tablename__ = "accounts"
+    # Keyset pagination key for GET /wallets/{wallet_id}/accounts
+    __table_args__ = (Index("ix_accounts_wallet_id_sequence_no", "wallet_id", "sequence_no", unique=True),)
 
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True),
@@ -22,7 +24,6 @@ class Account(Base):
         UUID(as_uuid=True),
         ForeignKey("wallet_registry.wallet_id", ondelete="RESTRICT"),
         nullable=False,
-        index=True,
     )
     fullname: Mapped[str] = mapped_column(String(255), nullable=False)
     account_no: Mapped[str] = mapped_column(String(32), unique=True, nullable=False, index=True)
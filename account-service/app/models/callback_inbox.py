@@ -0,0 +1,29 @@
+"""Staged M-PESA callbacks: accepted and committed by the handler, recorded later by CallbackInboxWorker."""
+
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import BigInteger, DateTime, Identity, Integer, Numeric, String, Text, func
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.session import Base
+
+
+class CallbackInbox(Base):
+    __tablename__ = "callback_inbox"
+
+    # Processing order
+    id: Mapped[int] = mapped_column(BigInteger, Identity(), primary_key=True)
+    # Unique while staged, so a retry storm adds one row per TransID
+    trans_id: Mapped[str] = mapped_column(String(64), unique=True, nullable=False)
+    account_no: Mapped[str] = mapped_column(String(32), nullable=False)
+    amount: Mapped[Decimal] = mapped_column(Numeric(18, 2), nullable=False)
+    payload: Mapped[dict] = mapped_column(JSONB, nullable=False)
+    received_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False,
+    )
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
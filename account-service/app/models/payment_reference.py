@@ -1,4 +1,4 @@
-"""Idempotency for M-PESA callbacks: one PaymentReference per trans_id."""
+"""M-PESA payments recorded against accounts, range-partitioned by month on received_at."""
 
 from datetime import datetime
 from decimal import Decimal
@@ -11,12 +11,17 @@ from app.db.session import Base
 
 class PaymentReference(Base):
     __tablename__ = "payment_references"
+    # Monthly partitions payment_references_YYYY_MM, created ahead and detached by PaymentPartitionMaintainer.
+    # A unique key on a partitioned table must include received_at, so TransID idempotency lives in PaymentTransId.
+    __table_args__ = {"postgresql_partition_by": "RANGE (received_at)"}
 
     trans_id: Mapped[str] = mapped_column(String(64), primary_key=True)
     account_no: Mapped[str] = mapped_column(String(32), nullable=False, index=True)
     amount: Mapped[Decimal] = mapped_column(Numeric(18, 2), nullable=False)
     received_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
+        primary_key=True,
         server_default=func.now(),
         nullable=False,
+        index=True,
     )
@@ -0,0 +1,21 @@
+"""Idempotency for M-PESA callbacks: one PaymentTransId per trans_id within the dedup window."""
+
+from datetime import datetime
+
+from sqlalchemy import DateTime, String, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.session import Base
+
+
+class PaymentTransId(Base):
+    __tablename__ = "payment_trans_ids"
+
+    trans_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    # Rows older than PAYMENT_DEDUP_WINDOW_DAYS are pruned
+    received_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False,
+        index=True,
+    )
@@ -1,3 +1,3 @@
-from app.routers import accounts, callbacks
+from app.routers import accounts, admin, callbacks
 
-__all__ = ["accounts", "callbacks"]
+__all__ = ["accounts", "admin", "callbacks"]
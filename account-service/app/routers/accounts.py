@@ -1,14 +1,27 @@
+from typing import Literal
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.dependencies import get_db
-from app.schemas.account import AccountCreate, AccountCreateResponse, AccountListItem
-from app.services.account_service import AccountService
+from app.schemas.account import (
+    AccountBulkCreate,
+    AccountBulkCreateResponse,
+    AccountCreate,
+    AccountCreateResponse,
+    AccountListItem,
+)
+from app.services.account_service import AccountService, decode_cursor, stream_wallet_accounts
 
 router = APIRouter(tags=["accounts"])
 
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+# Page size when only ?cursor= is given
+DEFAULT_PAGE_SIZE = 100
+HEADER_NEXT_CURSOR = "X-Next-Cursor"
+
 
 @router.post("/accounts", response_model=AccountCreateResponse)
 async def create_account(data: AccountCreate, session: AsyncSession = Depends(get_db)):
@@ -19,10 +32,48 @@ async def create_account(data: AccountCreate, session: AsyncSession = Depends(ge
         raise HTTPException(status_code=404, detail=str(e))
 
 
-@router.get("/wallets/{wallet_id}/accounts", response_model=list[AccountListItem])
-async def list_accounts_by_wallet(wallet_id: UUID, session: AsyncSession = Depends(get_db)):
+@router.post("/wallets/{wallet_id}/accounts/bulk", response_model=AccountBulkCreateResponse)
+async def create_accounts_bulk(wallet_id: UUID, data: AccountBulkCreate, session: AsyncSession = Depends(get_db)):
+    try:
+        svc = AccountService(session)
+        accounts = await svc.create_accounts_bulk(wallet_id, data.fullnames)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return AccountBulkCreateResponse(wallet_id=wallet_id, count=len(accounts), accounts=accounts)
+
+
+@router.get(
+    "/wallets/{wallet_id}/accounts",
+    response_model=list[AccountListItem],
+    responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}}},
+)
+async def list_accounts_by_wallet(
+    wallet_id: UUID,
+    request: Request,
+    response: Response,
+    limit: int | None = Query(
+        None, ge=1, le=1000, description="page size; without limit or cursor every account is returned"
+    ),
+    cursor: str | None = Query(None, description=f"{HEADER_NEXT_CURSOR} from the previous page"),
+    format: Literal["json", "ndjson"] | None = Query(None, description="ndjson streams every remaining account"),
+    session: AsyncSession = Depends(get_db),
+):
+    try:
+        after = decode_cursor(wallet_id, cursor) if cursor else 0
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if format == "ndjson" or (format is None and NDJSON_MEDIA_TYPE in request.headers.get("accept", "")):
+        return StreamingResponse(stream_wallet_accounts(wallet_id, after=after), media_type=NDJSON_MEDIA_TYPE)
     svc = AccountService(session)
-    return await svc.list_by_wallet(wallet_id)
+    if limit is None and cursor is None:
+        return (await svc.list_by_wallet(wallet_id)).items
+    # Paged: the body stays a plain list, the way to the next page travels in headers
+    page = await svc.list_by_wallet(wallet_id, limit=limit or DEFAULT_PAGE_SIZE, after=after)
+    if page.next_cursor is not None:
+        response.headers[HEADER_NEXT_CURSOR] = page.next_cursor
+        query = request.url.include_query_params(cursor=page.next_cursor).query
+        response.headers["Link"] = f'<{request.url.path}?{query}>; rel="next"'
+    return page.items
 
 
 @router.delete("/accounts/{account_id}")
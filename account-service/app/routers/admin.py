@@ -0,0 +1,30 @@
+"""Operator endpoints: inspect and replay dead-lettered wallet.created events."""
+
+import asyncio
+
+from fastapi import APIRouter, HTTPException, Query
+from pika.exceptions import AMQPError
+
+from app.events.consumer import DEAD_LETTER_QUEUE, QUEUE_NAME
+from app.events.dead_letters import peek_dead_letters, replay_dead_letters
+from app.schemas.dead_letter import DeadLetter, DeadLetterList, DeadLetterReplayResponse
+
+router = APIRouter(prefix="/admin/dead-letters", tags=["admin"])
+
+
+@router.get("/wallet-created", response_model=DeadLetterList)
+async def list_wallet_created_dead_letters(limit: int = Query(50, ge=1, le=500)):
+    try:
+        total, items = await asyncio.to_thread(peek_dead_letters, limit)
+    except (AMQPError, OSError) as e:
+        raise HTTPException(status_code=503, detail=f"RabbitMQ unavailable: {e!r}")
+    return DeadLetterList(queue=DEAD_LETTER_QUEUE, total=total, items=[DeadLetter(**i) for i in items])
+
+
+@router.post("/wallet-created/replay", response_model=DeadLetterReplayResponse)
+async def replay_wallet_created_dead_letters(limit: int = Query(1000, ge=1, le=100_000)):
+    try:
+        replayed = await asyncio.to_thread(replay_dead_letters, limit)
+    except (AMQPError, OSError) as e:
+        raise HTTPException(status_code=503, detail=f"RabbitMQ unavailable: {e!r}")
+    return DeadLetterReplayResponse(queue=QUEUE_NAME, replayed=replayed)
@@ -3,34 +3,107 @@
 from decimal import Decimal
 
 from fastapi import APIRouter, Depends, Request
-from sqlalchemy import select
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.codec import loads
+from app.config import get_settings
 from app.dependencies import get_db
-from app.models.account import Account
-from app.schemas.mpesa_callback import parse_mpesa_callback
-from app.services.account_service import AccountService
+from app.metrics import CALLBACK_INBOX_REJECTED
+from app.schemas.mpesa_callback import (
+    MpesaCallbackBatch,
+    MpesaCallbackBatchResponse,
+    MpesaCallbackResult,
+    parse_mpesa_callback,
+)
+from app.services.account_service import (
+    PAYMENT_ACCOUNT_NOT_FOUND,
+    PAYMENT_DUPLICATE,
+    PAYMENT_RECORDED,
+    AccountService,
+    recently_recorded,
+)
+from app.services.callback_inbox import get_callback_inbox_worker, stage_callback
 
 router = APIRouter(prefix="/callbacks", tags=["callbacks"])
+# Bulk replay is an operator action, so it sits outside /callbacks/ and needs the internal API key
+admin_router = APIRouter(prefix="/admin/callbacks", tags=["callbacks"])
+
+# (ResultCode, ResultDesc) per record_payment_and_emit_credit outcome, as POST /callbacks/mpesa answers
+RESULTS = {
+    PAYMENT_RECORDED: (0, "Success"),
+    PAYMENT_DUPLICATE: (0, "Already processed"),
+    PAYMENT_ACCOUNT_NOT_FOUND: (1, "Account not found"),
+}
+MISSING_FIELDS = (1, "Missing TransID or BillRefNumber")
+# Batch results for bodies parse_mpesa_callback rejects
+INVALID_AMOUNT = (1, "Invalid Amount")
+MALFORMED_CALLBACK = (1, "Malformed callback")
+
+
+def _result(trans_id: object, result: tuple[int, str]) -> MpesaCallbackResult:
+    # TransID may have come in as a JSON number; the result field is a string
+    code, desc = result
+    return MpesaCallbackResult(
+        TransID=str(trans_id) if trans_id is not None else None, ResultCode=code, ResultDesc=desc
+    )
 
 
 @router.post("/mpesa")
 async def mpesa_callback(request: Request, session: AsyncSession = Depends(get_db)):
-    body = await request.json()
+    body = loads(await request.body())
     trans_id, account_no, amount = parse_mpesa_callback(body)
     if not trans_id or not account_no:
-        return {"ResultCode": 1, "ResultDesc": "Missing TransID or BillRefNumber"}
+        code, desc = MISSING_FIELDS
+        return {"ResultCode": code, "ResultDesc": desc}
     if amount is None:
         amount = Decimal("0")
 
-    # Verify account exists
-    r = await session.execute(select(Account).where(Account.account_no == account_no).where(Account.is_active.is_(True)))
-    if not r.scalar_one_or_none():
-        return {"ResultCode": 1, "ResultDesc": "Account not found"}
+    if get_settings().callback_ingest_mode == "staged":
+        if recently_recorded(trans_id, account_no):
+            return {"ResultCode": 0, "ResultDesc": "Already processed"}
+        if get_callback_inbox_worker().saturated:
+            CALLBACK_INBOX_REJECTED.inc()
+            return ORJSONResponse(status_code=503, content={"ResultCode": 1, "ResultDesc": "Busy, retry later"})
+        await stage_callback(session, trans_id, account_no, amount, body)
+        # Durable before M-PESA is told it was received
+        await session.commit()
+        return {"ResultCode": 0, "ResultDesc": "Accepted"}
 
     svc = AccountService(session)
-    recorded = await svc.record_payment_and_emit_credit(trans_id=trans_id, account_no=account_no, amount=amount)
-    if not recorded:
-        return {"ResultCode": 0, "ResultDesc": "Already processed"}
+    outcome = await svc.record_payment_and_emit_credit(trans_id=trans_id, account_no=account_no, amount=amount)
+    code, desc = RESULTS[outcome]
+    return {"ResultCode": code, "ResultDesc": desc}
+
+
+@admin_router.post("/mpesa/batch", response_model=MpesaCallbackBatchResponse)
+async def mpesa_callback_batch(data: MpesaCallbackBatch, session: AsyncSession = Depends(get_db)):
+    """
+    Replay many callbacks at once (e.g. payments missed and recovered from M-PESA statements). Always
+    recorded inline in this request's transaction; each result is what POST /callbacks/mpesa would answer.
+    """
+    parsed: list[tuple[int, str, str, Decimal]] = []
+    results: list[MpesaCallbackResult | None] = [None] * len(data.callbacks)
+    for i, body in enumerate(data.callbacks):
+        # One bad body gets its own error result; it never fails the rest of the batch
+        try:
+            trans_id, account_no, amount = parse_mpesa_callback(body)
+        except (ArithmeticError, ValueError):
+            results[i] = _result(body.get("TransID"), INVALID_AMOUNT)
+            continue
+        except Exception:
+            results[i] = _result(body.get("TransID"), MALFORMED_CALLBACK)
+            continue
+        if not trans_id or not account_no:
+            results[i] = _result(trans_id, MISSING_FIELDS)
+            continue
+        parsed.append((i, str(trans_id), str(account_no), amount if amount is not None else Decimal("0")))
 
-    return {"ResultCode": 0, "ResultDesc": "Success"}
+    outcomes = await AccountService(session).record_payments_bulk([p[1:] for p in parsed]) if parsed else []
+    for (i, trans_id, _, _), outcome in zip(parsed, outcomes):
+        results[i] = _result(trans_id, RESULTS[outcome])
+    return MpesaCallbackBatchResponse(
+        count=len(results),
+        recorded=outcomes.count(PAYMENT_RECORDED),
+        results=results,
+    )
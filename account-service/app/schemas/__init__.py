@@ -1,9 +1,33 @@
-from app.schemas.account import AccountCreate, AccountCreateResponse, AccountListItem
-from app.schemas.mpesa_callback import parse_mpesa_callback
+from app.schemas.account import (
+    AccountBulkCreate,
+    AccountBulkCreateResponse,
+    AccountBulkItem,
+    AccountCreate,
+    AccountCreateResponse,
+    AccountListItem,
+    AccountPage,
+)
+from app.schemas.dead_letter import DeadLetter, DeadLetterList, DeadLetterReplayResponse
+from app.schemas.mpesa_callback import (
+    MpesaCallbackBatch,
+    MpesaCallbackBatchResponse,
+    MpesaCallbackResult,
+    parse_mpesa_callback,
+)
 
 __all__ = [
+    "AccountBulkCreate",
+    "AccountBulkCreateResponse",
+    "AccountBulkItem",
     "AccountCreate",
     "AccountCreateResponse",
     "AccountListItem",
+    "AccountPage",
+    "DeadLetter",
+    "DeadLetterList",
+    "DeadLetterReplayResponse",
+    "MpesaCallbackBatch",
+    "MpesaCallbackBatchResponse",
+    "MpesaCallbackResult",
     "parse_mpesa_callback",
 ]
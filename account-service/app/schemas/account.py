@@ -1,7 +1,11 @@
+from typing import Annotated
 from uuid import UUID
 
 from pydantic import BaseModel, ConfigDict, Field
 
+# Upper bound on fullnames per bulk request
+BULK_CREATE_MAX = 10_000
+
 
 class AccountCreate(BaseModel):
     fullname: str = Field(..., min_length=1, max_length=255)
@@ -17,6 +21,24 @@ class AccountCreateResponse(BaseModel):
     account_no: str
 
 
+class AccountBulkCreate(BaseModel):
+    fullnames: list[Annotated[str, Field(min_length=1, max_length=255)]] = Field(
+        ..., min_length=1, max_length=BULK_CREATE_MAX
+    )
+
+
+class AccountBulkItem(BaseModel):
+    id: UUID
+    fullname: str
+    account_no: str
+
+
+class AccountBulkCreateResponse(BaseModel):
+    wallet_id: UUID
+    count: int
+    accounts: list[AccountBulkItem]  # same order as the request's fullnames
+
+
 class AccountListItem(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
@@ -26,3 +48,8 @@ class AccountListItem(BaseModel):
     account_no: str
     sequence_no: int
     is_active: bool
+
+
+class AccountPage(BaseModel):
+    items: list[AccountListItem]
+    next_cursor: str | None = None  # sent as X-Next-Cursor, passed back as ?cursor= for the next page; None on the last page
@@ -0,0 +1,22 @@
+from typing import Any
+
+from pydantic import BaseModel
+
+
+class DeadLetter(BaseModel):
+    event_id: str | None
+    attempts: int
+    error: str | None
+    dead_lettered_at: str | None
+    event: Any  # the decoded envelope, or the raw body if it is not JSON
+
+
+class DeadLetterList(BaseModel):
+    queue: str
+    total: int  # messages in the dead-letter queue
+    items: list[DeadLetter]  # oldest first
+
+
+class DeadLetterReplayResponse(BaseModel):
+    queue: str
+    replayed: int
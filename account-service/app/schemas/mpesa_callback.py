@@ -55,3 +55,25 @@ def parse_mpesa_callback(body: dict[str, Any]) -> tuple[str | None, str | None,
     if amount is not None and not isinstance(amount, Decimal):
         amount = Decimal(str(amount))
     return (trans_id, account_no, amount)
+
+
+# Upper bound on callbacks per batch request
+CALLBACK_BATCH_MAX = 5000
+
+
+class MpesaCallbackBatch(BaseModel):
+    """Raw callback bodies, each in any shape parse_mpesa_callback accepts."""
+
+    callbacks: list[dict[str, Any]] = Field(..., min_length=1, max_length=CALLBACK_BATCH_MAX)
+
+
+class MpesaCallbackResult(BaseModel):
+    TransID: str | None
+    ResultCode: int
+    ResultDesc: str
+
+
+class MpesaCallbackBatchResponse(BaseModel):
+    count: int
+    recorded: int
+    results: list[MpesaCallbackResult]  # same order as the request's callbacks
@@ -1,4 +1,20 @@
 from app.services.account_service import AccountService
-from app.services.account_number import generate_account_number
+from app.services.account_cache import ActiveAccountCache, CachedAccount, get_account_cache
+from app.services.recent_payments import RecentTransIds, get_recent_trans_ids
+from app.services.callback_inbox import CallbackInboxWorker, get_callback_inbox_worker, stage_callback
+from app.services.account_number import AccountNumberAllocator, generate_account_number, get_account_number_allocator
 
-__all__ = ["AccountService", "generate_account_number"]
+__all__ = [
+    "AccountService",
+    "AccountNumberAllocator",
+    "ActiveAccountCache",
+    "CachedAccount",
+    "CallbackInboxWorker",
+    "RecentTransIds",
+    "generate_account_number",
+    "get_account_cache",
+    "get_account_number_allocator",
+    "get_callback_inbox_worker",
+    "get_recent_trans_ids",
+    "stage_callback",
+]
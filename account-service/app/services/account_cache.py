@@ -0,0 +1,81 @@
+"""
+In-process cache of account status for M-PESA callback validation.
+
+Maps account_no to CachedAccount(account_id, is_active), including unknown numbers (account_id None), so a
+callback for a cached account skips the accounts lookup and one for an unknown or inactive account skips the
+database entirely. Entries are filled on a miss and expire after ACCOUNT_CACHE_TTL_SECONDS; least recently
+used entries are evicted beyond ACCOUNT_CACHE_MAX_SIZE. account.created and account.deleted invalidate them,
+in this process directly and on every replica through AccountCacheInvalidator.
+Only used from the event loop, so there is no locking.
+"""
+
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+from uuid import UUID
+
+from app.config import get_settings
+from app.metrics import ACCOUNT_CACHE_HIT_RATIO, ACCOUNT_CACHE_LOOKUPS, ACCOUNT_CACHE_SIZE
+
+
+class CachedAccount(NamedTuple):
+    account_id: UUID | None  # None: no account with this number
+    is_active: bool
+
+
+class ActiveAccountCache:
+    def __init__(self, *, max_size: int, ttl: float):
+        self._max_size = max_size
+        self._ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, CachedAccount]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        ACCOUNT_CACHE_SIZE.set_function(self.__len__)
+        ACCOUNT_CACHE_HIT_RATIO.set_function(self.hit_ratio)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def hit_ratio(self) -> float:
+        """Share of lookups answered from the cache since the process started."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get(self, account_no: str) -> CachedAccount | None:
+        entry = self._entries.get(account_no)
+        if entry is not None and entry[0] > time.monotonic():
+            self._entries.move_to_end(account_no)
+            self.hits += 1
+            ACCOUNT_CACHE_LOOKUPS.labels("hit").inc()
+            return entry[1]
+        if entry is not None:
+            del self._entries[account_no]
+        self.misses += 1
+        ACCOUNT_CACHE_LOOKUPS.labels("miss").inc()
+        return None
+
+    def put(self, account_no: str, account: CachedAccount) -> None:
+        self._entries[account_no] = (time.monotonic() + self._ttl, account)
+        self._entries.move_to_end(account_no)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, account_no: str) -> None:
+        self._entries.pop(account_no, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+_cache: ActiveAccountCache | None = None
+
+
+def get_account_cache() -> ActiveAccountCache | None:
+    """The process-wide cache, or None when ACCOUNT_CACHE_ENABLED is off."""
+    global _cache
+    settings = get_settings()
+    if not settings.account_cache_enabled:
+        return None
+    if _cache is None:
+        _cache = ActiveAccountCache(max_size=settings.account_cache_max_size, ttl=settings.account_cache_ttl_seconds)
+    return _cache
@@ -1,26 +1,162 @@
-"""Account number generation with DB-level locking. Format: <company_prefix>-<zero_padded_sequence>."""
+"""
+Account number generation. Format: <company_prefix>-<zero_padded_sequence>.
 
-import uuid
+Two strategies, chosen by ACCOUNT_NO_GAP_POLICY:
+- gapless: lock the wallet's registry row in the request transaction and take the next number.
+  No gaps, but account creation for one wallet is serialized until each request commits.
+- reclaim / allow (hi/lo): each process reserves a block of ACCOUNT_NO_BLOCK_SIZE numbers per wallet
+  in one short transaction and hands them out from memory. Numbers stay unique across processes and
+  replicas, but are not strictly in creation order, and unused numbers leave gaps: with "reclaim" the
+  unused tail of a block is handed back on clean shutdown when no later block was reserved; with
+  "allow" it is skipped.
+"""
+
+import asyncio
 import logging
+import uuid
+from dataclasses import dataclass
 
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 from app.config import get_settings
+from app.db.session import async_session_factory
 from app.models.wallet_registry import WalletRegistry
 
 logger = logging.getLogger(__name__)
 
+GAP_POLICY_GAPLESS = "gapless"
+GAP_POLICY_RECLAIM = "reclaim"
 
-async def generate_account_number(session: AsyncSession, wallet_id: uuid.UUID) -> tuple[str, int]:
-    """
-    Lock wallet row, increment sequence_no, return (account_no, sequence_no).
-    Raises if wallet_id not in WalletRegistry.
-    """
-    settings = get_settings()
-    padding = settings.account_no_padding
 
-    # SELECT FOR UPDATE: lock the row until we commit
+def format_account_number(prefix: str, sequence_no: int, padding: int) -> str:
+    return f"{prefix}-{str(sequence_no).zfill(padding)}"
+
+
+def _wallet_not_found(wallet_id: uuid.UUID) -> ValueError:
+    return ValueError(f"Wallet {wallet_id} not found in registry. Consume wallet.created first.")
+
+
+async def _increment_sequence(session: AsyncSession, wallet_id: uuid.UUID, count: int) -> tuple[int, str]:
+    """Advance the wallet's sequence by count in one locked UPDATE; returns (new sequence_no, prefix)."""
+    row = (
+        await session.execute(
+            update(WalletRegistry)
+            .where(WalletRegistry.wallet_id == wallet_id)
+            .values(sequence_no=WalletRegistry.sequence_no + count)
+            .returning(WalletRegistry.sequence_no, WalletRegistry.company_account_prefix)
+            .execution_options(synchronize_session=False)
+        )
+    ).one_or_none()
+    if row is None:
+        raise _wallet_not_found(wallet_id)
+    return row[0], row[1]
+
+
+@dataclass(slots=True)
+class _Block:
+    prefix: str
+    next: int
+    end: int  # inclusive
+
+
+class AccountNumberAllocator:
+    """Hi/lo allocator: reserves sequence ranges per wallet from wallet_registry and hands them out in memory."""
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        *,
+        block_size: int,
+        padding: int,
+        reclaim: bool = True,
+    ):
+        self._session_factory = session_factory
+        self._block_size = block_size
+        self._padding = padding
+        self._reclaim = reclaim
+        self._blocks: dict[uuid.UUID, _Block] = {}
+        self._locks: dict[uuid.UUID, asyncio.Lock] = {}
+        self.reservations = 0
+
+    async def _reserve(self, wallet_id: uuid.UUID) -> _Block:
+        # The row lock is held only for this single-statement transaction
+        async with self._session_factory() as session:
+            end, prefix = await _increment_sequence(session, wallet_id, self._block_size)
+            await session.commit()
+        self.reservations += 1
+        return _Block(prefix=prefix, next=end - self._block_size + 1, end=end)
+
+    async def reserve_range(self, wallet_id: uuid.UUID, count: int) -> tuple[str, int]:
+        """Reserve `count` consecutive numbers outside any block; returns (prefix, first sequence_no)."""
+        async with self._session_factory() as session:
+            end, prefix = await _increment_sequence(session, wallet_id, count)
+            await session.commit()
+        self.reservations += 1
+        return prefix, end - count + 1
+
+    async def allocate(self, wallet_id: uuid.UUID) -> tuple[str, int]:
+        """Return (account_no, sequence_no), reserving a new block only when this wallet's block is used up."""
+        block = self._blocks.get(wallet_id)
+        if block is None or block.next > block.end:
+            lock = self._locks.setdefault(wallet_id, asyncio.Lock())
+            async with lock:
+                block = self._blocks.get(wallet_id)
+                if block is None or block.next > block.end:
+                    block = self._blocks[wallet_id] = await self._reserve(wallet_id)
+        # No await between the check above and here, so concurrent requests never share a number
+        sequence_no = block.next
+        block.next += 1
+        return format_account_number(block.prefix, sequence_no, self._padding), sequence_no
+
+    async def close(self) -> None:
+        """Hand back unused block tails (reclaim policy) where no later block has been reserved."""
+        blocks, self._blocks = self._blocks, {}
+        if not self._reclaim:
+            return
+        unused = [(w, b) for w, b in blocks.items() if b.next <= b.end]
+        if not unused:
+            return
+        try:
+            async with self._session_factory() as session:
+                for wallet_id, block in unused:
+                    await session.execute(
+                        update(WalletRegistry)
+                        .where(WalletRegistry.wallet_id == wallet_id)
+                        .where(WalletRegistry.sequence_no == block.end)
+                        .values(sequence_no=block.next - 1)
+                        .execution_options(synchronize_session=False)
+                    )
+                await session.commit()
+        except Exception as e:
+            logger.warning("Could not reclaim unused account numbers: %s", e)
+
+    def stats(self) -> dict:
+        return {
+            "wallets": len(self._blocks),
+            "reservations": self.reservations,
+            "block_size": self._block_size,
+        }
+
+
+_allocator: AccountNumberAllocator | None = None
+
+
+def get_account_number_allocator() -> AccountNumberAllocator:
+    global _allocator
+    if _allocator is None:
+        settings = get_settings()
+        _allocator = AccountNumberAllocator(
+            async_session_factory,
+            block_size=settings.account_no_block_size,
+            padding=settings.account_no_padding,
+            reclaim=settings.account_no_gap_policy == GAP_POLICY_RECLAIM,
+        )
+    return _allocator
+
+
+async def _generate_locked(session: AsyncSession, wallet_id: uuid.UUID, padding: int) -> tuple[str, int]:
+    # SELECT FOR UPDATE: lock the row until the request transaction commits
     result = await session.execute(
         select(WalletRegistry)
         .where(WalletRegistry.wallet_id == wallet_id)
@@ -28,12 +164,33 @@ async def generate_account_number(session: AsyncSession, wallet_id: uuid.UUID) -
     )
     reg: WalletRegistry | None = result.scalar_one_or_none()
     if not reg:
-        raise ValueError(f"Wallet {wallet_id} not found in registry. Consume wallet.created first.")
+        raise _wallet_not_found(wallet_id)
 
     next_seq = reg.sequence_no + 1
     reg.sequence_no = next_seq
     await session.flush()
+    return format_account_number(reg.company_account_prefix, next_seq, padding), next_seq
+
 
-    prefix = reg.company_account_prefix
-    account_no = f"{prefix}-{str(next_seq).zfill(padding)}"
-    return account_no, next_seq
+async def generate_account_number(session: AsyncSession, wallet_id: uuid.UUID) -> tuple[str, int]:
+    """
+    Return (account_no, sequence_no) for a new account in this wallet.
+    Raises ValueError if wallet_id is not in WalletRegistry.
+    """
+    settings = get_settings()
+    if settings.account_no_gap_policy == GAP_POLICY_GAPLESS:
+        return await _generate_locked(session, wallet_id, settings.account_no_padding)
+    return await get_account_number_allocator().allocate(wallet_id)
+
+
+async def reserve_account_numbers(session: AsyncSession, wallet_id: uuid.UUID, count: int) -> tuple[str, int]:
+    """
+    Reserve `count` consecutive sequence numbers for a bulk insert; returns (prefix, first sequence_no).
+    With the gapless policy the wallet row stays locked until the request commits (a rollback leaves no gap);
+    otherwise the range is committed at once in its own short transaction.
+    """
+    settings = get_settings()
+    if settings.account_no_gap_policy == GAP_POLICY_GAPLESS:
+        end, prefix = await _increment_sequence(session, wallet_id, count)
+        return prefix, end - count + 1
+    return await get_account_number_allocator().reserve_range(wallet_id, count)
@@ -1,26 +1,153 @@
 """Account creation, list, soft-delete; M-PESA callback handling."""
 
-import asyncio
+import base64
+from collections.abc import AsyncIterator
 from decimal import Decimal
-from uuid import UUID
+from uuid import UUID, uuid4
 
-from sqlalchemy import select
+from sqlalchemy import CTE, Numeric, Select, String, any_, bindparam, exists, insert, literal, select
+from sqlalchemy.dialects.postgresql import ARRAY, Insert, insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.events.publisher import get_event_publisher
+from app.events.outbox import enqueue_event, enqueue_events
 from app.models.account import Account
 from app.models.payment_reference import PaymentReference
-from app.schemas.account import AccountCreate, AccountCreateResponse, AccountListItem
-from app.services.account_number import generate_account_number
+from app.models.payment_trans_id import PaymentTransId
+from app.config import get_settings
+from app.db.session import async_session_factory
+from app.schemas.account import AccountBulkItem, AccountCreate, AccountCreateResponse, AccountListItem, AccountPage
+from app.services.account_cache import CachedAccount, get_account_cache
+from app.services.recent_payments import get_recent_trans_ids
+from app.services.account_number import format_account_number, generate_account_number, reserve_account_numbers
+
+# Rows per multi-row INSERT (6 columns each, well under Postgres' 32767 bind parameter limit)
+BULK_INSERT_CHUNK = 1000
+# Rows fetched per round trip from the server-side cursor when streaming a wallet's accounts
+STREAM_FETCH_SIZE = 1000
+
+
+def encode_cursor(wallet_id: UUID, sequence_no: int) -> str:
+    """Opaque page cursor: the last sequence_no returned, bound to its wallet."""
+    return base64.urlsafe_b64encode(f"{wallet_id.hex}:{sequence_no}".encode()).rstrip(b"=").decode()
+
+
+def decode_cursor(wallet_id: UUID, cursor: str) -> int:
+    """Return the sequence_no to continue after. Raises ValueError if the cursor is malformed or from another wallet."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        wallet_hex, sequence_no = raw.split(":")
+        if wallet_hex == wallet_id.hex:
+            return int(sequence_no)
+    except ValueError:
+        pass
+    raise ValueError("Invalid cursor")
+
+
+# Outcomes of record_payment_and_emit_credit
+PAYMENT_RECORDED = "recorded"
+PAYMENT_DUPLICATE = "duplicate"
+PAYMENT_ACCOUNT_NOT_FOUND = "account_not_found"
+
+
+def _record_payment_stmt(trans_id: str, account_no: str, amount: Decimal) -> Select:
+    """
+    Look the account up and, if it is active, claim the TransID and insert the PaymentReference in one statement:
+
+        WITH acct AS (SELECT id, account_no, is_active FROM accounts WHERE account_no = :no),
+             claim AS (INSERT INTO payment_trans_ids (trans_id) SELECT :trans_id FROM acct WHERE is_active
+                       ON CONFLICT (trans_id) DO NOTHING RETURNING trans_id),
+             ins AS (INSERT INTO payment_references (trans_id, account_no, amount)
+                     SELECT trans_id, :no, :amount FROM claim RETURNING trans_id)
+        SELECT (SELECT id FROM acct) AS account_id, EXISTS (SELECT FROM acct WHERE is_active) AS account_found,
+               EXISTS (SELECT FROM ins) AS inserted
+    """
+    acct = (
+        select(Account.id, Account.account_no, Account.is_active)
+        .where(Account.account_no == account_no)
+        .cte("acct")
+    )
+    claim = (
+        pg_insert(PaymentTransId)
+        .from_select(["trans_id"], select(literal(trans_id, String)).where(acct.c.is_active.is_(True)))
+        .on_conflict_do_nothing(index_elements=[PaymentTransId.trans_id])
+        .returning(PaymentTransId.trans_id)
+        .cte("claim")
+    )
+    ins = _insert_claimed(claim, account_no, amount).cte("ins")
+    return select(
+        select(acct.c.id).scalar_subquery().label("account_id"),
+        exists(acct.select().where(acct.c.is_active.is_(True))).label("account_found"),
+        exists(ins.select()).label("inserted"),
+    )
+
+
+def _insert_payment_stmt(trans_id: str, account_no: str, amount: Decimal) -> Insert:
+    """Claim the TransID and insert the PaymentReference, for an account the cache already knows is active."""
+    claim = (
+        pg_insert(PaymentTransId)
+        .values(trans_id=trans_id)
+        .on_conflict_do_nothing(index_elements=[PaymentTransId.trans_id])
+        .returning(PaymentTransId.trans_id)
+        .cte("claim")
+    )
+    return _insert_claimed(claim, account_no, amount)
+
+
+def _insert_claimed(claim: CTE, account_no: str, amount: Decimal) -> Insert:
+    # payment_trans_ids decides duplicates; payment_references (partitioned) takes only newly claimed TransIDs
+    return (
+        pg_insert(PaymentReference)
+        .from_select(
+            ["trans_id", "account_no", "amount"],
+            select(claim.c.trans_id, literal(account_no, String), literal(amount, Numeric(18, 2))),
+        )
+        .returning(PaymentReference.trans_id)
+    )
+
+
+def _list_query(wallet_id: UUID, after: int) -> Select:
+    # Plain columns rather than ORM entities: no identity map, and walks ix_accounts_wallet_id_sequence_no in order
+    return (
+        select(
+            Account.id,
+            Account.wallet_id,
+            Account.fullname,
+            Account.account_no,
+            Account.sequence_no,
+            Account.is_active,
+        )
+        .where(Account.wallet_id == wallet_id)
+        .where(Account.sequence_no > after)
+        .order_by(Account.sequence_no)
+    )
+
+
+def recently_recorded(trans_id: str, account_no: str) -> bool:
+    """
+    Whether a callback can be answered "Already processed" from memory: its TransID was recently recorded and
+    its account is cached as active. An unknown or inactive account always gets the database's answer.
+    """
+    recent = get_recent_trans_ids()
+    if recent is None:
+        return False
+    cache = get_account_cache()
+    cached = cache.get(account_no) if cache is not None else None
+    return cached is not None and cached.is_active and recent.seen(trans_id)
+
+
+def _invalidate_cached(account_no: str) -> None:
+    cache = get_account_cache()
+    if cache is not None:
+        cache.invalidate(account_no)
 
 
 class AccountService:
     def __init__(self, session: AsyncSession):
         self.session = session
 
-    async def _publish(self, event_type: str, payload: dict) -> None:
-        pub = get_event_publisher()
-        await asyncio.to_thread(pub.publish, event_type, payload)
+    def _publish(self, event_type: str, payload: dict) -> None:
+        # Outbox row in this transaction; the relay publishes it after commit
+        enqueue_event(self.session, event_type, payload)
 
     async def create_account(self, data: AccountCreate) -> AccountCreateResponse:
         account_no, sequence_no = await generate_account_number(self.session, data.wallet_id)
@@ -35,7 +162,8 @@ class AccountService:
         await self.session.flush()
         await self.session.refresh(account)
 
-        await self._publish("account.created", {
+        _invalidate_cached(account.account_no)
+        self._publish("account.created", {
             "account_id": str(account.id),
             "wallet_id": str(account.wallet_id),
             "fullname": account.fullname,
@@ -49,12 +177,63 @@ class AccountService:
             account_no=account.account_no,
         )
 
-    async def list_by_wallet(self, wallet_id: UUID) -> list[AccountListItem]:
-        result = await self.session.execute(
-            select(Account).where(Account.wallet_id == wallet_id).order_by(Account.sequence_no)
+    async def create_accounts_bulk(self, wallet_id: UUID, fullnames: list[str]) -> list[AccountBulkItem]:
+        """
+        Create one account per fullname from a single contiguous sequence range.
+        Returns the accounts in input order. Raises ValueError if wallet_id is not in WalletRegistry.
+        """
+        prefix, first_seq = await reserve_account_numbers(self.session, wallet_id, len(fullnames))
+        padding = get_settings().account_no_padding
+        rows = [
+            {
+                "id": uuid4(),
+                "wallet_id": wallet_id,
+                "fullname": fullname,
+                "account_no": format_account_number(prefix, first_seq + i, padding),
+                "sequence_no": first_seq + i,
+                "is_active": True,
+            }
+            for i, fullname in enumerate(fullnames)
+        ]
+        for start in range(0, len(rows), BULK_INSERT_CHUNK):
+            await self.session.execute(insert(Account).values(rows[start:start + BULK_INSERT_CHUNK]))
+
+        payloads = [
+            {
+                "account_id": str(row["id"]),
+                "wallet_id": str(wallet_id),
+                "fullname": row["fullname"],
+                "account_no": row["account_no"],
+            }
+            for row in rows
+        ]
+        await enqueue_events(self.session, "account.created", payloads)
+        for row in rows:
+            _invalidate_cached(row["account_no"])
+
+        return [AccountBulkItem(id=row["id"], fullname=row["fullname"], account_no=row["account_no"]) for row in rows]
+
+    async def list_by_wallet(self, wallet_id: UUID, *, limit: int | None = None, after: int = 0) -> AccountPage:
+        """
+        One page of a wallet's accounts in sequence order, starting after sequence_no `after`.
+        Without a limit the page holds every remaining account and has no next_cursor.
+        """
+        query = _list_query(wallet_id, after)
+        if limit is None:
+            rows = (await self.session.execute(query)).all()
+            return AccountPage(items=[AccountListItem.model_validate(r) for r in rows])
+        rows = (await self.session.execute(query.limit(limit + 1))).all()
+        items = [AccountListItem.model_validate(r) for r in rows[:limit]]
+        next_cursor = encode_cursor(wallet_id, items[-1].sequence_no) if len(rows) > limit else None
+        return AccountPage(items=items, next_cursor=next_cursor)
+
+    async def stream_by_wallet(self, wallet_id: UUID, *, after: int = 0) -> AsyncIterator[bytes]:
+        """NDJSON chunks of all the wallet's accounts, read through a server-side cursor STREAM_FETCH_SIZE rows at a time."""
+        result = await self.session.stream(
+            _list_query(wallet_id, after).execution_options(yield_per=STREAM_FETCH_SIZE)
         )
-        accounts = result.scalars().all()
-        return [AccountListItem.model_validate(a) for a in accounts]
+        async for rows in result.partitions():
+            yield b"".join(AccountListItem.model_validate(r).model_dump_json().encode() + b"\n" for r in rows)
 
     async def soft_delete(self, account_id: UUID) -> Account | None:
         result = await self.session.execute(
@@ -66,6 +245,13 @@ class AccountService:
         account.is_active = False
         await self.session.flush()
         await self.session.refresh(account)
+        _invalidate_cached(account.account_no)
+        # Other replicas drop the account from their caches when this reaches them
+        self._publish("account.deleted", {
+            "account_id": str(account.id),
+            "wallet_id": str(account.wallet_id),
+            "account_no": account.account_no,
+        })
         return account
 
     async def record_payment_and_emit_credit(
@@ -73,21 +259,114 @@ class AccountService:
         trans_id: str,
         account_no: str,
         amount: Decimal,
-    ) -> bool:
-        """Idempotent: if trans_id exists, return False (already processed). Else insert and return True."""
-        existing = await self.session.execute(
-            select(PaymentReference).where(PaymentReference.trans_id == trans_id)
-        )
-        if existing.scalar_one_or_none():
-            return False
-
-        ref = PaymentReference(trans_id=trans_id, account_no=account_no, amount=amount)
-        self.session.add(ref)
-        await self.session.flush()
-
-        await self._publish("ledger.credit.requested", {
+    ) -> str:
+        """
+        Idempotent: record trans_id against an active account and emit ledger.credit.requested.
+        Returns PAYMENT_RECORDED, PAYMENT_DUPLICATE (trans_id already recorded) or PAYMENT_ACCOUNT_NOT_FOUND.
+        With the account cache, a known-active account skips the accounts lookup and an inactive one is
+        answered without touching the database, and so is a TransID this process has recently seen
+        recorded for a known-active account.
+        """
+        cache = get_account_cache()
+        cached = cache.get(account_no) if cache is not None else None
+        if cached is not None and not cached.is_active:
+            return PAYMENT_ACCOUNT_NOT_FOUND
+        recent = get_recent_trans_ids()
+        # The account is checked first, as without the caches: a recent TransID is only answered from memory
+        # for an account known to be active, otherwise the statement below decides
+        if cached is not None and recent is not None and recent.seen(trans_id):
+            return PAYMENT_DUPLICATE
+        if cached is None:
+            row = (await self.session.execute(_record_payment_stmt(trans_id, account_no, amount))).one()
+            if cache is not None:
+                cache.put(account_no, CachedAccount(row.account_id, row.account_found))
+            if not row.account_found:
+                return PAYMENT_ACCOUNT_NOT_FOUND
+            inserted = row.inserted
+        else:
+            inserted = (await self.session.execute(_insert_payment_stmt(trans_id, account_no, amount))).first() is not None
+        if not inserted:
+            if recent is not None:
+                recent.add(trans_id)
+            return PAYMENT_DUPLICATE
+        if recent is not None:
+            recent.add_after_commit(self.session, trans_id)
+        self._publish("ledger.credit.requested", {
             "trans_id": trans_id,
             "account_no": account_no,
             "amount": str(amount),
         })
-        return True
+        return PAYMENT_RECORDED
+
+    async def record_payments_bulk(self, payments: list[tuple[str, str, Decimal]]) -> list[str]:
+        """
+        record_payment_and_emit_credit for many (trans_id, account_no, amount): one lookup of the distinct
+        account numbers, multi-row INSERT ... ON CONFLICT DO NOTHING claiming the TransIDs, then the
+        PaymentReferences and ledger.credit.requested for the claimed ones only. Returns an outcome per payment,
+        in order; a trans_id repeated within the batch is recorded once and reported as a duplicate after that.
+        """
+        account_nos = list({account_no for _, account_no, _ in payments})
+        active = set(
+            (
+                await self.session.execute(
+                    select(Account.account_no)
+                    .where(Account.account_no == any_(bindparam("account_nos", account_nos, type_=ARRAY(String))))
+                    .where(Account.is_active.is_(True))
+                )
+            ).scalars()
+        )
+
+        recent = get_recent_trans_ids()
+        outcomes: list[str] = [PAYMENT_DUPLICATE] * len(payments)
+        first_index: dict[str, int] = {}
+        rows = []
+        for i, (trans_id, account_no, amount) in enumerate(payments):
+            if account_no not in active:
+                outcomes[i] = PAYMENT_ACCOUNT_NOT_FOUND
+            elif trans_id not in first_index and (recent is None or not recent.seen(trans_id)):
+                first_index[trans_id] = i
+                rows.append({"trans_id": trans_id, "account_no": account_no, "amount": amount})
+
+        inserted: set[str] = set()
+        for start in range(0, len(rows), BULK_INSERT_CHUNK):
+            chunk = rows[start:start + BULK_INSERT_CHUNK]
+            claimed = set(
+                (
+                    await self.session.execute(
+                        pg_insert(PaymentTransId)
+                        .values([{"trans_id": row["trans_id"]} for row in chunk])
+                        .on_conflict_do_nothing(index_elements=[PaymentTransId.trans_id])
+                        .returning(PaymentTransId.trans_id)
+                    )
+                ).scalars()
+            )
+            if claimed:
+                await self.session.execute(
+                    insert(PaymentReference).values([row for row in chunk if row["trans_id"] in claimed])
+                )
+            inserted |= claimed
+
+        payloads = []
+        for row in rows:
+            trans_id = row["trans_id"]
+            if trans_id not in inserted:
+                if recent is not None:
+                    recent.add(trans_id)
+                continue
+            outcomes[first_index[trans_id]] = PAYMENT_RECORDED
+            payloads.append({"trans_id": trans_id, "account_no": row["account_no"], "amount": str(row["amount"])})
+            if recent is not None:
+                recent.add_after_commit(self.session, trans_id)
+        if payloads:
+            await enqueue_events(self.session, "ledger.credit.requested", payloads)
+        return outcomes
+
+
+async def stream_wallet_accounts(wallet_id: UUID, *, after: int = 0) -> AsyncIterator[bytes]:
+    """
+    stream_by_wallet on a session of its own: a streaming response body is still being read after
+    the request's get_db session has been closed.
+    """
+    async with async_session_factory() as session:
+        async for chunk in AccountService(session).stream_by_wallet(wallet_id, after=after):
+            yield chunk
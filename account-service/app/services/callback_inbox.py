@@ -0,0 +1,243 @@
+"""
+Accept-then-process ingestion for M-PESA callbacks (CALLBACK_INGEST_MODE=staged).
+
+The handler only validates the callback and commits it to the callback_inbox table, so M-PESA gets its
+answer even while the rest of the pipeline is slow. CallbackInboxWorker runs CALLBACK_INBOX_WORKERS
+tasks that each lock a batch of rows (SELECT ... FOR UPDATE SKIP LOCKED), run every row through
+AccountService.record_payment_and_emit_credit in its own savepoint, delete the rows that went through
+and commit: the payment_references rows, their outbox events and the inbox deletes land together.
+A row that fails is kept with attempts + 1 and its error; after CALLBACK_INBOX_MAX_ATTEMPTS it is
+left in the table for an operator. So is a callback for an unknown or inactive account: M-PESA has
+been answered and the money received, so it is parked (attempts set to the maximum) rather than deleted.
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Any
+
+from sqlalchemy import delete, event, func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.db.session import async_session_factory
+from app.metrics import (
+    CALLBACK_INBOX_BACKLOG,
+    CALLBACK_INBOX_DELAY,
+    CALLBACK_INBOX_FAILURES,
+    CALLBACK_INBOX_PROCESSED,
+)
+from app.models.callback_inbox import CallbackInbox
+from app.services.account_service import PAYMENT_ACCOUNT_NOT_FOUND, AccountService
+from app.services.recent_payments import get_recent_trans_ids
+
+logger = logging.getLogger(__name__)
+
+MAX_BACKOFF_SECONDS = 30.0
+MAX_ERROR_LENGTH = 500
+# last_error of a callback parked because its account does not exist or is inactive
+ACCOUNT_NOT_FOUND_ERROR = "account not found"
+# session.info flag: this transaction staged callbacks, wake the workers when it commits
+_STAGED = "callback_inbox_staged"
+
+
+async def stage_callback(
+    session: AsyncSession,
+    trans_id: str,
+    account_no: str,
+    amount: Decimal,
+    payload: dict[str, Any],
+) -> None:
+    """Add the callback to the inbox in the session's transaction; a TransID already staged is ignored."""
+    await session.execute(
+        pg_insert(CallbackInbox)
+        .values(trans_id=trans_id, account_no=account_no, amount=amount, payload=payload)
+        .on_conflict_do_nothing(index_elements=[CallbackInbox.trans_id])
+    )
+    session.info[_STAGED] = True
+
+
+class CallbackInboxWorker:
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        *,
+        workers: int,
+        batch_size: int,
+        poll_interval: float,
+        max_attempts: int,
+        max_backlog: int,
+    ):
+        self._session_factory = session_factory
+        self._workers = workers
+        self._batch_size = batch_size
+        self._poll_interval = poll_interval
+        self._max_attempts = max_attempts
+        self._max_backlog = max_backlog
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._tasks: list[asyncio.Task] = []
+        # Rows waiting to be processed, sampled every poll_interval and counted up to max_backlog
+        self.backlog = 0
+        CALLBACK_INBOX_BACKLOG.set_function(lambda: self.backlog)
+
+    @property
+    def saturated(self) -> bool:
+        """The backlog has reached CALLBACK_INBOX_MAX_BACKLOG; new callbacks should be turned away."""
+        return self.backlog >= self._max_backlog
+
+    def notify(self) -> None:
+        self._wakeup.set()
+
+    async def process_batch(self) -> int:
+        """Lock, record and delete one batch; returns the number of rows taken."""
+        async with self._session_factory() as session:
+            rows = (
+                await session.execute(
+                    select(
+                        CallbackInbox.id,
+                        CallbackInbox.trans_id,
+                        CallbackInbox.account_no,
+                        CallbackInbox.amount,
+                        CallbackInbox.received_at,
+                    )
+                    .where(CallbackInbox.attempts < self._max_attempts)
+                    .order_by(CallbackInbox.id)
+                    .limit(self._batch_size)
+                    # Workers and replicas take disjoint batches
+                    .with_for_update(skip_locked=True)
+                )
+            ).all()
+            if not rows:
+                return 0
+            svc = AccountService(session)
+            recent = get_recent_trans_ids()
+            done: list[int] = []
+            outcomes: list[tuple[str, datetime]] = []
+            for row in rows:
+                try:
+                    async with session.begin_nested():
+                        outcome = await svc.record_payment_and_emit_credit(
+                            trans_id=row.trans_id, account_no=row.account_no, amount=row.amount
+                        )
+                except Exception as e:
+                    if recent is not None:
+                        recent.discard_uncommitted(session, row.trans_id)
+                    error = f"{type(e).__name__}: {e}"[:MAX_ERROR_LENGTH]
+                    logger.warning("Staged callback %s failed: %s", row.trans_id, error)
+                    await session.execute(
+                        update(CallbackInbox)
+                        .where(CallbackInbox.id == row.id)
+                        .values(attempts=CallbackInbox.attempts + 1, last_error=error)
+                    )
+                    CALLBACK_INBOX_FAILURES.inc()
+                    continue
+                if outcome == PAYMENT_ACCOUNT_NOT_FOUND:
+                    # Already acknowledged to M-PESA, so nothing to answer; keep it for an operator to resolve
+                    logger.error(
+                        "Staged callback %s: account %s not found; parked for an operator", row.trans_id, row.account_no
+                    )
+                    await session.execute(
+                        update(CallbackInbox)
+                        .where(CallbackInbox.id == row.id)
+                        .values(attempts=self._max_attempts, last_error=ACCOUNT_NOT_FOUND_ERROR)
+                    )
+                else:
+                    done.append(row.id)
+                outcomes.append((outcome, row.received_at))
+            if done:
+                await session.execute(delete(CallbackInbox).where(CallbackInbox.id.in_(done)))
+            await session.commit()
+
+        now = datetime.now(timezone.utc)
+        for outcome, received_at in outcomes:
+            CALLBACK_INBOX_PROCESSED.labels(outcome).inc()
+            CALLBACK_INBOX_DELAY.observe(max((now - received_at).total_seconds(), 0.0))
+        return len(rows)
+
+    async def sample_backlog(self) -> int:
+        async with self._session_factory() as session:
+            # Counting stops at max_backlog + 1, so a huge backlog costs no more than the threshold
+            pending = (
+                select(CallbackInbox.id)
+                .where(CallbackInbox.attempts < self._max_attempts)
+                .limit(self._max_backlog + 1)
+                .subquery()
+            )
+            self.backlog = (await session.execute(select(func.count()).select_from(pending))).scalar_one()
+        return self.backlog
+
+    async def _work(self) -> None:
+        backoff = self._poll_interval
+        while not self._stopping:
+            self._wakeup.clear()
+            try:
+                taken = await self.process_batch()
+            except Exception as e:
+                logger.warning("Callback inbox batch failed, retrying in %.1fs: %s", backoff, e)
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, MAX_BACKOFF_SECONDS)
+                continue
+            backoff = self._poll_interval
+            if taken < self._batch_size:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self._poll_interval)
+                except TimeoutError:
+                    pass
+
+    async def _sample(self) -> None:
+        while not self._stopping:
+            try:
+                await self.sample_backlog()
+            except Exception as e:
+                logger.warning("Could not sample the callback inbox backlog: %r", e)
+            await asyncio.sleep(self._poll_interval)
+
+    def start(self) -> None:
+        if not self._tasks:
+            self._stopping = False
+            self._tasks = [asyncio.create_task(self._work()) for _ in range(self._workers)]
+            self._tasks.append(asyncio.create_task(self._sample()))
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        """Let the current batches finish (up to timeout), then stop; unfinished batches roll back and stay staged."""
+        if not self._tasks:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        _, pending = await asyncio.wait(self._tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        self._tasks = []
+
+
+_worker: CallbackInboxWorker | None = None
+
+
+def get_callback_inbox_worker() -> CallbackInboxWorker:
+    global _worker
+    if _worker is None:
+        settings = get_settings()
+        _worker = CallbackInboxWorker(
+            async_session_factory,
+            workers=settings.callback_inbox_workers,
+            batch_size=settings.callback_inbox_batch_size,
+            poll_interval=settings.callback_inbox_poll_interval_seconds,
+            max_attempts=settings.callback_inbox_max_attempts,
+            max_backlog=settings.callback_inbox_max_backlog,
+        )
+    return _worker
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_workers(session: Session) -> None:
+    if session.info.pop(_STAGED, False) and _worker is not None:
+        _worker.notify()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_staged(session: Session) -> None:
+    session.info.pop(_STAGED, None)
@@ -0,0 +1,269 @@
+"""
+Partition maintenance for payment_references (range-partitioned by month on received_at, see migration 006).
+
+PaymentPartitionMaintainer runs every PAYMENT_PARTITION_MAINTENANCE_INTERVAL_SECONDS. Each run:
+  - creates the partitions payment_references_YYYY_MM for this month and PAYMENT_PARTITIONS_AHEAD_MONTHS ahead.
+    Inserts for a month without one land in payment_references_default (migration 007); creating the month
+    moves them out of it;
+  - logs an error when no partition reaches past the current month or the default partition holds rows, and
+    exports the end of the furthest partition so an alert can fire even when maintenance stops running;
+  - detaches the partitions wholly older than PAYMENT_RETENTION_MONTHS, and drops them with
+    PAYMENT_PARTITION_ARCHIVE=drop. Detached tables keep their name, ready to be dumped and dropped by hand.
+    Postgres refuses DETACH ... CONCURRENTLY next to a default partition, so with one the detach is plain:
+    a catalog-only change under a brief exclusive lock on payment_references, bounded by DETACH_LOCK_TIMEOUT;
+  - prunes payment_trans_ids, the TransID claims, older than PAYMENT_DEDUP_WINDOW_DAYS.
+
+Replicas take a Postgres advisory lock, so only one of them runs it at a time.
+"""
+
+import asyncio
+import logging
+import re
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import delete, select, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession, async_sessionmaker
+
+from app.config import get_settings
+from app.db.session import async_session_factory
+from app.metrics import (
+    PAYMENT_PARTITION_DEFAULT_ROWS,
+    PAYMENT_PARTITION_HORIZON,
+    PAYMENT_PARTITIONS,
+    PAYMENT_PARTITIONS_DETACHED,
+    PAYMENT_TRANS_IDS_PRUNED,
+)
+from app.models.payment_trans_id import PaymentTransId
+
+logger = logging.getLogger(__name__)
+
+PARENT = "payment_references"
+_PARTITION_NAME = re.compile(rf"^{PARENT}_(\d{{4}})_(\d{{2}})$")
+# Catches inserts for months without a partition; never detached
+DEFAULT_PARTITION = f"{PARENT}_default"
+# pg_try_advisory_lock key shared by all replicas
+LOCK_KEY = 0x7061_7974_7270  # "paytrp"
+# Longest wait for the exclusive lock of a plain DETACH; a run that times out retries on the next one
+DETACH_LOCK_TIMEOUT = "5s"
+# Rows per DELETE when pruning payment_trans_ids, each in its own transaction
+PRUNE_BATCH = 10_000
+
+
+def add_months(month: date, months: int) -> date:
+    """First day of the month `months` after (or before) the month of `month`."""
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT}_{month.year:04d}_{month.month:02d}"
+
+
+def partition_months(names) -> list[date]:
+    """The months of the monthly partitions among `names`, in order; other tables are ignored."""
+    return sorted(date(int(m[1]), int(m[2]), 1) for m in map(_PARTITION_NAME.match, names) if m is not None)
+
+
+def _bound(month: date) -> str:
+    return f"{month.isoformat()} 00:00:00+00"
+
+
+class PaymentPartitionMaintainer:
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        *,
+        months_ahead: int,
+        retention_months: int,
+        archive: str,
+        dedup_window: timedelta,
+        interval: float,
+    ):
+        self._session_factory = session_factory
+        self._months_ahead = months_ahead
+        self._retention_months = retention_months
+        self._archive = archive
+        self._dedup_window = dedup_window
+        self._interval = interval
+        self._task: asyncio.Task | None = None
+
+    async def run_once(self, now: datetime | None = None) -> bool:
+        """One maintenance pass. Returns False if another replica holds the lock."""
+        now = now or datetime.now(timezone.utc)
+        this_month = date(now.year, now.month, 1)
+        async with self._session_factory() as session:
+            # DETACH ... CONCURRENTLY cannot run inside a transaction block
+            conn = await session.connection(execution_options={"isolation_level": "AUTOCOMMIT"})
+            if not (await conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": LOCK_KEY})).scalar_one():
+                return False
+            try:
+                try:
+                    await self._create_ahead(conn, this_month)
+                finally:
+                    # Also after a failed create: that is when the horizon runs short
+                    await self._check_horizon(conn, this_month)
+                await self._detach_expired(conn, add_months(this_month, -self._retention_months))
+                await self._prune_trans_ids(conn, now - self._dedup_window)
+            finally:
+                await conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": LOCK_KEY})
+        return True
+
+    async def _attached(self, conn: AsyncConnection) -> dict[str, bool]:
+        """Attached partitions: name -> detach pending (an interrupted DETACH ... CONCURRENTLY)."""
+        rows = await conn.execute(
+            text(
+                "SELECT c.relname, i.inhdetachpending FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = CAST(:parent AS regclass)"
+            ),
+            {"parent": PARENT},
+        )
+        return dict(rows.tuples().all())
+
+    async def _create_ahead(self, conn: AsyncConnection, this_month: date) -> None:
+        attached = await self._attached(conn)
+        for i in range(self._months_ahead + 1):
+            month = add_months(this_month, i)
+            name = partition_name(month)
+            if name in attached:
+                continue
+            # Bounds in UTC; identifiers are generated here, never taken from input
+            lower, upper = _bound(month), _bound(add_months(month, 1))
+            if DEFAULT_PARTITION in attached and await self._in_default(conn, month):
+                # The new partition's range may not overlap rows in the default: build it standalone with those
+                # rows, then attach it, all in one statement (and so one transaction)
+                await conn.execute(
+                    text(
+                        f"""
+                        DO $$
+                        BEGIN
+                            CREATE TABLE {name} (LIKE {PARENT} INCLUDING DEFAULTS);
+                            WITH moved AS (
+                                DELETE FROM {DEFAULT_PARTITION}
+                                WHERE received_at >= '{lower}' AND received_at < '{upper}' RETURNING *
+                            )
+                            INSERT INTO {name} SELECT * FROM moved;
+                            ALTER TABLE {PARENT} ATTACH PARTITION {name} FOR VALUES FROM ('{lower}') TO ('{upper}');
+                        END $$
+                        """
+                    )
+                )
+                logger.warning("Created partition %s and moved its payments out of %s", name, DEFAULT_PARTITION)
+                continue
+            await conn.execute(
+                text(
+                    f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {PARENT} "
+                    f"FOR VALUES FROM ('{lower}') TO ('{upper}')"
+                )
+            )
+            logger.info("Created partition %s", name)
+
+    async def _in_default(self, conn: AsyncConnection, month: date) -> bool:
+        """Whether the default partition holds payments received in `month`."""
+        lower = datetime(month.year, month.month, 1, tzinfo=timezone.utc)
+        next_month = add_months(month, 1)
+        upper = datetime(next_month.year, next_month.month, 1, tzinfo=timezone.utc)
+        return (
+            await conn.execute(
+                text(
+                    f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} "
+                    "WHERE received_at >= :lower AND received_at < :upper)"
+                ),
+                {"lower": lower, "upper": upper},
+            )
+        ).scalar_one()
+
+    async def _check_horizon(self, conn: AsyncConnection, this_month: date) -> None:
+        """Export where the furthest partition ends; log an error if that is this month or the default holds rows."""
+        attached = await self._attached(conn)
+        months = partition_months(attached)
+        horizon = add_months(months[-1], 1) if months else this_month
+        PAYMENT_PARTITION_HORIZON.set(datetime(horizon.year, horizon.month, 1, tzinfo=timezone.utc).timestamp())
+        if horizon <= add_months(this_month, 1):
+            logger.error(
+                "No %s partition beyond %s; next month's payments will go to %s until maintenance catches up",
+                PARENT,
+                this_month.strftime("%Y-%m"),
+                DEFAULT_PARTITION,
+            )
+        if DEFAULT_PARTITION in attached:
+            stray = (await conn.execute(text(f"SELECT count(*) FROM {DEFAULT_PARTITION}"))).scalar_one()
+            PAYMENT_PARTITION_DEFAULT_ROWS.set(stray)
+            if stray:
+                logger.error("%d payments are in %s, outside any monthly partition", stray, DEFAULT_PARTITION)
+
+    async def _detach_expired(self, conn: AsyncConnection, cutoff: date) -> None:
+        """Detach the partitions whose whole month is before cutoff."""
+        attached = await self._attached(conn)
+        for name, pending in sorted(attached.items()):
+            match = _PARTITION_NAME.match(name)
+            if match is None or add_months(date(int(match[1]), int(match[2]), 1), 1) > cutoff:
+                continue
+            if pending or DEFAULT_PARTITION not in attached:
+                mode = "FINALIZE" if pending else "CONCURRENTLY"
+                await conn.execute(text(f"ALTER TABLE {PARENT} DETACH PARTITION {name} {mode}"))
+            else:
+                await conn.execute(text(f"SET lock_timeout = '{DETACH_LOCK_TIMEOUT}'"))
+                try:
+                    await conn.execute(text(f"ALTER TABLE {PARENT} DETACH PARTITION {name}"))
+                finally:
+                    await conn.execute(text("RESET lock_timeout"))
+            PAYMENT_PARTITIONS_DETACHED.inc()
+            if self._archive == "drop":
+                await conn.execute(text(f"DROP TABLE {name}"))
+                logger.info("Detached and dropped partition %s", name)
+            else:
+                logger.info("Detached partition %s; archive and drop it when done", name)
+        PAYMENT_PARTITIONS.set(len(partition_months(await self._attached(conn))))
+
+    async def _prune_trans_ids(self, conn: AsyncConnection, before: datetime) -> None:
+        while True:
+            expired = (
+                select(PaymentTransId.trans_id)
+                .where(PaymentTransId.received_at < before)
+                .limit(PRUNE_BATCH)
+                .scalar_subquery()
+            )
+            result = await conn.execute(delete(PaymentTransId).where(PaymentTransId.trans_id.in_(expired)))
+            PAYMENT_TRANS_IDS_PRUNED.inc(result.rowcount)
+            if result.rowcount < PRUNE_BATCH:
+                return
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.warning("Payment partition maintenance failed, retrying in %.0fs: %s", self._interval, e)
+            await asyncio.sleep(self._interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+_maintainer: PaymentPartitionMaintainer | None = None
+
+
+def get_payment_partition_maintainer() -> PaymentPartitionMaintainer:
+    global _maintainer
+    if _maintainer is None:
+        settings = get_settings()
+        _maintainer = PaymentPartitionMaintainer(
+            async_session_factory,
+            months_ahead=settings.payment_partitions_ahead_months,
+            retention_months=settings.payment_retention_months,
+            archive=settings.payment_partition_archive,
+            dedup_window=timedelta(days=settings.payment_dedup_window_days),
+            interval=settings.payment_partition_maintenance_interval_seconds,
+        )
+    return _maintainer
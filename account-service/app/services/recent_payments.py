@@ -0,0 +1,120 @@
+"""
+In-process record of recently processed M-PESA TransIDs, so retried callbacks are answered
+"Already processed" without a transaction.
+
+Only confirmed TransIDs go in: ones this process recorded, added when the recording transaction
+commits, and ones the callback statement found already recorded. Anything not in the set
+falls through to the database. The set is a bounded LRU of TRANS_ID_CACHE_MAX_SIZE entries,
+warmed at startup from the last TRANS_ID_CACHE_WARM_HOURS of payment_references.
+"""
+
+import logging
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.metrics import TRANS_ID_CACHE_LOOKUPS, TRANS_ID_CACHE_SIZE
+from app.models.payment_reference import PaymentReference
+
+logger = logging.getLogger(__name__)
+
+# session.info key: TransIDs this transaction recorded, added to the set once it commits
+_RECORDED = "recorded_trans_ids"
+
+
+class RecentTransIds:
+    def __init__(self, max_size: int):
+        self._max_size = max_size
+        self._ids: OrderedDict[str, None] = OrderedDict()
+        TRANS_ID_CACHE_SIZE.set_function(self.__len__)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def seen(self, trans_id: str) -> bool:
+        if trans_id in self._ids:
+            self._ids.move_to_end(trans_id)
+            TRANS_ID_CACHE_LOOKUPS.labels("hit").inc()
+            return True
+        TRANS_ID_CACHE_LOOKUPS.labels("miss").inc()
+        return False
+
+    def add(self, trans_id: str) -> None:
+        self._ids[trans_id] = None
+        self._ids.move_to_end(trans_id)
+        if len(self._ids) > self._max_size:
+            self._ids.popitem(last=False)
+
+    def add_after_commit(self, session: AsyncSession, trans_id: str) -> None:
+        """Add trans_id once the session's transaction commits; a rollback discards it."""
+        session.info.setdefault(_RECORDED, []).append(trans_id)
+
+    def discard_uncommitted(self, session: AsyncSession, trans_id: str) -> None:
+        """Undo add_after_commit after a savepoint rolled back (only the whole transaction's rollback clears it)."""
+        pending = session.info.get(_RECORDED)
+        if pending and trans_id in pending:
+            pending.remove(trans_id)
+
+    async def warm(self, session_factory: async_sessionmaker[AsyncSession], hours: float) -> int:
+        """Load the most recent TransIDs (up to max_size) from the last `hours`; returns how many were added."""
+        since = datetime.now(timezone.utc) - timedelta(hours=hours)
+        async with session_factory() as session:
+            result = await session.stream_scalars(
+                select(PaymentReference.trans_id)
+                .where(PaymentReference.received_at >= since)
+                .order_by(PaymentReference.received_at.desc())
+                .limit(self._max_size)
+                .execution_options(yield_per=10_000)
+            )
+            newest_first = [trans_id async for trans_id in result]
+        # Oldest first, so the newest end up most recently used; anything recorded meanwhile stays newer
+        warmed = OrderedDict.fromkeys(reversed(newest_first))
+        warmed.update(self._ids)
+        while len(warmed) > self._max_size:
+            warmed.popitem(last=False)
+        self._ids = warmed
+        return len(newest_first)
+
+
+_recent: RecentTransIds | None = None
+
+
+def get_recent_trans_ids() -> RecentTransIds | None:
+    """The process-wide set, or None when TRANS_ID_CACHE_ENABLED is off."""
+    global _recent
+    settings = get_settings()
+    if not settings.trans_id_cache_enabled:
+        return None
+    if _recent is None:
+        _recent = RecentTransIds(settings.trans_id_cache_max_size)
+    return _recent
+
+
+async def warm_recent_trans_ids(session_factory: async_sessionmaker[AsyncSession]) -> None:
+    """Startup task: warm the set from payment_references. Failures only cost the warm start."""
+    recent = get_recent_trans_ids()
+    if recent is None:
+        return
+    try:
+        count = await recent.warm(session_factory, get_settings().trans_id_cache_warm_hours)
+    except Exception as e:
+        logger.warning("Could not warm the TransID cache: %r", e)
+        return
+    logger.info("TransID cache warmed with %d recent payments", count)
+
+
+@event.listens_for(Session, "after_commit")
+def _add_recorded(session: Session) -> None:
+    trans_ids = session.info.pop(_RECORDED, None)
+    if trans_ids and _recent is not None:
+        for trans_id in trans_ids:
+            _recent.add(trans_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_recorded(session: Session) -> None:
+    session.info.pop(_RECORDED, None)
@@ -0,0 +1,104 @@
+"""
+Account creation throughput for one busy wallet: row-locked (gapless) numbering vs hi/lo blocks.
+
+Each simulated request opens a session, takes an account number, inserts the account, then holds its
+transaction open for --hold-ms (standing in for the event publish and the rest of the request) before
+committing. With the row lock that hold serializes every request on the wallet_registry row; with
+blocks only the occasional reservation touches it.
+
+Needs a migrated database (alembic upgrade head) at DATABASE_URL; creates and removes its own wallet.
+
+    cd account-service && python benchmarks/account_number_contention.py --requests 500 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import delete, select  # noqa: E402
+
+from app.config import get_settings  # noqa: E402
+from app.db.session import async_session_factory  # noqa: E402
+from app.models import Account, WalletRegistry  # noqa: E402
+from app.services.account_number import AccountNumberAllocator, _generate_locked  # noqa: E402
+
+
+async def run(policy: str, requests: int, concurrency: int, hold: float, block_size: int) -> dict:
+    wallet_id = uuid.uuid4()
+    padding = get_settings().account_no_padding
+    async with async_session_factory() as session:
+        session.add(WalletRegistry(wallet_id=wallet_id, company_id=uuid.uuid4(), company_account_prefix="999", sequence_no=0))
+        await session.commit()
+
+    allocator = AccountNumberAllocator(async_session_factory, block_size=block_size, padding=padding)
+    latencies: list[float] = []
+    remaining = requests
+
+    async def create(i: int) -> None:
+        started = time.perf_counter()
+        async with async_session_factory() as session:
+            if policy == "gapless":
+                account_no, seq = await _generate_locked(session, wallet_id, padding)
+            else:
+                account_no, seq = await allocator.allocate(wallet_id)
+            session.add(Account(wallet_id=wallet_id, fullname=f"Bench {i}", account_no=account_no, sequence_no=seq))
+            await session.flush()
+            await asyncio.sleep(hold)
+            await session.commit()
+        latencies.append(time.perf_counter() - started)
+
+    async def worker() -> None:
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            await create(remaining)
+
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        await allocator.close()
+        async with async_session_factory() as session:
+            seqs = (await session.execute(select(Account.sequence_no).where(Account.wallet_id == wallet_id))).scalars().all()
+    finally:
+        async with async_session_factory() as session:
+            await session.execute(delete(Account).where(Account.wallet_id == wallet_id))
+            await session.execute(delete(WalletRegistry).where(WalletRegistry.wallet_id == wallet_id))
+            await session.commit()
+
+    ms = sorted(x * 1000 for x in latencies)
+    q = statistics.quantiles(ms, n=100, method="inclusive")
+    return {
+        "accounts_per_s": round(len(seqs) / elapsed, 1),
+        "p50_ms": round(q[49], 1),
+        "p99_ms": round(q[98], 1),
+        "unique": len(set(seqs)) == len(seqs) == requests,
+        "gaps": max(seqs) - len(seqs),
+    }
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    print(f"{'policy':<18} {'accounts/s':>11} {'p50 ms':>8} {'p99 ms':>8} {'unique':>7} {'gaps':>5}")
+    for policy in ("gapless", "block"):
+        r = await run(policy, args.requests, args.concurrency, args.hold_ms / 1000, args.block_size)
+        label = policy if policy == "gapless" else f"block (size {args.block_size})"
+        print(f"{label:<18} {r['accounts_per_s']:>11} {r['p50_ms']:>8} {r['p99_ms']:>8} {str(r['unique']):>7} {r['gaps']:>5}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--hold-ms", type=float, default=5.0)
+    parser.add_argument("--block-size", type=int, default=get_settings().account_no_block_size)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
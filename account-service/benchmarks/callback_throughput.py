@@ -0,0 +1,177 @@
+"""
+M-PESA callback throughput: the previous three-round-trip path vs the single INSERT ... SELECT ... ON CONFLICT statement.
+
+Both variants run the callback's database work in its own session, the way POST /callbacks/mpesa does,
+with the ledger.credit.requested publish replaced by a --publish-ms sleep:
+  three-step    SELECT the account, SELECT the PaymentReference, INSERT both rows + flush, publish, then commit
+  single        one statement (as AccountService.record_payment_and_emit_credit), commit, then publish
+  outbox        one statement plus the outbox row, commit; no broker call (the current request path)
+--duplicate-ratio of the callbacks repeat an earlier TransID (M-PESA retries).
+
+Needs a migrated database (alembic upgrade head) at DATABASE_URL; creates and removes its own wallet and accounts.
+Stop account-service (or set OUTBOX_RELAY_ENABLED=false) so its relay doesn't publish the benchmark's outbox rows.
+
+    cd account-service && python benchmarks/callback_throughput.py --requests 5000 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+import uuid
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import delete, select  # noqa: E402
+from sqlalchemy.exc import IntegrityError  # noqa: E402
+
+from app.db.session import async_session_factory  # noqa: E402
+from app.events.outbox import enqueue_event  # noqa: E402
+from app.models import Account, OutboxEvent, PaymentReference, PaymentTransId, WalletRegistry  # noqa: E402
+from app.services.account_service import (  # noqa: E402
+    PAYMENT_ACCOUNT_NOT_FOUND,
+    PAYMENT_DUPLICATE,
+    PAYMENT_RECORDED,
+    _record_payment_stmt,
+)
+
+ACCOUNTS = 100
+
+
+async def three_step(trans_id: str, account_no: str, amount: Decimal, publish: float) -> str:
+    async with async_session_factory() as session:
+        r = await session.execute(
+            select(Account).where(Account.account_no == account_no).where(Account.is_active.is_(True))
+        )
+        if not r.scalar_one_or_none():
+            return PAYMENT_ACCOUNT_NOT_FOUND
+        existing = await session.execute(select(PaymentReference).where(PaymentReference.trans_id == trans_id))
+        if existing.scalar_one_or_none():
+            return PAYMENT_DUPLICATE
+        session.add(PaymentTransId(trans_id=trans_id))
+        session.add(PaymentReference(trans_id=trans_id, account_no=account_no, amount=amount))
+        await session.flush()
+        await asyncio.sleep(publish)
+        await session.commit()
+        return PAYMENT_RECORDED
+
+
+async def single(trans_id: str, account_no: str, amount: Decimal, publish: float) -> str:
+    async with async_session_factory() as session:
+        row = (await session.execute(_record_payment_stmt(trans_id, account_no, amount))).one()
+        if not row.account_found:
+            return PAYMENT_ACCOUNT_NOT_FOUND
+        if not row.inserted:
+            return PAYMENT_DUPLICATE
+        await session.commit()
+    await asyncio.sleep(publish)
+    return PAYMENT_RECORDED
+
+
+async def outbox(trans_id: str, account_no: str, amount: Decimal, publish: float) -> str:
+    async with async_session_factory() as session:
+        row = (await session.execute(_record_payment_stmt(trans_id, account_no, amount))).one()
+        if not row.account_found:
+            return PAYMENT_ACCOUNT_NOT_FOUND
+        if not row.inserted:
+            return PAYMENT_DUPLICATE
+        enqueue_event(
+            session,
+            "ledger.credit.requested",
+            {"trans_id": trans_id, "account_no": account_no, "amount": str(amount)},
+        )
+        await session.commit()
+    return PAYMENT_RECORDED
+
+
+async def run(variant, account_nos: list[str], args: argparse.Namespace) -> dict:
+    run_id = uuid.uuid4().hex[:10]
+    rng = random.Random(0)
+    callbacks = []
+    for i in range(args.requests):
+        n = rng.randrange(i) if i and rng.random() < args.duplicate_ratio else i
+        callbacks.append((f"B{run_id}{n:08d}", account_nos[n % len(account_nos)]))
+    latencies: list[float] = []
+    outcomes: dict[str, int] = {}
+    pending = iter(callbacks)
+    publish = args.publish_ms / 1000
+
+    async def worker() -> None:
+        for trans_id, account_no in pending:
+            started = time.perf_counter()
+            try:
+                outcome = await variant(trans_id, account_no, Decimal("100.00"), publish)
+            except IntegrityError:
+                # three-step: a retry raced the original between its SELECT and INSERT (a 500 for M-PESA)
+                outcome = "error"
+            latencies.append(time.perf_counter() - started)
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+    finally:
+        async with async_session_factory() as session:
+            await session.execute(delete(PaymentReference).where(PaymentReference.trans_id.like(f"B{run_id}%")))
+            await session.execute(delete(PaymentTransId).where(PaymentTransId.trans_id.like(f"B{run_id}%")))
+            await session.execute(delete(OutboxEvent).where(OutboxEvent.payload["trans_id"].astext.like(f"B{run_id}%")))
+            await session.commit()
+
+    ms = sorted(x * 1000 for x in latencies)
+    q = statistics.quantiles(ms, n=100, method="inclusive")
+    return {
+        "callbacks_per_s": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(q[49], 2),
+        "p99_ms": round(q[98], 2),
+        "recorded": outcomes.get(PAYMENT_RECORDED, 0),
+        "duplicates": outcomes.get(PAYMENT_DUPLICATE, 0),
+        "errors": outcomes.get("error", 0),
+    }
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    wallet_id = uuid.uuid4()
+    prefix = "998"
+    account_nos = [f"{prefix}-B{wallet_id.hex[:8]}{i:05d}" for i in range(ACCOUNTS)]
+    async with async_session_factory() as session:
+        session.add(
+            WalletRegistry(wallet_id=wallet_id, company_id=uuid.uuid4(), company_account_prefix=prefix, sequence_no=ACCOUNTS)
+        )
+        await session.flush()
+        session.add_all(
+            Account(wallet_id=wallet_id, fullname=f"Bench {i}", account_no=no, sequence_no=i + 1)
+            for i, no in enumerate(account_nos)
+        )
+        await session.commit()
+
+    try:
+        print(f"{'variant':<12} {'callbacks/s':>12} {'p50 ms':>8} {'p99 ms':>8} {'recorded':>9} {'dupes':>6} {'errors':>7}")
+        for name, variant in (("three-step", three_step), ("single", single), ("outbox", outbox)):
+            r = await run(variant, account_nos, args)
+            print(
+                f"{name:<12} {r['callbacks_per_s']:>12} {r['p50_ms']:>8} {r['p99_ms']:>8} "
+                f"{r['recorded']:>9} {r['duplicates']:>6} {r['errors']:>7}"
+            )
+    finally:
+        async with async_session_factory() as session:
+            await session.execute(delete(Account).where(Account.wallet_id == wallet_id))
+            await session.execute(delete(WalletRegistry).where(WalletRegistry.wallet_id == wallet_id))
+            await session.commit()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duplicate-ratio", type=float, default=0.1)
+    parser.add_argument("--publish-ms", type=float, default=2.0, help="Stand-in for the ledger.credit.requested publish")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
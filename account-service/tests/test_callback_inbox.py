@@ -0,0 +1,80 @@
+"""A staged callback that cannot be credited is parked for an operator, never deleted."""
+
+import asyncio
+import contextlib
+from datetime import datetime, timezone
+from decimal import Decimal
+from types import SimpleNamespace
+
+from sqlalchemy.sql import Delete, Update
+
+from app.services import callback_inbox
+from app.services.account_service import PAYMENT_ACCOUNT_NOT_FOUND, PAYMENT_RECORDED
+from app.services.callback_inbox import ACCOUNT_NOT_FOUND_ERROR, CallbackInboxWorker
+
+MAX_ATTEMPTS = 10
+
+
+class InboxSession:
+    """Returns the staged rows for the batch SELECT and keeps every UPDATE/DELETE for inspection."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.writes: list = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    @contextlib.asynccontextmanager
+    async def begin_nested(self):
+        yield
+
+    async def execute(self, stmt):
+        if isinstance(stmt, (Update, Delete)):
+            self.writes.append(stmt)
+            return None
+        return SimpleNamespace(all=lambda: self.rows)
+
+    async def commit(self):
+        pass
+
+
+class OutcomeService:
+    """record_payment_and_emit_credit answers from a TransID -> outcome map."""
+
+    outcomes: dict[str, str] = {}
+
+    def __init__(self, _session):
+        pass
+
+    async def record_payment_and_emit_credit(self, *, trans_id, account_no, amount):
+        return self.outcomes[trans_id]
+
+
+def staged(row_id: int, trans_id: str):
+    return SimpleNamespace(
+        id=row_id, trans_id=trans_id, account_no="873-1", amount=Decimal("10"), received_at=datetime.now(timezone.utc)
+    )
+
+
+def test_account_not_found_is_parked(monkeypatch):
+    OutcomeService.outcomes = {"T1": PAYMENT_RECORDED, "T2": PAYMENT_ACCOUNT_NOT_FOUND}
+    monkeypatch.setattr(callback_inbox, "AccountService", OutcomeService)
+    monkeypatch.setattr(callback_inbox, "get_recent_trans_ids", lambda: None)
+    session = InboxSession([staged(1, "T1"), staged(2, "T2")])
+    worker = CallbackInboxWorker(
+        lambda: session, workers=1, batch_size=10, poll_interval=1.0, max_attempts=MAX_ATTEMPTS, max_backlog=100
+    )
+
+    assert asyncio.run(worker.process_batch()) == 2
+
+    (parked,) = [w for w in session.writes if isinstance(w, Update)]
+    params = parked.compile().params
+    assert params["attempts"] == MAX_ATTEMPTS
+    assert params["last_error"] == ACCOUNT_NOT_FOUND_ERROR
+    assert params["id_1"] == 2
+    (deleted,) = [w for w in session.writes if isinstance(w, Delete)]
+    assert deleted.compile().params["id_1"] == [1]
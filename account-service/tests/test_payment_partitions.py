@@ -0,0 +1,101 @@
+"""Payments in the default partition move out when their month is created; a short horizon is an error."""
+
+import asyncio
+import logging
+import re
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from app.metrics import PAYMENT_PARTITION_DEFAULT_ROWS, PAYMENT_PARTITION_HORIZON
+from app.services.payment_partitions import DEFAULT_PARTITION, PaymentPartitionMaintainer
+
+NOW = datetime(2026, 10, 16, tzinfo=timezone.utc)
+
+
+class CatalogConnection:
+    """Answers the maintainer's catalog and default-partition queries and records every statement."""
+
+    def __init__(self, attached: list[str], stray_months: set[str]):
+        self.attached = {name: False for name in attached}
+        self.stray_months = stray_months
+        self.statements: list[str] = []
+
+    async def execute(self, stmt, params=None):
+        sql = str(stmt)
+        self.statements.append(sql)
+        if "pg_inherits" in sql:
+            return SimpleNamespace(tuples=lambda: SimpleNamespace(all=lambda: list(self.attached.items())))
+        if "SELECT EXISTS" in sql:
+            return SimpleNamespace(scalar_one=lambda: params["lower"].strftime("%Y_%m") in self.stray_months)
+        if "count(*)" in sql:
+            return SimpleNamespace(scalar_one=lambda: len(self.stray_months))
+        created = re.search(r"CREATE TABLE (?:IF NOT EXISTS )?payment_references_(\d{4}_\d{2})", sql)
+        if created:
+            self.attached[f"payment_references_{created[1]}"] = False
+            self.stray_months.discard(created[1])
+        return SimpleNamespace(scalar_one=lambda: True, rowcount=0)
+
+
+class CatalogSession:
+    def __init__(self, conn: CatalogConnection):
+        self.conn = conn
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def connection(self, **_kwargs):
+        return self.conn
+
+
+def maintain(conn: CatalogConnection, months_ahead: int = 2) -> None:
+    maintainer = PaymentPartitionMaintainer(
+        lambda: CatalogSession(conn),
+        months_ahead=months_ahead,
+        retention_months=13,
+        archive="detach",
+        dedup_window=timedelta(days=90),
+        interval=3600.0,
+    )
+    assert asyncio.run(maintainer.run_once(NOW))
+
+
+def test_month_with_rows_in_default_is_moved_out():
+    conn = CatalogConnection(["payment_references_2026_10", DEFAULT_PARTITION], stray_months={"2026_11"})
+    maintain(conn)
+    (move,) = [s for s in conn.statements if "ATTACH PARTITION" in s]
+    assert "CREATE TABLE payment_references_2026_11 (LIKE" in move
+    assert f"DELETE FROM {DEFAULT_PARTITION}" in move
+    assert "FOR VALUES FROM ('2026-11-01 00:00:00+00') TO ('2026-12-01 00:00:00+00')" in move
+    assert any("CREATE TABLE IF NOT EXISTS payment_references_2026_12 PARTITION OF" in s for s in conn.statements)
+    assert PAYMENT_PARTITION_HORIZON._value.get() == datetime(2027, 1, 1, tzinfo=timezone.utc).timestamp()
+    assert PAYMENT_PARTITION_DEFAULT_ROWS._value.get() == 0
+
+
+def test_short_horizon_is_logged_as_error(caplog):
+    class FailingCreate(CatalogConnection):
+        async def execute(self, stmt, params=None):
+            if "CREATE TABLE" in str(stmt):
+                raise RuntimeError("permission denied")
+            return await super().execute(stmt, params)
+
+    conn = FailingCreate(["payment_references_2026_10", DEFAULT_PARTITION], stray_months=set())
+    with caplog.at_level(logging.ERROR):
+        try:
+            maintain(conn)
+        except RuntimeError:
+            pass
+    assert "No payment_references partition beyond 2026-10" in caplog.text
+    assert PAYMENT_PARTITION_HORIZON._value.get() == datetime(2026, 11, 1, tzinfo=timezone.utc).timestamp()
+
+
+def test_detach_is_plain_next_to_default_partition():
+    conn = CatalogConnection(
+        ["payment_references_2025_08", "payment_references_2026_10", DEFAULT_PARTITION], stray_months=set()
+    )
+    maintain(conn)
+    (detach,) = [s for s in conn.statements if "DETACH PARTITION" in s]
+    assert detach.rstrip().endswith("DETACH PARTITION payment_references_2025_08")
+    assert conn.statements[conn.statements.index(detach) - 1].startswith("SET lock_timeout")
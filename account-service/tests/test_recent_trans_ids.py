@@ -0,0 +1,59 @@
+"""A TransID remembered as recorded never overrides the account check: the answer is the same on every replica."""
+
+import asyncio
+import uuid
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import account_service
+from app.services.account_cache import ActiveAccountCache, CachedAccount
+from app.services.account_service import (
+    PAYMENT_ACCOUNT_NOT_FOUND,
+    PAYMENT_DUPLICATE,
+    AccountService,
+    recently_recorded,
+)
+from app.services.recent_payments import RecentTransIds
+
+
+class UnknownAccountSession:
+    """The callback statement's answer for an account that does not exist."""
+
+    info: dict = {}
+
+    async def execute(self, _stmt):
+        return SimpleNamespace(one=lambda: SimpleNamespace(account_id=None, account_found=False, inserted=False))
+
+
+@pytest.fixture
+def caches(monkeypatch):
+    cache, recent = ActiveAccountCache(max_size=100, ttl=60.0), RecentTransIds(100)
+    recent.add("T1")
+    monkeypatch.setattr(account_service, "get_account_cache", lambda: cache)
+    monkeypatch.setattr(account_service, "get_recent_trans_ids", lambda: recent)
+    return cache
+
+
+def record(account_no: str) -> str:
+    return asyncio.run(
+        AccountService(UnknownAccountSession()).record_payment_and_emit_credit("T1", account_no, Decimal("10"))
+    )
+
+
+def test_recent_trans_id_for_unknown_account(caches):
+    assert record("873-404") == PAYMENT_ACCOUNT_NOT_FOUND
+    assert not recently_recorded("T1", "873-404")
+
+
+def test_recent_trans_id_for_inactive_account(caches):
+    caches.put("873-1", CachedAccount(uuid.uuid4(), False))
+    assert record("873-1") == PAYMENT_ACCOUNT_NOT_FOUND
+    assert not recently_recorded("T1", "873-1")
+
+
+def test_recent_trans_id_for_active_account(caches):
+    caches.put("873-1", CachedAccount(uuid.uuid4(), True))
+    assert record("873-1") == PAYMENT_DUPLICATE
+    assert recently_recorded("T1", "873-1")
@@ -0,0 +1,299 @@
+"""Raw-ASGI proxy: client auth, rate limiting, caching, route lookup and upstream forwarding on scope/receive/send."""
+
+import math
+import time
+from collections.abc import AsyncIterator
+
+import httpx
+from starlette.background import BackgroundTask
+from starlette.requests import ClientDisconnect
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+from app.cache import CacheRule, ResponseCache
+from app.coalesce import SingleFlight
+from app.config import Settings
+from app.metrics import ConnectTimer, MetricsMiddleware, observe_upstream
+from app.proxy import read_capped, response_raw_headers, upstream_request_headers
+from app.rate_limit import RateLimiter
+from app.routing import RouteTable
+from app.upstream import Instance, UpstreamClients
+
+# Header names
+HEADER_CLIENT_API_KEY = b"x-api-key"
+HEADER_INTERNAL_API_KEY = "X-Internal-API-Key"
+AUTH_BEARER_PREFIX = "Bearer "
+
+
+def _header(headers: list[tuple[bytes, bytes]], name: bytes) -> str | None:
+    # ASGI header names are lowercased; a linear scan beats building a dict for a handful of lookups
+    for k, v in headers:
+        if k == name:
+            return v.decode("latin-1")
+    return None
+
+
+def get_client_key(headers: list[tuple[bytes, bytes]]) -> str | None:
+    # Prefer X-API-Key, then Authorization: Bearer <key>
+    key = _header(headers, HEADER_CLIENT_API_KEY)
+    if key:
+        return key
+    auth = _header(headers, b"authorization")
+    if auth and auth.startswith(AUTH_BEARER_PREFIX):
+        return auth[len(AUTH_BEARER_PREFIX) :].strip()
+    return None
+
+
+async def _receive_body(receive: Receive) -> AsyncIterator[bytes]:
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            raise ClientDisconnect()
+        body = message.get("body", b"")
+        if body:
+            yield body
+        if not message.get("more_body", False):
+            return
+
+
+class ProxyApp:
+    """
+    ASGI app that proxies one request to a backend instance.
+    Mounted in front of FastAPI for routed prefixes (fast path), or called from FastAPI's catch-all route.
+    """
+
+    def __init__(
+        self,
+        settings: Settings,
+        route_table: RouteTable,
+        upstreams: UpstreamClients,
+        *,
+        valid_client_keys: set[str],
+        cache: ResponseCache | None = None,
+        coalescer: SingleFlight | None = None,
+        limiter: RateLimiter | None = None,
+        metrics: bool = False,
+    ):
+        self.settings = settings
+        self.route_table = route_table
+        self.upstreams = upstreams
+        self.valid_client_keys = valid_client_keys
+        self.cache = cache
+        self.coalescer = coalescer
+        self.limiter = limiter
+        self.metrics = metrics
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.handle(scope, receive, send, self.route_table.lookup(scope["path"]))
+
+    async def handle(self, scope: Scope, receive: Receive, send: Send, name: str | None) -> None:
+        try:
+            response = await self.dispatch(scope, receive, name)
+        except ClientDisconnect:
+            return
+        await response(scope, receive, send)
+
+    async def dispatch(self, scope: Scope, receive: Receive, name: str | None) -> Response:
+        headers = scope["headers"]
+        client_key = get_client_key(headers)
+        if not client_key or client_key not in self.valid_client_keys:
+            return JSONResponse(
+                status_code=401,
+                content={"detail": "Missing or invalid API key. Use X-API-Key or Authorization: Bearer <key>."},
+            )
+        if self.limiter is not None:
+            wait = await self.limiter.check(client_key)
+            if wait > 0:
+                return JSONResponse(
+                    status_code=429,
+                    content={"detail": "Rate limit exceeded"},
+                    headers={"Retry-After": str(math.ceil(wait))},
+                )
+
+        if not name:
+            return JSONResponse(status_code=404, content={"detail": "No backend for this path"})
+
+        method = scope["method"]
+        path = scope["path"]
+        query = scope["query_string"].decode("latin-1")
+        cache = self.cache
+
+        # Hot GET routes may be served from the response cache
+        cache_rule: CacheRule | None = None
+        cache_key: tuple | None = None
+        cache_generation = 0
+        if cache is not None and method == "GET":
+            cache_rule = cache.rule_for(path)
+            if cache_rule is not None:
+                cache_key = cache.key(
+                    path, query, client_key, _header(headers, b"accept"), _header(headers, b"accept-encoding")
+                )
+                cached = cache.get(cache_key)
+                if cached is not None:
+                    response = Response(content=cached.body, status_code=cached.status_code)
+                    response.raw_headers = cached.raw_headers + [(b"x-cache", b"HIT")]
+                    return response
+                cache_generation = cache.generation(cache_rule.group)
+
+        async def fetch() -> Response:
+            response = await self.forward(scope, receive, name)
+            if cache_rule is not None and response.status_code == 200 and not isinstance(response, StreamingResponse):
+                cache.put(cache_key, cache_rule, cache_generation, 200, response.raw_headers, response.body)
+                response.raw_headers = response.raw_headers + [(b"x-cache", b"MISS")]
+            return response
+
+        # Identical concurrent idempotent requests share one upstream call
+        if self.coalescer is not None and method in ("GET", "HEAD"):
+            flight_key = (
+                method,
+                path.strip("/"),
+                query,
+                client_key,
+                _header(headers, b"accept") or "",
+                _header(headers, b"accept-encoding") or "",
+            )
+            return await self.coalescer.do(flight_key, fetch)
+        return await fetch()
+
+    async def forward(self, scope: Scope, receive: Receive, name: str) -> Response:
+        """Send the request to an instance of the named backend and relay its response."""
+        settings = self.settings
+        upstreams = self.upstreams
+        instance = upstreams.admit(name)
+        if instance is None:
+            return JSONResponse(
+                status_code=503,
+                content={"detail": "Backend unavailable (circuit open)"},
+                headers={"Retry-After": str(upstreams.retry_after(name))},
+            )
+
+        # Build target URL: same (still percent-encoded) path and query as the request
+        method = scope["method"]
+        raw_path = scope.get("raw_path")
+        target_full = instance.base_url + (raw_path.decode("latin-1") if raw_path else scope["path"])
+        if scope["query_string"]:
+            target_full += "?" + scope["query_string"].decode("latin-1")
+
+        # Streaming mode or an over-cap body: pipe the client body upstream as it arrives
+        request_headers = scope["headers"]
+        content_length = _header(request_headers, b"content-length")
+        has_body = bool(content_length and content_length != "0") or _header(request_headers, b"transfer-encoding") is not None
+        stream_request = has_body and (
+            settings.proxy_streaming
+            or content_length is None
+            or int(content_length) > settings.proxy_max_buffered_bytes
+        )
+        headers = upstream_request_headers(
+            [(k.decode("latin-1"), v.decode("latin-1")) for k, v in request_headers],
+            internal_key_header=HEADER_INTERNAL_API_KEY,
+            internal_key=settings.internal_api_key,
+            keep_content_length=stream_request and content_length is not None,
+        )
+
+        upstreams.acquire(instance)
+        resp: httpx.Response | None = None
+        recorded = False
+        started = time.perf_counter()
+        try:
+            if not has_body:
+                content = None
+            elif stream_request:
+                content = _receive_body(receive)
+            else:
+                content = b"".join([chunk async for chunk in _receive_body(receive)])
+            client = instance.client
+            request = client.build_request(method, target_full, content=content, headers=headers)
+            timer = None
+            if self.metrics:
+                timer = request.extensions["trace"] = ConnectTimer()
+            try:
+                resp = await client.send(request, stream=True)
+            except httpx.TransportError:
+                # Timeouts, connect errors, broken connections: the instance's failure
+                upstreams.record(instance, success=False, latency=time.perf_counter() - started)
+                recorded = True
+                raise
+            elapsed = time.perf_counter() - started
+            upstreams.record(instance, success=resp.status_code < 500, latency=elapsed)
+            if timer is not None:
+                observe_upstream(name, resp.status_code, elapsed, timer)
+            recorded = True
+            if self.cache is not None and method not in ("GET", "HEAD") and resp.status_code < 400:
+                self.cache.invalidate_write(scope["path"])
+            return await self.relay_response(resp, instance)
+        except httpx.TimeoutException:
+            return JSONResponse(status_code=504, content={"detail": "Backend timeout"})
+        except httpx.ConnectError as e:
+            return JSONResponse(status_code=502, content={"detail": f"Backend unreachable: {e!s}"})
+        finally:
+            if not recorded:
+                # The call never got an answer from the backend through no fault of its own (client disconnect,
+                # cancellation, an unreadable request body): no outcome, just give back the trial slot
+                upstreams.cancel(instance)
+            if resp is None or resp.is_closed:
+                upstreams.release(instance)
+
+    async def relay_response(self, resp: httpx.Response, instance: Instance) -> Response:
+        """Buffer small upstream bodies; stream large ones (or everything in streaming mode) back to the client."""
+        settings = self.settings
+        cap = settings.proxy_max_buffered_bytes
+        upstream_length = resp.headers.get("content-length")
+        stream = resp.aiter_raw()
+        if not settings.proxy_streaming and (upstream_length is None or int(upstream_length) <= cap):
+            try:
+                body, stream = await read_capped(stream, cap)
+            except BaseException:
+                await resp.aclose()
+                raise
+            if body is not None:
+                await resp.aclose()
+                response = Response(content=body, status_code=resp.status_code)
+                # A HEAD response has no body but describes the GET one: keep the upstream Content-Length
+                head_only = resp.request.method == "HEAD" and not body
+                response.raw_headers = response_raw_headers(resp, content_length=None if head_only else len(body))
+                return response
+
+        closed = False
+
+        async def close() -> None:
+            nonlocal closed
+            if not closed:
+                closed = True
+                await resp.aclose()
+                self.upstreams.release(instance)
+
+        async def body_iter():
+            try:
+                async for chunk in stream:
+                    yield chunk
+            finally:
+                await close()
+
+        response = StreamingResponse(body_iter(), status_code=resp.status_code, background=BackgroundTask(close))
+        response.raw_headers = response_raw_headers(resp)
+        return response
+
+
+class GatewayApp:
+    """
+    Outer ASGI app. With the fast path on, HTTP requests whose path matches the route table go straight
+    to ProxyApp, skipping FastAPI's router and dependency machinery; everything else (/health, /docs,
+    lifespan) is handled by FastAPI. With metrics on, every request passes through MetricsMiddleware first.
+    """
+
+    def __init__(self, api, proxy: ProxyApp, *, fast_path: bool = True, metrics: bool = False):
+        self.api = api
+        self.proxy = proxy
+        self.fast_path = fast_path
+        self._handler = MetricsMiddleware(self._dispatch, proxy.route_table) if metrics else self._dispatch
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self._handler(scope, receive, send)
+
+    async def _dispatch(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if self.fast_path and scope["type"] == "http":
+            name = self.proxy.route_table.lookup(scope["path"])
+            if name is not None:
+                await self.proxy.handle(scope, receive, send, name)
+                return
+        await self.api(scope, receive, send)
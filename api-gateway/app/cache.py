@@ -0,0 +1,165 @@
+"""Bounded in-memory response cache (TTL + LRU) for hot GET routes, invalidated by domain events."""
+
+import fnmatch
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class CacheRule:
+    """A cacheable route: path pattern (* = one segment), the events and writes that invalidate it."""
+
+    group: str
+    pattern: str
+    events: tuple[str, ...]
+    write_prefixes: tuple[str, ...]
+
+    def compile(self) -> re.Pattern:
+        parts = [r"[^/]+" if p == "*" else re.escape(p) for p in self.pattern.split("/")]
+        return re.compile("/".join(parts) + "/?")
+
+
+CACHE_RULES = (
+    # GET /companies?skip=&limit= — any company.* event changes the list
+    CacheRule(
+        group="companies",
+        pattern="companies",
+        events=("company.*",),
+        write_prefixes=("companies",),
+    ),
+    # GET /wallets/{wallet_id}/accounts — new wallet, new or deleted account (event payload carries wallet_id)
+    CacheRule(
+        group="wallet-accounts",
+        pattern="wallets/*/accounts",
+        events=("wallet.created", "account.created", "account.deleted"),
+        write_prefixes=("accounts", "wallets"),
+    ),
+)
+
+
+@dataclass(slots=True)
+class CachedResponse:
+    status_code: int
+    raw_headers: list[tuple[bytes, bytes]]
+    body: bytes
+    expires_at: float
+    group: str
+    path: str
+
+
+class ResponseCache:
+    """
+    Keyed by (path, query, client key, accept, accept-encoding).
+    - Entries expire after ttl_seconds; least recently used entries are evicted past max_entries
+    - Events invalidate the matching rule's entries (only one wallet's entries if the payload has wallet_id)
+    - Successful writes through the gateway invalidate the rules whose write_prefixes match
+    - A per-group generation stops a response fetched before an invalidation from being stored after it
+    """
+
+    def __init__(self, *, ttl_seconds: float, max_entries: int, max_entry_bytes: int, rules=CACHE_RULES):
+        self._ttl = ttl_seconds
+        self._max_entries = max_entries
+        self._max_entry_bytes = max_entry_bytes
+        self._rules = [(rule, rule.compile()) for rule in rules]
+        self._entries: OrderedDict[tuple, CachedResponse] = OrderedDict()
+        self._generations: dict[str, int] = {rule.group: 0 for rule in rules}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def rule_for(self, path: str) -> CacheRule | None:
+        path = path.strip("/")
+        for rule, regex in self._rules:
+            if regex.fullmatch(path):
+                return rule
+        return None
+
+    @staticmethod
+    def key(path: str, query: str, client_key: str, accept: str | None, accept_encoding: str | None) -> tuple:
+        return (path.strip("/"), query, client_key, accept or "", accept_encoding or "")
+
+    def generation(self, group: str) -> int:
+        return self._generations.get(group, 0)
+
+    def get(self, key: tuple) -> CachedResponse | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry.expires_at <= time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(
+        self,
+        key: tuple,
+        rule: CacheRule,
+        generation: int,
+        status_code: int,
+        raw_headers: list[tuple[bytes, bytes]],
+        body: bytes,
+    ) -> bool:
+        """Store a response; skipped if too large or its group was invalidated since the fetch began."""
+        if len(body) > self._max_entry_bytes or generation != self.generation(rule.group):
+            return False
+        self._entries[key] = CachedResponse(
+            status_code=status_code,
+            raw_headers=raw_headers,
+            body=body,
+            expires_at=time.monotonic() + self._ttl,
+            group=rule.group,
+            path=key[0],
+        )
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return True
+
+    def _invalidate(self, group: str, path: str | None = None) -> None:
+        self._generations[group] = self._generations.get(group, 0) + 1
+        self.invalidations += 1
+        stale = [k for k, e in self._entries.items() if e.group == group and (path is None or e.path == path)]
+        for k in stale:
+            del self._entries[k]
+
+    def invalidate_event(self, event_type: str, payload: dict) -> None:
+        """Drop entries affected by a domain event (routing key + payload)."""
+        wallet_id = payload.get("wallet_id") if isinstance(payload, dict) else None
+        for rule, _ in self._rules:
+            if not any(fnmatch.fnmatchcase(event_type, e) for e in rule.events):
+                continue
+            if wallet_id and "*" in rule.pattern:
+                self._invalidate(rule.group, rule.pattern.replace("*", str(wallet_id), 1))
+            else:
+                self._invalidate(rule.group)
+
+    def invalidate_write(self, path: str) -> None:
+        """Drop entries a successful non-GET request through the gateway may have changed."""
+        first = path.strip("/").split("/", 1)[0]
+        for rule, _ in self._rules:
+            if first in rule.write_prefixes:
+                self._invalidate(rule.group)
+
+    def clear(self) -> None:
+        """Drop every entry (e.g. when invalidation events may have been missed)."""
+        for rule, _ in self._rules:
+            self._invalidate(rule.group)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
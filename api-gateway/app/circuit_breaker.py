@@ -0,0 +1,140 @@
+"""Circuit breaker driven by error rate and slow-call rate over a rolling window of outcomes."""
+
+import logging
+import math
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Classic three-state breaker.
+    - closed: calls pass; once the window holds min_requests outcomes, opens if the failure rate
+      or the slow-call rate reaches its threshold
+    - open: calls are rejected until cooldown_seconds have passed
+    - half_open: up to half_open_requests trial calls pass; all succeeding closes the breaker,
+      any failure re-opens it
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        window_size: int = 20,
+        min_requests: int = 10,
+        failure_rate: float = 0.5,
+        slow_call_seconds: float = 5.0,
+        slow_call_rate: float = 0.8,
+        cooldown_seconds: float = 10.0,
+        half_open_requests: int = 3,
+    ):
+        self.name = name
+        self._window: deque[tuple[bool, bool]] = deque(maxlen=window_size)
+        self._failures = 0
+        self._slow = 0
+        self._min_requests = min_requests
+        self._failure_rate = failure_rate
+        self._slow_call_seconds = slow_call_seconds
+        self._slow_call_rate = slow_call_rate
+        self._cooldown = cooldown_seconds
+        self._half_open_requests = half_open_requests
+        self._trials_started = 0
+        self._trials_succeeded = 0
+        self._opened_at = 0.0
+        self.state = CLOSED
+        self.transitions: dict[str, int] = {}
+
+    def _transition(self, state: str) -> None:
+        key = f"{self.state}->{state}"
+        self.transitions[key] = self.transitions.get(key, 0) + 1
+        logger.warning("Circuit %s: %s -> %s", self.name, self.state, state)
+        self.state = state
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+        if state in (OPEN, HALF_OPEN):
+            self._trials_started = 0
+            self._trials_succeeded = 0
+        if state == CLOSED:
+            self._window.clear()
+            self._failures = 0
+            self._slow = 0
+
+    def _cooled_down(self) -> bool:
+        return time.monotonic() - self._opened_at >= self._cooldown
+
+    def available(self) -> bool:
+        """Would a call be admitted now? Does not reserve a trial slot."""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            return self._cooled_down()
+        return self._trials_started < self._half_open_requests
+
+    def allow(self) -> bool:
+        """Admit a call (reserving a trial slot when half-open). Every admitted call must be recorded or cancelled."""
+        if self.state == OPEN:
+            if not self._cooled_down():
+                return False
+            self._transition(HALF_OPEN)
+        if self.state == HALF_OPEN:
+            if self._trials_started >= self._half_open_requests:
+                return False
+            self._trials_started += 1
+        return True
+
+    def record(self, success: bool, latency: float | None = None) -> None:
+        """Record the outcome of an admitted call."""
+        slow = latency is not None and latency >= self._slow_call_seconds
+        if self.state == HALF_OPEN:
+            if not success or slow:
+                self._transition(OPEN)
+                return
+            self._trials_succeeded += 1
+            if self._trials_succeeded >= self._half_open_requests:
+                self._transition(CLOSED)
+            return
+        if self.state == OPEN:
+            # Late result of a call admitted before the breaker opened
+            return
+
+        if len(self._window) == self._window.maxlen:
+            old_failed, old_slow = self._window[0]
+            self._failures -= old_failed
+            self._slow -= old_slow
+        self._window.append((not success, slow))
+        self._failures += not success
+        self._slow += slow
+
+        n = len(self._window)
+        if n >= self._min_requests and (
+            self._failures / n >= self._failure_rate or self._slow / n >= self._slow_call_rate
+        ):
+            self._transition(OPEN)
+
+    def cancel(self) -> None:
+        """Withdraw an admitted call that has no outcome (it never reached the backend); frees its trial slot."""
+        if self.state == HALF_OPEN and self._trials_started > self._trials_succeeded:
+            self._trials_started -= 1
+
+    def retry_after(self) -> int:
+        """Whole seconds until the breaker will admit trial calls (at least 1)."""
+        if self.state != OPEN:
+            return 1
+        remaining = self._cooldown - (time.monotonic() - self._opened_at)
+        return max(1, math.ceil(remaining))
+
+    def stats(self) -> dict:
+        n = len(self._window)
+        return {
+            "state": self.state,
+            "window": n,
+            "failure_rate": round(self._failures / n, 3) if n else 0.0,
+            "slow_call_rate": round(self._slow / n, 3) if n else 0.0,
+            "transitions": dict(self.transitions),
+        }
@@ -0,0 +1,55 @@
+"""Request coalescing (single-flight) for identical concurrent idempotent requests."""
+
+import asyncio
+from collections.abc import Awaitable, Callable
+
+from starlette.responses import Response, StreamingResponse
+
+
+class SingleFlight:
+    """
+    The first request for a key (the leader) makes the upstream call; identical requests arriving
+    while it is in flight wait for it and get a copy of its response.
+    Streamed responses cannot be shared: followers then make their own call.
+    """
+
+    def __init__(self):
+        self._flights: dict[tuple, asyncio.Future] = {}
+        self.leaders = 0
+        self.collapsed = 0
+        self.fallbacks = 0
+
+    async def do(self, key: tuple, fn: Callable[[], Awaitable[Response]]) -> Response:
+        flight = self._flights.get(key)
+        if flight is not None:
+            self.collapsed += 1
+            # shield: a follower that disconnects must not cancel the shared future
+            shared = await asyncio.shield(flight)
+            if shared is not None:
+                status_code, raw_headers, body = shared
+                response = Response(content=body, status_code=status_code)
+                response.raw_headers = list(raw_headers)
+                return response
+            self.fallbacks += 1
+            return await fn()
+
+        flight = asyncio.get_running_loop().create_future()
+        self._flights[key] = flight
+        self.leaders += 1
+        shared = None
+        try:
+            response = await fn()
+            if not isinstance(response, StreamingResponse):
+                shared = (response.status_code, response.raw_headers, response.body)
+            return response
+        finally:
+            del self._flights[key]
+            flight.set_result(shared)
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._flights),
+            "leaders": self.leaders,
+            "collapsed": self.collapsed,
+            "fallbacks": self.fallbacks,
+        }
@@ -0,0 +1,15 @@
+"""
+JSON codec (orjson) for the events the gateway consumes. Proxied bodies pass through untouched.
+Swap the implementation here to change codecs.
+"""
+
+from typing import Any
+
+import orjson
+
+# Raised by loads; a ValueError subclass, like json.JSONDecodeError
+JSONDecodeError = orjson.JSONDecodeError
+
+
+def loads(data: bytes | bytearray | memoryview | str) -> Any:
+    return orjson.loads(data)
@@ -0,0 +1,86 @@
+"""Consumes domain events from RabbitMQ to invalidate the gateway response cache."""
+
+import asyncio
+import logging
+import threading
+from collections.abc import Callable
+
+import pika
+
+from app.codec import loads
+from app.config import get_settings
+from app.metrics import observe_event_lag
+
+logger = logging.getLogger(__name__)
+
+CACHE_INVALIDATION_KEYS = ("company.*", "wallet.created", "account.created", "account.deleted")
+# Label for consumer lag metrics (the queue itself is server-named)
+QUEUE_LABEL = "gateway-cache-invalidation"
+
+
+class CacheInvalidationConsumer:
+    """
+    Background pika consumer on an exclusive, server-named queue (one per gateway process, so every
+    replica sees every event). Handlers run on the app's event loop via call_soon_threadsafe.
+    """
+
+    def __init__(
+        self,
+        on_event: Callable[[str, dict], None],
+        loop: asyncio.AbstractEventLoop,
+        on_disconnect: Callable[[], None] | None = None,
+    ):
+        self._on_event = on_event
+        self._on_disconnect = on_disconnect
+        self._loop = loop
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _on_message(self, ch, method, properties, body):
+        try:
+            msg = loads(body)
+            payload = msg.get("payload") or {}
+            event_type = msg.get("event_type") or method.routing_key
+            observe_event_lag(QUEUE_LABEL, msg.get("occurred_at"))
+            self._loop.call_soon_threadsafe(self._on_event, event_type, payload)
+        except Exception as e:
+            logger.warning("Cache invalidation event ignored: %s", e)
+
+    def _run(self) -> None:
+        settings = get_settings()
+        params = pika.URLParameters(settings.rabbitmq_url)
+        params.heartbeat = 600
+        while not self._stop_event.is_set():
+            try:
+                conn = pika.BlockingConnection(params)
+                ch = conn.channel()
+                ch.exchange_declare(exchange=settings.rabbitmq_exchange, exchange_type="topic", durable=True)
+                q = ch.queue_declare(queue="", exclusive=True, auto_delete=True).method.queue
+                for key in CACHE_INVALIDATION_KEYS:
+                    ch.queue_bind(queue=q, exchange=settings.rabbitmq_exchange, routing_key=key)
+                ch.basic_consume(queue=q, on_message_callback=self._on_message, auto_ack=True)
+                logger.info("Consuming %s for cache invalidation", ", ".join(CACHE_INVALIDATION_KEYS))
+                while not self._stop_event.is_set():
+                    conn.process_data_events(time_limit=1)
+                conn.close()
+            except Exception as e:
+                if self._stop_event.is_set():
+                    break
+                # Events may be missed while disconnected; let the owner drop state rather than serve it stale
+                if self._on_disconnect is not None:
+                    self._loop.call_soon_threadsafe(self._on_disconnect)
+                logger.warning("Cache invalidation consumer error, reconnecting: %s", e)
+                self._stop_event.wait(5)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        self._thread = None
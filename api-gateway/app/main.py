@@ -1,20 +1,83 @@
 """API Gateway - proxy to backend services with client auth."""
 
-from fastapi import FastAPI, Request, Response
-from fastapi.responses import JSONResponse
-import httpx
+import asyncio
+import secrets
+from contextlib import asynccontextmanager
 
-from app.config import get_settings
-
-# Header names
-HEADER_CLIENT_API_KEY = "X-API-Key"
-HEADER_INTERNAL_API_KEY = "X-Internal-API-Key"
-AUTH_BEARER_PREFIX = "Bearer "
+from fastapi import Depends, FastAPI, Header, HTTPException, Response
 
-
-def create_app() -> FastAPI:
+from app.asgi_proxy import HEADER_INTERNAL_API_KEY, GatewayApp, ProxyApp
+from app.cache import ResponseCache
+from app.coalesce import SingleFlight
+from app.config import get_settings
+from app.events import CacheInvalidationConsumer
+from app.metrics import REGISTRY, UpstreamCollector, metrics_response
+from app.rate_limit import Limit, MemoryStore, RateLimiter, RedisStore, parse_limits
+from app.upstream import UpstreamClients, backends_from_settings
+
+
+def require_internal_key(
+    key: str | None = Header(None, alias=HEADER_INTERNAL_API_KEY),
+    authorization: str | None = Header(None),
+) -> None:
+    """
+    Operational endpoints expose the backend layout; only holders of INTERNAL_API_KEY may read them.
+    The key may also come as `Authorization: Bearer <key>`, which is what Prometheus scrape configs send.
+    """
+    if not key and authorization and authorization[:7].lower() == "bearer ":
+        key = authorization[7:].strip()
+    if not key or not secrets.compare_digest(key, get_settings().internal_api_key):
+        raise HTTPException(status_code=401, detail="Missing or invalid internal API key")
+
+
+def create_app() -> GatewayApp:
     settings = get_settings()
     valid_client_keys = {k.strip() for k in settings.client_api_keys.split(",") if k.strip()}
+    backends, route_table = backends_from_settings(settings)
+    upstreams = UpstreamClients.from_settings(settings, backends)
+    cache = ResponseCache(
+        ttl_seconds=settings.response_cache_ttl_seconds,
+        max_entries=settings.response_cache_max_entries,
+        max_entry_bytes=settings.response_cache_max_entry_bytes,
+    ) if settings.response_cache_enabled else None
+    coalescer = SingleFlight() if settings.request_coalescing_enabled else None
+    limiter = RateLimiter(
+        RedisStore(settings.rate_limit_redis_url) if settings.rate_limit_backend == "redis" else MemoryStore(),
+        Limit(rate=settings.rate_limit_rate, burst=settings.rate_limit_burst),
+        parse_limits(settings.client_rate_limits),
+    ) if settings.rate_limit_enabled else None
+    proxy_app = ProxyApp(
+        settings,
+        route_table,
+        upstreams,
+        valid_client_keys=valid_client_keys,
+        cache=cache,
+        coalescer=coalescer,
+        limiter=limiter,
+        metrics=settings.metrics_enabled,
+    )
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        # One pooled keep-alive client per backend for the life of the process
+        upstreams.start()
+        app.state.upstreams = upstreams
+        collector = None
+        if settings.metrics_enabled:
+            collector = UpstreamCollector(upstreams)
+            REGISTRY.register(collector)
+        consumer = None
+        if cache is not None:
+            consumer = CacheInvalidationConsumer(cache.invalidate_event, asyncio.get_running_loop(), cache.clear)
+            consumer.start()
+        yield
+        if consumer is not None:
+            await asyncio.to_thread(consumer.stop)
+        if limiter is not None:
+            await limiter.aclose()
+        if collector is not None:
+            REGISTRY.unregister(collector)
+        await upstreams.aclose()
 
     app = FastAPI(
         title="Wallet Platform API Gateway",
@@ -23,84 +86,51 @@ def create_app() -> FastAPI:
         docs_url="/docs",
         redoc_url="/redoc",
         openapi_url="/openapi.json",
+        lifespan=lifespan,
     )
 
-    def get_client_key(request: Request) -> str | None:
-        # Prefer X-API-Key, then Authorization: Bearer <key>
-        key = request.headers.get(HEADER_CLIENT_API_KEY)
-        if key:
-            return key
-        auth = request.headers.get("Authorization")
-        if auth and auth.startswith(AUTH_BEARER_PREFIX):
-            return auth[len(AUTH_BEARER_PREFIX) :].strip()
-        return None
-
-    def backend_base_url(path: str) -> str | None:
-        """Return base URL of the backend that should handle this path, or None."""
-        path = path.strip("/")
-        if path.startswith("companies") or path == "companies":
-            return settings.company_service_url.rstrip("/")
-        if path.startswith("accounts") or path == "accounts":
-            return settings.account_service_url.rstrip("/")
-        if path.startswith("wallets") or path == "wallets":
-            return settings.account_service_url.rstrip("/")
-        if path.startswith("callbacks") or path == "callbacks":
-            return settings.account_service_url.rstrip("/")
-        return None
-
     @app.get("/health")
     async def health():
         return {"status": "ok", "service": settings.service_name}
 
+    @app.get("/health/upstreams", dependencies=[Depends(require_internal_key)])
+    async def upstream_pools():
+        """Connection pool usage per backend (for sizing the *_MAX_CONNECTIONS limits)."""
+        return upstreams.stats()
+
+    @app.get("/health/cache", dependencies=[Depends(require_internal_key)])
+    async def cache_stats():
+        """Response cache hit/miss counters."""
+        return cache.stats() if cache is not None else {"enabled": False}
+
+    @app.get("/health/coalescing", dependencies=[Depends(require_internal_key)])
+    async def coalescing_stats():
+        """Single-flight leader/collapsed counters."""
+        return coalescer.stats() if coalescer is not None else {"enabled": False}
+
+    @app.get("/health/rate-limit", dependencies=[Depends(require_internal_key)])
+    async def rate_limit_stats():
+        """Allowed/throttled request counters."""
+        return limiter.stats() if limiter is not None else {"enabled": False}
+
+    if settings.metrics_enabled:
+
+        @app.get("/metrics", include_in_schema=False, dependencies=[Depends(require_internal_key)])
+        async def metrics():
+            """Prometheus metrics."""
+            return metrics_response()
+
+    class _ProxyResponse(Response):
+        # Hands the raw ASGI call to the proxy app so both modes share one implementation
+        async def __call__(self, scope, receive, send) -> None:
+            await proxy_app(scope, receive, send)
+
     @app.api_route("/{path:path}", methods=["GET", "POST", "PUT", "PATCH", "DELETE", "HEAD", "OPTIONS"])
-    async def proxy(path: str, request: Request):
-        if path in ("docs", "redoc", "openapi.json", "health"):
-            return JSONResponse(status_code=404, content={"detail": "Not found"})
-
-        client_key = get_client_key(request)
-        if not client_key or client_key not in valid_client_keys:
-            return JSONResponse(
-                status_code=401,
-                content={"detail": "Missing or invalid API key. Use X-API-Key or Authorization: Bearer <key>."},
-            )
-
-        base = backend_base_url(path)
-        if not base:
-            return JSONResponse(status_code=404, content={"detail": "No backend for this path"})
-
-        # Build target URL: same path and query as request
-        target_full = f"{base}/{path}" if path else base
-        if request.url.query:
-            target_full += "?" + request.url.query
-
-        headers = dict(request.headers)
-        # Remove client-facing and hop-by-hop headers
-        for h in ("host", "x-api-key", "content-length", "connection", "transfer-encoding"):
-            headers.pop(h.lower(), None)
-        headers[HEADER_INTERNAL_API_KEY] = settings.internal_api_key
-
-        try:
-            body = await request.body()
-            async with httpx.AsyncClient(timeout=settings.proxy_timeout_seconds) as client:
-                resp = await client.request(
-                    request.method,
-                    target_full,
-                    content=body,
-                    headers=headers,
-                )
-            response_content = resp.content
-            response_headers = [(k, v) for k, v in resp.headers.items() if k.lower() not in ("transfer-encoding", "connection", "content-encoding")]
-            return Response(
-                content=response_content,
-                status_code=resp.status_code,
-                headers=dict(response_headers),
-            )
-        except httpx.TimeoutException:
-            return JSONResponse(status_code=504, content={"detail": "Backend timeout"})
-        except httpx.ConnectError as e:
-            return JSONResponse(status_code=502, content={"detail": f"Backend unreachable: {e!s}"})
-
-    return app
+    async def proxy(path: str):
+        """Only reached with ASGI_FAST_PATH=false, or for paths outside the route table."""
+        return _ProxyResponse()
+
+    return GatewayApp(app, proxy_app, fast_path=settings.asgi_fast_path, metrics=settings.metrics_enabled)
 
 
 app = create_app()
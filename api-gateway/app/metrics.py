@@ -0,0 +1,167 @@
+"""Prometheus metrics: request latency, in-flight requests, upstream connect/response time and pool state."""
+
+import time
+from datetime import datetime, timezone
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Gauge, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from starlette.responses import Response
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.circuit_breaker import CLOSED
+from app.routing import RouteTable
+from app.upstream import UpstreamClients
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time to handle a request, by route and response status",
+    ["method", "route", "status"],
+)
+REQUESTS_IN_FLIGHT = Gauge("http_requests_in_flight", "Requests currently being handled")
+UPSTREAM_CONNECT = Histogram(
+    "gateway_upstream_connect_seconds",
+    "TCP (and TLS) connect time for new upstream connections",
+    ["backend"],
+)
+UPSTREAM_RESPONSE = Histogram(
+    "gateway_upstream_response_seconds",
+    "Time from sending a request upstream to its response headers, excluding connect time",
+    ["backend", "status"],
+)
+CONSUMER_LAG = Histogram(
+    "rabbitmq_consumer_lag_seconds",
+    "Delay between an event's occurred_at and its consumption",
+    ["queue"],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0, float("inf")),
+)
+
+# Catch-all route in FastAPI mode; proxied requests are labelled by route table prefix instead
+_CATCH_ALL_ROUTE = "/{path:path}"
+
+
+class ConnectTimer:
+    """httpx "trace" extension that times the connect phase when the pool opens a new connection."""
+
+    __slots__ = ("_started", "seconds")
+
+    def __init__(self):
+        self._started = 0.0
+        self.seconds: float | None = None
+
+    async def __call__(self, event: str, info: dict) -> None:
+        if event == "connection.connect_tcp.started":
+            self._started = time.perf_counter()
+        elif event in ("connection.connect_tcp.complete", "connection.start_tls.complete"):
+            self.seconds = time.perf_counter() - self._started
+
+
+def observe_upstream(backend: str, status: int, elapsed: float, timer: ConnectTimer) -> None:
+    """Split the time to response headers into connect time (new connections only) and response time."""
+    connect = timer.seconds or 0.0
+    if timer.seconds is not None:
+        UPSTREAM_CONNECT.labels(backend).observe(connect)
+    UPSTREAM_RESPONSE.labels(backend, str(status)).observe(max(elapsed - connect, 0.0))
+
+
+def observe_event_lag(queue: str, occurred_at: object) -> None:
+    """Best effort: a missing or malformed occurred_at is skipped, a naive one is taken as UTC."""
+    if not isinstance(occurred_at, str) or not occurred_at:
+        return
+    try:
+        occurred = datetime.fromisoformat(occurred_at)
+    except ValueError:
+        return
+    if occurred.tzinfo is None:
+        occurred = occurred.replace(tzinfo=timezone.utc)
+    CONSUMER_LAG.labels(queue).observe(max((datetime.now(timezone.utc) - occurred).total_seconds(), 0.0))
+
+
+class UpstreamCollector:
+    """Reads per-instance in-flight requests, pool connections, circuit state and transitions at scrape time."""
+
+    def __init__(self, upstreams: UpstreamClients):
+        self._upstreams = upstreams
+
+    def collect(self):
+        in_flight = GaugeMetricFamily(
+            "gateway_upstream_in_flight", "Requests in flight to an upstream instance", labels=["backend", "instance"]
+        )
+        connections = GaugeMetricFamily(
+            "gateway_upstream_connections",
+            "Pooled connections to an upstream instance",
+            labels=["backend", "instance", "state"],
+        )
+        circuit_open = GaugeMetricFamily(
+            "gateway_upstream_circuit_open",
+            "1 while an instance is ejected by its circuit breaker (open or half-open)",
+            labels=["backend", "instance"],
+        )
+        # The breakers count their own transitions (also in /health/upstreams); exposed here as a counter
+        circuit_transitions = CounterMetricFamily(
+            "gateway_circuit_transitions",
+            "Circuit breaker state changes of an upstream instance",
+            labels=["backend", "instance", "from_state", "to_state"],
+        )
+        for backend, stats in self._upstreams.stats().items():
+            for inst in stats["instances"]:
+                # The instance's position in its backend's URL list; URLs stay out of the metrics
+                labels = [backend, str(inst["instance"])]
+                in_flight.add_metric(labels, inst["in_flight"])
+                connections.add_metric(labels + ["idle"], inst["connections_idle"])
+                connections.add_metric(labels + ["active"], inst["connections_active"])
+                circuit = inst["circuit"]
+                circuit_open.add_metric(labels, 0 if circuit is None or circuit["state"] == CLOSED else 1)
+                for transition, count in (circuit["transitions"] if circuit is not None else {}).items():
+                    from_state, to_state = transition.split("->")
+                    circuit_transitions.add_metric(labels + [from_state, to_state], count)
+        yield in_flight
+        yield connections
+        yield circuit_open
+        yield circuit_transitions
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording request latency by method, route and status, and requests in flight.
+    Routes are FastAPI path templates, or the route table prefix for proxied paths, so label cardinality
+    stays bounded.
+    """
+
+    def __init__(self, app: ASGIApp, route_table: RouteTable):
+        self.app = app
+        self.route_table = route_table
+
+    def _route(self, scope: Scope) -> str:
+        route = scope.get("route")
+        path = getattr(route, "path", None)
+        if path and path != _CATCH_ALL_ROUTE:
+            return path
+        matched = self.route_table.match(scope["path"])
+        return "/" + matched[0] if matched else "unmatched"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            REQUEST_LATENCY.labels(scope["method"], self._route(scope), str(status)).observe(
+                time.perf_counter() - started
+            )
+
+
+def metrics_response() -> Response:
+    return Response(content=generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
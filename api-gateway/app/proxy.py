@@ -0,0 +1,86 @@
+"""Proxy helpers: hop-by-hop header filtering and capped body buffering."""
+
+from collections.abc import AsyncIterator, Iterable
+
+import httpx
+
+# RFC 7230 §6.1 hop-by-hop headers: never forwarded in either direction
+HOP_BY_HOP_HEADERS = frozenset({
+    "connection",
+    "keep-alive",
+    "proxy-authenticate",
+    "proxy-authorization",
+    "te",
+    "trailer",
+    "trailers",
+    "transfer-encoding",
+    "upgrade",
+})
+
+# Client-facing request headers the gateway consumes itself
+_CLIENT_ONLY_HEADERS = frozenset({"host", "x-api-key", "content-length"})
+
+
+def _connection_tokens(items: Iterable[tuple[str, str]]) -> set[str]:
+    # Headers named in Connection: are hop-by-hop as well
+    tokens: set[str] = set()
+    for k, v in items:
+        if k.lower() == "connection":
+            tokens.update(t.strip().lower() for t in v.split(",") if t.strip())
+    return tokens
+
+
+def upstream_request_headers(
+    items: Iterable[tuple[str, str]],
+    *,
+    internal_key_header: str,
+    internal_key: str,
+    keep_content_length: bool = False,
+) -> list[tuple[str, str]]:
+    """Headers to send upstream: drop client-only and hop-by-hop headers, inject the internal key."""
+    items = list(items)
+    drop = HOP_BY_HOP_HEADERS | _CLIENT_ONLY_HEADERS | _connection_tokens(items)
+    if keep_content_length:
+        drop = drop - {"content-length"}
+    drop = drop | {internal_key_header.lower()}
+    out = [(k, v) for k, v in items if k.lower() not in drop]
+    if not any(k.lower() == "accept-encoding" for k, _ in out):
+        # Bodies are relayed raw; don't let httpx negotiate an encoding the client never asked for
+        out.append(("accept-encoding", "identity"))
+    out.append((internal_key_header, internal_key))
+    return out
+
+
+def response_raw_headers(resp: httpx.Response, *, content_length: int | None = None) -> list[tuple[bytes, bytes]]:
+    """
+    Raw (latin-1) response headers to relay to the client, hop-by-hop removed.
+    Duplicates such as Set-Cookie are preserved. If content_length is given it replaces the upstream value.
+    """
+    items = resp.headers.multi_items()
+    drop = HOP_BY_HOP_HEADERS | _connection_tokens(items)
+    if content_length is not None:
+        drop = drop | {"content-length"}
+    out = [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in items if k.lower() not in drop]
+    if content_length is not None:
+        out.append((b"content-length", str(content_length).encode("latin-1")))
+    return out
+
+
+async def _chain(head: bytes, rest: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    if head:
+        yield head
+    async for chunk in rest:
+        yield chunk
+
+
+async def read_capped(chunks: AsyncIterator[bytes], cap: int) -> tuple[bytes | None, AsyncIterator[bytes] | None]:
+    """
+    Buffer an async byte stream up to cap bytes.
+    Returns (body, None) if it fit, else (None, stream) where stream replays what was read and continues.
+    """
+    buf = bytearray()
+    async for chunk in chunks:
+        buf += chunk
+        if len(buf) > cap:
+            return None, _chain(bytes(buf), chunks)
+    return bytes(buf), None
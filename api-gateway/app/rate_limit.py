@@ -0,0 +1,143 @@
+"""Per-client-key token-bucket rate limiting with an in-memory or shared (Redis) store."""
+
+import hashlib
+import logging
+import time
+from dataclasses import dataclass
+from typing import Protocol
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class Limit:
+    """Sustained rate (tokens per second) and burst (bucket size)."""
+
+    rate: float
+    burst: float
+
+
+def parse_limits(spec: str) -> dict[str, Limit]:
+    """Parse CLIENT_RATE_LIMITS, e.g. "client-key-1=50:100,client-key-2=5:10" (<rate per second>:<burst>)."""
+    limits: dict[str, Limit] = {}
+    for entry in spec.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        key, sep, value = entry.rpartition("=")
+        rate, _, burst = value.partition(":")
+        try:
+            limit = Limit(rate=float(rate), burst=float(burst or rate))
+        except ValueError:
+            limit = None
+        if not sep or not key.strip() or limit is None or limit.rate <= 0 or limit.burst < 1:
+            raise ValueError(f"Invalid rate limit {entry!r}; expected <key>=<rate>:<burst>")
+        limits[key.strip()] = limit
+    return limits
+
+
+class RateLimitStore(Protocol):
+    async def acquire(self, key: str, limit: Limit) -> float:
+        """Take one token. Returns 0 if allowed, else seconds until a token is available."""
+        ...
+
+    async def aclose(self) -> None:
+        ...
+
+
+class MemoryStore:
+    """Buckets in a process-local dict: exact for a single worker, per-worker with several."""
+
+    def __init__(self):
+        self._buckets: dict[str, list[float]] = {}
+
+    async def acquire(self, key: str, limit: Limit) -> float:
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [limit.burst, now]
+        tokens = min(limit.burst, bucket[0] + (now - bucket[1]) * limit.rate)
+        bucket[1] = now
+        if tokens >= 1.0:
+            bucket[0] = tokens - 1.0
+            return 0.0
+        bucket[0] = tokens
+        return (1.0 - tokens) / limit.rate
+
+    async def aclose(self) -> None:
+        self._buckets.clear()
+
+
+# Refill and take atomically on the Redis server clock so all gateway workers share one bucket
+_REDIS_TOKEN_BUCKET = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local b = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(b[1]) or burst
+local ts = tonumber(b[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+else
+  wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(wait)
+"""
+
+
+class RedisStore:
+    """Buckets shared by every gateway worker through Redis (requires the redis package)."""
+
+    def __init__(self, url: str, prefix: str = "gateway:ratelimit:"):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis requires the 'redis' package") from e
+        self._redis = redis.from_url(url)
+        self._script = self._redis.register_script(_REDIS_TOKEN_BUCKET)
+        self._prefix = prefix
+
+    async def acquire(self, key: str, limit: Limit) -> float:
+        try:
+            # Don't store client API keys in Redis in the clear
+            bucket = self._prefix + hashlib.sha256(key.encode()).hexdigest()[:32]
+            wait = await self._script(keys=[bucket], args=[limit.rate, limit.burst])
+        except Exception as e:
+            # Fail open: a limiter outage must not take the gateway down with it
+            logger.warning("Rate limit store unavailable, allowing request: %s", e)
+            return 0.0
+        return float(wait)
+
+    async def aclose(self) -> None:
+        await self._redis.aclose()
+
+
+class RateLimiter:
+    """Token bucket per client key; keys without an explicit limit use the default."""
+
+    def __init__(self, store: RateLimitStore, default: Limit, overrides: dict[str, Limit] | None = None):
+        self._store = store
+        self._default = default
+        self._overrides = overrides or {}
+        self.allowed = 0
+        self.throttled = 0
+
+    async def check(self, client_key: str) -> float:
+        """0 if the request may proceed, else seconds the client should wait (for Retry-After)."""
+        wait = await self._store.acquire(client_key, self._overrides.get(client_key, self._default))
+        if wait > 0:
+            self.throttled += 1
+        else:
+            self.allowed += 1
+        return wait
+
+    async def aclose(self) -> None:
+        await self._store.aclose()
+
+    def stats(self) -> dict:
+        return {"allowed": self.allowed, "throttled": self.throttled}
@@ -0,0 +1,48 @@
+"""Precompiled prefix route table: path prefix -> backend name."""
+
+
+def parse_routes(spec: str) -> dict[str, str]:
+    """
+    Parse GATEWAY_ROUTES, e.g. "companies=company,wallets=account,reports=http://r1:9000|http://r2:9000".
+    Returns {prefix: target}; target is a backend name or a |-separated list of instance URLs.
+    """
+    routes: dict[str, str] = {}
+    for entry in spec.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        prefix, sep, target = entry.partition("=")
+        prefix, target = prefix.strip().strip("/"), target.strip()
+        if not sep or not prefix or not target:
+            raise ValueError(f"Invalid route {entry!r}; expected <prefix>=<backend>")
+        routes[prefix] = target
+    return routes
+
+
+class RouteTable:
+    """
+    Longest-prefix match on whole path segments.
+    "companies" matches /companies and /companies/<id>/wallets, not /companiesfoo.
+    """
+
+    def __init__(self, routes: dict[str, str]):
+        self._routes = {tuple(p.split("/")): name for p, name in routes.items()}
+        self._max_depth = max((len(k) for k in self._routes), default=0)
+
+    def match(self, path: str) -> tuple[str, str] | None:
+        """Return (matched prefix, backend name) for this path, or None."""
+        segments = path.strip("/").split("/", self._max_depth)[: self._max_depth]
+        for depth in range(len(segments), 0, -1):
+            prefix = tuple(segments[:depth])
+            name = self._routes.get(prefix)
+            if name is not None:
+                return "/".join(prefix), name
+        return None
+
+    def lookup(self, path: str) -> str | None:
+        """Return the backend name for this path, or None."""
+        matched = self.match(path)
+        return matched[1] if matched else None
+
+    def items(self) -> list[tuple[str, str]]:
+        return [("/".join(k), v) for k, v in self._routes.items()]
@@ -0,0 +1,274 @@
+"""Pooled upstream HTTP clients and load balancing across backend instances."""
+
+import logging
+import random
+from dataclasses import dataclass
+
+import httpx
+
+from app.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from app.config import Settings
+from app.routing import RouteTable, parse_routes
+
+logger = logging.getLogger(__name__)
+
+LB_LEAST_OUTSTANDING = "least_outstanding"
+LB_EWMA = "ewma"
+
+
+@dataclass(frozen=True)
+class Backend:
+    """A backend service the gateway proxies to: one or more instances sharing connection-pool limits."""
+
+    name: str
+    urls: tuple[str, ...]
+    max_connections: int
+    max_keepalive: int
+
+
+class Instance:
+    """One upstream instance of a backend, with its own keep-alive client and load counters."""
+
+    __slots__ = ("backend", "base_url", "client", "breaker", "in_flight", "requests", "ewma_ms")
+
+    def __init__(self, backend: str, base_url: str, breaker: CircuitBreaker | None = None):
+        self.backend = backend
+        self.base_url = base_url
+        self.client: httpx.AsyncClient | None = None
+        self.breaker = breaker
+        self.in_flight = 0
+        self.requests = 0
+        self.ewma_ms = 0.0
+
+
+def _split_urls(value: str, sep: str = ",") -> tuple[str, ...]:
+    return tuple(u.strip().rstrip("/") for u in value.split(sep) if u.strip())
+
+
+def backends_from_settings(settings: Settings) -> tuple[dict[str, Backend], RouteTable]:
+    """
+    Build the backend map (name -> Backend) and route table from gateway settings.
+    *_SERVICE_URL may list several comma-separated instances; GATEWAY_ROUTES may also
+    point a prefix straight at |-separated instance URLs (an ad-hoc backend named after the prefix).
+    """
+    backends = {
+        "company": Backend(
+            name="company",
+            urls=_split_urls(settings.company_service_url),
+            max_connections=settings.company_service_max_connections,
+            max_keepalive=settings.company_service_max_keepalive,
+        ),
+        "account": Backend(
+            name="account",
+            urls=_split_urls(settings.account_service_url),
+            max_connections=settings.account_service_max_connections,
+            max_keepalive=settings.account_service_max_keepalive,
+        ),
+    }
+    routes: dict[str, str] = {}
+    for prefix, target in parse_routes(settings.gateway_routes).items():
+        if "://" in target:
+            backends[prefix] = Backend(
+                name=prefix,
+                urls=_split_urls(target, "|"),
+                max_connections=settings.upstream_max_connections,
+                max_keepalive=settings.upstream_max_keepalive,
+            )
+            target = prefix
+        elif target not in backends:
+            raise ValueError(f"Route {prefix!r} targets unknown backend {target!r}")
+        routes[prefix] = target
+    for backend in backends.values():
+        if not backend.urls:
+            raise ValueError(f"Backend {backend.name!r} has no instance URLs")
+    return backends, RouteTable(routes)
+
+
+def _pool_connections(client: httpx.AsyncClient | None) -> list:
+    # httpx does not expose pool state publicly; read it from the httpcore pool if present
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    return list(getattr(pool, "connections", None) or [])
+
+
+class UpstreamClients:
+    """
+    Owns one keep-alive AsyncClient per backend instance.
+    - Created in the app lifespan (start) and closed on shutdown (aclose)
+    - Per-backend max connections / keep-alive connections (applied to each instance)
+    - Picks an instance by least outstanding requests or peak EWMA latency
+    - Optional circuit breaker per instance; an instance whose breaker is open is ejected from
+      selection until its cooldown passes, and a backend's circuit is open when all of its
+      instances are ejected (so one bad instance is isolated instead of failing the whole backend)
+    - Tracks in-flight requests per instance so pool usage can be reported
+    """
+
+    def __init__(
+        self,
+        backends: dict[str, Backend],
+        *,
+        timeout: float,
+        keepalive_expiry: float,
+        http2: bool = False,
+        balancer: str = LB_LEAST_OUTSTANDING,
+        ewma_alpha: float = 0.3,
+        breaker_options: dict | None = None,
+    ):
+        self._backends = backends
+        self._timeout = timeout
+        self._keepalive_expiry = keepalive_expiry
+        self._http2 = http2
+        self._balancer = balancer
+        self._ewma_alpha = ewma_alpha
+        self._instances: dict[str, list[Instance]] = {
+            name: [
+                Instance(name, url, CircuitBreaker(f"{name}@{url}", **breaker_options) if breaker_options else None)
+                for url in b.urls
+            ]
+            for name, b in backends.items()
+        }
+
+    @classmethod
+    def from_settings(cls, settings: Settings, backends: dict[str, Backend]) -> "UpstreamClients":
+        return cls(
+            backends,
+            timeout=settings.proxy_timeout_seconds,
+            keepalive_expiry=settings.upstream_keepalive_expiry_seconds,
+            http2=settings.upstream_http2,
+            balancer=settings.load_balancer,
+            ewma_alpha=settings.ewma_alpha,
+            breaker_options={
+                "window_size": settings.circuit_breaker_window,
+                "min_requests": settings.circuit_breaker_min_requests,
+                "failure_rate": settings.circuit_breaker_failure_rate,
+                "slow_call_seconds": settings.circuit_breaker_slow_call_seconds,
+                "slow_call_rate": settings.circuit_breaker_slow_call_rate,
+                "cooldown_seconds": settings.circuit_breaker_cooldown_seconds,
+                "half_open_requests": settings.circuit_breaker_half_open_requests,
+            } if settings.circuit_breaker_enabled else None,
+        )
+
+    def start(self) -> None:
+        for name, backend in self._backends.items():
+            for inst in self._instances[name]:
+                if inst.client is not None:
+                    continue
+                inst.client = httpx.AsyncClient(
+                    timeout=self._timeout,
+                    limits=httpx.Limits(
+                        max_connections=backend.max_connections,
+                        max_keepalive_connections=backend.max_keepalive,
+                        keepalive_expiry=self._keepalive_expiry,
+                    ),
+                    http2=self._http2,
+                )
+            logger.info(
+                "Upstream pool %s -> %s (max_connections=%d, keepalive=%d, http2=%s, lb=%s)",
+                name, ", ".join(backend.urls), backend.max_connections, backend.max_keepalive,
+                self._http2, self._balancer,
+            )
+
+    async def aclose(self) -> None:
+        for instances in self._instances.values():
+            for inst in instances:
+                if inst.client is None:
+                    continue
+                try:
+                    await inst.client.aclose()
+                except Exception as e:
+                    logger.warning("Error closing upstream client %s: %s", inst.base_url, e)
+                inst.client = None
+
+    def backend(self, name: str) -> Backend:
+        return self._backends[name]
+
+    def instances(self, name: str) -> list[Instance]:
+        return self._instances[name]
+
+    def pick(self, name: str) -> Instance | None:
+        """Choose an instance of this backend for the next request, skipping ejected ones."""
+        candidates = [i for i in self._instances[name] if i.breaker is None or i.breaker.available()]
+        if len(candidates) <= 1:
+            return candidates[0] if candidates else None
+        if self._balancer == LB_EWMA:
+            # Peak-EWMA: expected latency scaled by queue depth; unmeasured instances go first
+            def score(i: Instance) -> float:
+                return i.ewma_ms * (i.in_flight + 1)
+        else:
+            def score(i: Instance) -> float:
+                return i.in_flight
+        best = min(score(i) for i in candidates)
+        return random.choice([i for i in candidates if score(i) == best])
+
+    def admit(self, name: str) -> Instance | None:
+        """
+        Pick an instance and admit the call through its circuit breaker (reserving a trial slot if half-open).
+        Returns None (fail fast) when the backend's circuit is open. Every admitted call must be passed to record() or cancel().
+        """
+        inst = self.pick(name)
+        if inst is not None and inst.breaker is not None:
+            inst.breaker.allow()
+        return inst
+
+    def circuit_state(self, name: str) -> str:
+        """Backend circuit: open when every instance is ejected, half_open while any instance is on trial."""
+        states = [i.breaker.state for i in self._instances[name] if i.breaker is not None]
+        if not states or CLOSED in states:
+            return CLOSED
+        return HALF_OPEN if HALF_OPEN in states or any(i.breaker.available() for i in self._instances[name]) else OPEN
+
+    def retry_after(self, name: str) -> int:
+        """Seconds until this backend will admit calls again (for the Retry-After header)."""
+        waits = [i.breaker.retry_after() for i in self._instances[name] if i.breaker is not None]
+        return min(waits, default=1)
+
+    def acquire(self, inst: Instance) -> None:
+        """Mark a request to this instance as in flight."""
+        inst.in_flight += 1
+        inst.requests += 1
+
+    def release(self, inst: Instance) -> None:
+        inst.in_flight = max(0, inst.in_flight - 1)
+
+    def record(self, inst: Instance, *, success: bool, latency: float) -> None:
+        """Record the outcome of an admitted call: feeds the EWMA (successes only) and the circuit breaker."""
+        if success:
+            ms = latency * 1000.0
+            inst.ewma_ms = ms if inst.ewma_ms == 0.0 else inst.ewma_ms + self._ewma_alpha * (ms - inst.ewma_ms)
+        if inst.breaker is not None:
+            inst.breaker.record(success, latency)
+
+    def cancel(self, inst: Instance) -> None:
+        """An admitted call abandoned before the backend answered, for reasons of our own; it has no outcome."""
+        if inst.breaker is not None:
+            inst.breaker.cancel()
+
+    def stats(self) -> dict[str, dict]:
+        """
+        Pool usage per backend and instance: in-flight requests, EWMA latency, open/idle connections,
+        limits and circuit breaker state.
+        """
+        out: dict[str, dict] = {}
+        for name, backend in self._backends.items():
+            instances = []
+            for index, inst in enumerate(self._instances[name]):
+                conns = _pool_connections(inst.client)
+                idle = sum(1 for c in conns if getattr(c, "is_idle", lambda: False)())
+                instances.append({
+                    "instance": index,
+                    "base_url": inst.base_url,
+                    "in_flight": inst.in_flight,
+                    "requests": inst.requests,
+                    "ewma_ms": round(inst.ewma_ms, 3),
+                    "connections_open": len(conns),
+                    "connections_idle": idle,
+                    "connections_active": len(conns) - idle,
+                    "circuit": inst.breaker.stats() if inst.breaker is not None else None,
+                })
+            out[name] = {
+                "in_flight": sum(i["in_flight"] for i in instances),
+                "max_connections": backend.max_connections,
+                "max_keepalive": backend.max_keepalive,
+                "circuit": self.circuit_state(name),
+                "instances": instances,
+            }
+        return out
@@ -0,0 +1,136 @@
+"""
+Gateway proxy overhead: ASGI fast path vs the FastAPI catch-all route.
+
+Starts a stub backend and the gateway under uvicorn (once with ASGI_FAST_PATH=true, once with false),
+drives GET and POST requests through it at fixed concurrency and prints RPS and p50/p99 latency.
+
+    cd api-gateway && python benchmarks/proxy_overhead.py --requests 20000 --concurrency 64
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+CLIENT_KEY = "bench-key"
+
+
+def _wait_ready(url: str, timeout: float = 15.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    raise RuntimeError(f"{url} did not start")
+
+
+def _uvicorn(app: str, port: int, env: dict[str, str]) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app, "--port", str(port), "--log-level", "warning", "--no-access-log"],
+        cwd=ROOT,
+        env={**os.environ, **env},
+    )
+
+
+def _percentile(sorted_values: list[float], p: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p))]
+
+
+async def _drive(base_url: str, method: str, path: str, total: int, concurrency: int) -> dict:
+    latencies: list[float] = []
+    errors = 0
+    remaining = total
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    body = json.dumps({"name": "Acme", "registration_number": "REG-1"}).encode() if method == "POST" else None
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, headers={"X-API-Key": CLIENT_KEY}) as client:
+
+        async def worker() -> None:
+            nonlocal remaining, errors
+            while remaining > 0:
+                remaining -= 1
+                started = time.perf_counter()
+                try:
+                    r = await client.request(method, path, content=body)
+                    if r.status_code >= 400:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+
+        # Warm up connections before timing
+        await asyncio.gather(*(client.request(method, path, content=body) for _ in range(concurrency)))
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(_percentile(latencies, 0.50) * 1000, 2),
+        "p99_ms": round(_percentile(latencies, 0.99) * 1000, 2),
+        "errors": errors,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=10_000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--backend-port", type=int, default=9601)
+    parser.add_argument("--gateway-port", type=int, default=9600)
+    args = parser.parse_args()
+
+    backend_url = f"http://127.0.0.1:{args.backend_port}"
+    gateway_url = f"http://127.0.0.1:{args.gateway_port}"
+    backend = _uvicorn("benchmarks.stub_backend:app", args.backend_port, {})
+    results: dict[str, dict] = {}
+    try:
+        _wait_ready(backend_url)
+        for fast_path in ("true", "false"):
+            gateway = _uvicorn(
+                "app.main:app",
+                args.gateway_port,
+                {
+                    "CLIENT_API_KEYS": CLIENT_KEY,
+                    "INTERNAL_API_KEY": "bench-internal-key",
+                    "COMPANY_SERVICE_URL": backend_url,
+                    "ACCOUNT_SERVICE_URL": backend_url,
+                    "ASGI_FAST_PATH": fast_path,
+                    # Measure the proxy path itself, not cache hits or collapsed requests
+                    "RESPONSE_CACHE_ENABLED": "false",
+                    "REQUEST_COALESCING_ENABLED": "false",
+                    "RATE_LIMIT_ENABLED": "false",
+                },
+            )
+            try:
+                _wait_ready(f"{gateway_url}/health")
+                mode = "asgi_fast_path" if fast_path == "true" else "fastapi_route"
+                for method, path in (("GET", "/companies/00000000-0000-0000-0000-000000000000"), ("POST", "/companies")):
+                    results[f"{mode} {method}"] = asyncio.run(
+                        _drive(gateway_url, method, path, args.requests, args.concurrency)
+                    )
+            finally:
+                gateway.terminate()
+                gateway.wait()
+    finally:
+        backend.terminate()
+        backend.wait()
+
+    width = max(len(k) for k in results)
+    print(f"{'':{width}}  {'rps':>9}  {'p50 ms':>8}  {'p99 ms':>8}  {'errors':>6}")
+    for name, r in results.items():
+        print(f"{name:{width}}  {r['rps']:>9}  {r['p50_ms']:>8}  {r['p99_ms']:>8}  {r['errors']:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,15 @@
+"""Minimal raw-ASGI backend for gateway benchmarks: answers every request with a small fixed JSON body."""
+
+BODY = b'{"id":"00000000-0000-0000-0000-000000000000","name":"Acme","status":"active"}'
+HEADERS = [(b"content-type", b"application/json"), (b"content-length", str(len(BODY)).encode())]
+
+
+async def app(scope, receive, send):
+    if scope["type"] != "http":
+        return
+    more_body = True
+    while more_body:
+        message = await receive()
+        more_body = message.get("more_body", False)
+    await send({"type": "http.response.start", "status": 200, "headers": HEADERS})
+    await send({"type": "http.response.body", "body": BODY})
@@ -46,6 +46,11 @@ class Settings(BaseSettings):
         default="wallet.events",
         description="Topic exchange for domain events",
     )
+    # Publisher: one connection per process fed through a bounded queue; each publish waits for the broker's confirm
+    rabbitmq_publish_queue_size: int = Field(default=10_000, ge=1, alias="RABBITMQ_PUBLISH_QUEUE_SIZE")
+    rabbitmq_publish_max_in_flight: int = Field(default=1000, ge=1, alias="RABBITMQ_PUBLISH_MAX_IN_FLIGHT")
+    rabbitmq_publish_timeout_seconds: float = Field(default=5.0, gt=0.0, alias="RABBITMQ_PUBLISH_TIMEOUT_SECONDS")
+    rabbitmq_reconnect_max_seconds: float = Field(default=30.0, gt=0.0, alias="RABBITMQ_RECONNECT_MAX_SECONDS")
 
     # API Gateway auth (service-to-service)
     internal_api_key: str = Field(
@@ -55,6 +60,9 @@ class Settings(BaseSettings):
         alias="INTERNAL_API_KEY",
     )
 
+    # Prometheus metrics at GET /metrics
+    metrics_enabled: bool = Field(default=True, alias="METRICS_ENABLED")
+
     # HTTP client
     http_timeout_seconds: float = Field(default=30.0, ge=1.0, le=120.0)
     http_max_retries: int = Field(default=3, ge=1, le=10)
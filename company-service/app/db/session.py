@@ -11,6 +11,7 @@ from sqlalchemy.ext.asyncio import (
 from sqlalchemy.orm import DeclarativeBase
 
 from app.config import get_settings
+from app.metrics import register_pool_metrics
 
 
 # SQLAlchemy 2.0 async: use postgresql+asyncpg for async, but we need sync URL for Alembic
@@ -38,6 +39,8 @@ _async_engine = create_async_engine(
     echo=False,
 )
 
+register_pool_metrics(_async_engine.sync_engine.pool)
+
 async_session_factory = async_sessionmaker(
     _async_engine,
     class_=AsyncSession,
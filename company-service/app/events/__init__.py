@@ -1,5 +1,5 @@
 """Domain events and RabbitMQ publishing."""
 
-from app.events.publisher import EventPublisher, get_event_publisher
+from app.events.publisher import EventPublisher, PublishError, get_event_publisher
 
-__all__ = ["EventPublisher", "get_event_publisher"]
+__all__ = ["EventPublisher", "PublishError", "get_event_publisher"]
@@ -1,15 +1,34 @@
-"""RabbitMQ domain event publisher."""
+"""
+RabbitMQ domain event publisher (topic exchange 'wallet.events').
 
-import json
+Message format: {"event_id": "uuid", "event_type": "company.created", "occurred_at": "ISO", "payload": {...}}
+
+One EventPublisher owns one connection, driven by a dedicated I/O thread (pika SelectConnection): pika
+channels are not thread-safe, so nothing else touches it. Callers hand serialized messages over through
+a bounded queue and get a future that resolves when the broker confirms the message. Up to max_in_flight
+messages are outstanding at once and the broker acknowledges them in batches (Basic.Ack multiple=True).
+A lost connection fails the unconfirmed messages and is re-established with exponential backoff.
+"""
+
+import asyncio
+import concurrent.futures
 import logging
+import queue
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from typing import Any
-from uuid import uuid4
+from uuid import UUID, uuid4
 
 import pika
-from pika.adapters.blocking_connection import BlockingChannel
+from pika.channel import Channel
+from pika.spec import Basic
 
+from app.codec import dumps
 from app.config import get_settings
+from app.metrics import PUBLISH_FAILURES, PUBLISH_LATENCY, PUBLISH_PENDING
 
 logger = logging.getLogger(__name__)
 
@@ -19,105 +38,299 @@ EVENT_KEYS = (
     "company.deleted",
     "wallet.created",
 )
+INITIAL_BACKOFF_SECONDS = 0.5
 
 
-def _serialize_payload(payload: Any) -> str:
-    """Serialize payload to JSON; ensure datetime and UUID are ISO/string."""
-    def _default(o: Any) -> Any:
-        if isinstance(o, datetime):
-            return o.isoformat()
-        if hasattr(o, "hex"):  # UUID
-            return str(o)
-        raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
-    return json.dumps(payload, default=_default)
+class PublishError(Exception):
+    """The message was nacked, its connection dropped before the confirm, or the publisher could not take it."""
 
 
-class EventPublisher:
-    """
-    Publishes domain events to RabbitMQ topic exchange 'wallet.events'.
-    Message format:
-    {
-      "event_id": "uuid",
-      "event_type": "company.created",
-      "occurred_at": "ISO",
-      "payload": { ... }
-    }
-    """
+@dataclass(slots=True)
+class EventEnvelope:
+    """Wire format of every event (see the module docstring); datetimes and UUIDs in the payload are encoded too."""
+
+    event_id: UUID
+    event_type: str
+    occurred_at: datetime
+    payload: dict[str, Any]
+
 
+def build_envelope(
+    event_type: str,
+    payload: dict[str, Any],
+    *,
+    event_id: UUID | None = None,
+    occurred_at: datetime | None = None,
+) -> bytes:
+    return dumps(EventEnvelope(event_id or uuid4(), event_type, occurred_at or datetime.now(timezone.utc), payload))
+
+
+@dataclass(slots=True)
+class _Message:
+    routing_key: str
+    body: bytes
+    future: concurrent.futures.Future
+    queued_at: float = field(default_factory=time.perf_counter)
+
+
+class EventPublisher:
     def __init__(
         self,
         rabbitmq_url: str | None = None,
         exchange: str | None = None,
+        *,
+        queue_size: int | None = None,
+        max_in_flight: int | None = None,
+        timeout: float | None = None,
+        max_backoff: float | None = None,
     ):
-        settings = get_settings()
-        self._url = rabbitmq_url or settings.rabbitmq_url
-        self._exchange = exchange or settings.rabbitmq_exchange
-        self._connection: pika.BlockingConnection | None = None
-        self._channel: BlockingChannel | None = None
-
-    def _ensure_connection(self) -> BlockingChannel:
-        if self._channel is None or self._channel.is_closed:
-            try:
-                params = pika.URLParameters(self._url)
-                # Keep connection from being closed by server when idle (heartbeat every 10 min)
-                params.heartbeat = 600
-                params.blocked_connection_timeout = 30
-                self._connection = pika.BlockingConnection(params)
-                self._channel = self._connection.channel()
-                self._channel.exchange_declare(
-                    exchange=self._exchange,
-                    exchange_type="topic",
-                    durable=True,
-                )
-                logger.info("Connected to RabbitMQ, exchange %s declared", self._exchange)
-            except Exception as e:
-                logger.exception("RabbitMQ connection failed: %s", e)
-                raise
-        return self._channel
+        s = get_settings()
+        self._params = pika.URLParameters(rabbitmq_url or s.rabbitmq_url)
+        self._params.heartbeat = 600
+        self._params.blocked_connection_timeout = 30
+        self._exchange = exchange or s.rabbitmq_exchange
+        self._queue: queue.Queue[_Message] = queue.Queue(maxsize=queue_size or s.rabbitmq_publish_queue_size)
+        self._max_in_flight = max_in_flight or s.rabbitmq_publish_max_in_flight
+        self._timeout = timeout or s.rabbitmq_publish_timeout_seconds
+        self._max_backoff = max_backoff or s.rabbitmq_reconnect_max_seconds
+        self._properties = pika.BasicProperties(delivery_mode=2, content_type="application/json")
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._stopping = threading.Event()
+        self._closed = False
+        # Owned by the I/O thread
+        self._connection: pika.SelectConnection | None = None
+        self._channel: Channel | None = None
+        self._ready = False
+        self._delivery_tag = 0
+        self._unconfirmed: OrderedDict[int, _Message] = OrderedDict()
+        self._drain_scheduled = False
+        self._backoff = INITIAL_BACKOFF_SECONDS
+        PUBLISH_PENDING.set_function(self.pending)
+
+    def pending(self) -> int:
+        """Messages queued or awaiting the broker's confirm."""
+        return self._queue.qsize() + len(self._unconfirmed)
 
-    def declare_exchange(self) -> None:
-        """Declare the exchange (and connect). Call at startup so the exchange exists and connectivity is verified."""
-        self._ensure_connection()
+    def start(self) -> None:
+        """Start the I/O thread (idempotent); it connects in the background and keeps reconnecting."""
+        with self._lock:
+            if self._closed or (self._thread is not None and self._thread.is_alive()):
+                return
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="rabbitmq-publisher", daemon=True)
+            self._thread.start()
+
+    def submit(self, routing_key: str, body: bytes) -> concurrent.futures.Future:
+        """Queue a serialized message from any thread; the future resolves once the broker confirms it."""
+        message = _Message(routing_key, body, concurrent.futures.Future())
+        if self._closed:
+            message.future.set_exception(PublishError("Publisher is closed"))
+            return message.future
+        self.start()
+        try:
+            self._queue.put_nowait(message)
+        except queue.Full:
+            PUBLISH_FAILURES.labels(routing_key).inc()
+            message.future.set_exception(PublishError(f"Publish queue full ({self._queue.maxsize} messages)"))
+            return message.future
+        self._wake()
+        return message.future
 
-    def publish(self, event_type: str, payload: dict[str, Any]) -> None:
+    async def publish(self, event_type: str, payload: dict[str, Any]) -> bool:
+        """Publish one event and wait for its confirm. Failures are logged, not raised; returns whether it was confirmed."""
         if event_type not in EVENT_KEYS:
             logger.warning("Unknown event_type %s, publishing anyway", event_type)
+        future = self.submit(event_type, build_envelope(event_type, payload))
         try:
-            channel = self._ensure_connection()
-            body = {
-                "event_id": str(uuid4()),
-                "event_type": event_type,
-                "occurred_at": datetime.now(timezone.utc).isoformat(),
-                "payload": payload,
-            }
-            body_str = _serialize_payload(body)
-            channel.basic_publish(
-                exchange=self._exchange,
-                routing_key=event_type,
-                body=body_str,
-                properties=pika.BasicProperties(
-                    delivery_mode=2,
-                    content_type="application/json",
-                ),
-            )
-            logger.info("Published event %s", event_type)
+            await asyncio.wait_for(asyncio.wrap_future(future), self._timeout)
         except Exception as e:
-            logger.exception("Failed to publish event %s: %s", event_type, e)
+            if isinstance(e, TimeoutError):
+                PUBLISH_FAILURES.labels(event_type).inc()
+            logger.error("Publish failed %s: %s", event_type, str(e) or type(e).__name__)
+            return False
+        return True
 
-    def close(self) -> None:
+    async def publish_confirmed(self, messages: list[tuple[str, bytes]]) -> None:
+        """
+        Publish serialized (routing_key, body) messages and wait until the broker has confirmed all of them.
+        Raises PublishError or TimeoutError if any of them fails; the others may still have been published.
+        """
+        futures = [asyncio.wrap_future(self.submit(routing_key, body)) for routing_key, body in messages]
         try:
-            if self._channel and self._channel.is_open:
-                self._channel.close()
-            if self._connection and self._connection.is_open:
-                self._connection.close()
-        except Exception as e:
-            logger.warning("Error closing RabbitMQ connection: %s", e)
-        finally:
-            self._channel = None
+            await asyncio.wait_for(asyncio.gather(*futures), self._timeout)
+        except BaseException:
+            # Messages not yet handed to the broker are dropped
+            for f in futures:
+                f.cancel()
+            raise
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Wait up to timeout for queued messages to be confirmed, then close the connection. Blocks."""
+        with self._lock:
+            self._closed = True
+            thread = self._thread
+        if thread is None:
+            return
+        deadline = time.monotonic() + timeout
+        while self.pending() and self._ready and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self._stopping.set()
+        connection = self._connection
+        if connection is not None:
+            try:
+                connection.ioloop.add_callback_threadsafe(self._close_connection)
+            except Exception:
+                pass
+        thread.join(timeout=max(deadline - time.monotonic(), 1.0))
+        self._thread = None
+
+    def _wake(self) -> None:
+        # One drain callback at a time; while disconnected, the queue is drained once the channel is ready
+        if self._drain_scheduled or not self._ready:
+            return
+        connection = self._connection
+        if connection is None:
+            return
+        self._drain_scheduled = True
+        try:
+            connection.ioloop.add_callback_threadsafe(self._drain)
+        except Exception:
+            self._drain_scheduled = False
+
+    # Everything below runs on the I/O thread
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            self._connection = pika.SelectConnection(
+                self._params,
+                on_open_callback=self._on_connection_open,
+                on_open_error_callback=self._on_connection_error,
+                on_close_callback=self._on_connection_closed,
+            )
+            # Returns once the connection is gone
+            self._connection.ioloop.start()
             self._connection = None
+            if self._stopping.is_set():
+                break
+            logger.warning("RabbitMQ publisher disconnected, reconnecting in %.1fs", self._backoff)
+            self._stopping.wait(self._backoff)
+            self._backoff = min(self._backoff * 2, self._max_backoff)
+        self._fail_queued()
+
+    def _on_connection_open(self, connection: pika.SelectConnection) -> None:
+        connection.channel(on_open_callback=self._on_channel_open)
+
+    def _on_connection_error(self, connection: pika.SelectConnection, error: Exception) -> None:
+        logger.warning("RabbitMQ connection failed: %r", error)
+        connection.ioloop.stop()
+
+    def _on_connection_closed(self, connection: pika.SelectConnection, reason: Exception) -> None:
+        self._ready = False
+        self._channel = None
+        self._fail_unconfirmed(reason)
+        connection.ioloop.stop()
+
+    def _on_channel_open(self, channel: Channel) -> None:
+        self._channel = channel
+        channel.add_on_close_callback(self._on_channel_closed)
+        channel.exchange_declare(
+            exchange=self._exchange,
+            exchange_type="topic",
+            durable=True,
+            callback=self._on_exchange_declared,
+        )
+
+    def _on_exchange_declared(self, _frame) -> None:
+        self._channel.confirm_delivery(ack_nack_callback=self._on_confirm, callback=self._on_confirm_mode)
+
+    def _on_confirm_mode(self, _frame) -> None:
+        self._delivery_tag = 0
+        self._ready = True
+        self._backoff = INITIAL_BACKOFF_SECONDS
+        logger.info("RabbitMQ publisher connected, exchange %s", self._exchange)
+        self._drain()
+
+    def _on_channel_closed(self, _channel: Channel, reason: Exception) -> None:
+        self._ready = False
+        self._channel = None
+        self._fail_unconfirmed(reason)
+        # Start over on a fresh connection (with backoff)
+        self._close_connection()
+
+    def _close_connection(self) -> None:
+        connection = self._connection
+        if connection is None:
+            return
+        if connection.is_open:
+            connection.close()
+        elif not connection.is_closing:
+            # Still connecting
+            connection.ioloop.stop()
+
+    def _drain(self) -> None:
+        self._drain_scheduled = False
+        while self._ready and len(self._unconfirmed) < self._max_in_flight:
+            try:
+                message = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if not message.future.set_running_or_notify_cancel():
+                continue  # the caller gave up before it was sent
+            self._delivery_tag += 1
+            self._unconfirmed[self._delivery_tag] = message
+            try:
+                self._channel.basic_publish(self._exchange, message.routing_key, message.body, self._properties)
+            except Exception as e:
+                # The channel is closing; _on_channel_closed fails what is unconfirmed
+                logger.warning("basic_publish failed: %s", e)
+                return
+
+    def _on_confirm(self, frame) -> None:
+        method = frame.method
+        acked = isinstance(method, Basic.Ack)
+        if method.multiple:
+            tags = []
+            for tag in self._unconfirmed:
+                if tag > method.delivery_tag:
+                    break
+                tags.append(tag)
+        else:
+            tags = [method.delivery_tag]
+        now = time.perf_counter()
+        for tag in tags:
+            message = self._unconfirmed.pop(tag, None)
+            if message is None:
+                continue
+            if acked:
+                PUBLISH_LATENCY.labels(message.routing_key).observe(now - message.queued_at)
+                message.future.set_result(None)
+            else:
+                PUBLISH_FAILURES.labels(message.routing_key).inc()
+                message.future.set_exception(PublishError("Broker nacked the message"))
+        self._drain()
+
+    def _fail_unconfirmed(self, reason: Exception) -> None:
+        if not self._unconfirmed:
+            return
+        error = PublishError(f"Connection lost before confirm: {reason}")
+        for message in self._unconfirmed.values():
+            PUBLISH_FAILURES.labels(message.routing_key).inc()
+            message.future.set_exception(error)
+        self._unconfirmed.clear()
+
+    def _fail_queued(self) -> None:
+        error = PublishError("Publisher is closed")
+        while True:
+            try:
+                message = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if message.future.set_running_or_notify_cancel():
+                message.future.set_exception(error)
 
 
-# Singleton for dependency injection (sync publisher; use from sync context or run in executor)
+# Singleton for dependency injection
 _publisher: EventPublisher | None = None
 
 
@@ -1,13 +1,17 @@
 """Company Service - FastAPI application."""
 
+import asyncio
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.security import APIKeyHeader
 
 from app.config import get_settings
 from app.events.publisher import get_event_publisher
+from app.metrics import metrics_response
 from app.middleware.api_key import InternalAPIKeyMiddleware
+from app.middleware.metrics import MetricsMiddleware
 from app.routers import companies, wallets
 
 # For Swagger UI "Authorize" — same header the middleware checks
@@ -16,17 +20,10 @@ INTERNAL_API_KEY_HEADER = APIKeyHeader(name="X-Internal-API-Key", auto_error=Fal
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Startup: connect to RabbitMQ and declare exchange so it appears in the UI and publish works."""
-    import asyncio
-    try:
-        await asyncio.to_thread(get_event_publisher().declare_exchange)
-    except Exception as e:
-        import logging
-        logging.getLogger("app.events.publisher").warning(
-            "RabbitMQ exchange declaration failed at startup: %s. Events will not be published.", e
-        )
+    """Startup: start the RabbitMQ publisher (connects in the background and keeps reconnecting)."""
+    get_event_publisher().start()
     yield
-    get_event_publisher().close()
+    await asyncio.to_thread(get_event_publisher().close)
 
 
 def create_app() -> FastAPI:
@@ -40,6 +37,7 @@ def create_app() -> FastAPI:
         redoc_url="/redoc",
         openapi_url="/openapi.json",
         lifespan=lifespan,
+        default_response_class=ORJSONResponse,
         swagger_ui_init_oauth=None,
         swagger_ui_parameters={"persistAuthorization": True},
     )
@@ -70,6 +68,9 @@ def create_app() -> FastAPI:
 
     app.openapi = custom_openapi
     app.add_middleware(InternalAPIKeyMiddleware)
+    if settings.metrics_enabled:
+        # Added last so it is outermost and also times requests rejected by the API key check
+        app.add_middleware(MetricsMiddleware)
     app.include_router(companies.router)
     app.include_router(wallets.router)
 
@@ -77,6 +78,13 @@ def create_app() -> FastAPI:
     async def health():
         return {"status": "ok", "service": settings.service_name}
 
+    if settings.metrics_enabled:
+
+        @app.get("/metrics", include_in_schema=False)
+        async def metrics():
+            """Prometheus metrics (request latency, DB pool, RabbitMQ publish)."""
+            return metrics_response()
+
     return app
 
 
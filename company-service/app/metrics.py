@@ -0,0 +1,40 @@
+"""Prometheus metrics: request latency, DB pool usage and RabbitMQ publish timing."""
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest
+from sqlalchemy.pool import Pool
+from starlette.responses import Response
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time to handle a request, by route and response status",
+    ["method", "route", "status"],
+)
+REQUESTS_IN_FLIGHT = Gauge("http_requests_in_flight", "Requests currently being handled")
+
+DB_POOL_CONNECTIONS = Gauge(
+    "db_pool_connections",
+    "SQLAlchemy pool connections (checked_out, checked_in, overflow beyond pool_size, pool_size)",
+    ["state"],
+)
+
+PUBLISH_LATENCY = Histogram(
+    "rabbitmq_publish_duration_seconds",
+    "Time from queueing an event for RabbitMQ until the broker confirmed it",
+    ["event_type"],
+)
+PUBLISH_PENDING = Gauge("rabbitmq_publish_pending", "Events queued for RabbitMQ or awaiting the broker's confirm")
+PUBLISH_FAILURES = Counter("rabbitmq_publish_failures_total", "Events that failed to publish", ["event_type"])
+
+
+def register_pool_metrics(pool: Pool) -> None:
+    """Read pool counters at scrape time (no per-checkout cost)."""
+    DB_POOL_CONNECTIONS.labels("checked_out").set_function(pool.checkedout)
+    DB_POOL_CONNECTIONS.labels("checked_in").set_function(pool.checkedin)
+    # overflow() is negative until pool_size connections have been opened
+    DB_POOL_CONNECTIONS.labels("overflow").set_function(lambda: max(pool.overflow(), 0))
+    DB_POOL_CONNECTIONS.labels("pool_size").set_function(pool.size)
+
+
+def metrics_response() -> Response:
+    """Render all registered metrics in the Prometheus text format."""
+    return Response(content=generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
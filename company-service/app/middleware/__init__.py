@@ -1,5 +1,6 @@
 """Middleware package."""
 
 from app.middleware.api_key import InternalAPIKeyMiddleware
+from app.middleware.metrics import MetricsMiddleware
 
-__all__ = ["InternalAPIKeyMiddleware"]
+__all__ = ["InternalAPIKeyMiddleware", "MetricsMiddleware"]
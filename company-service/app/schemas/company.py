@@ -17,6 +17,7 @@ class CompanyCreateResponse(BaseModel):
 
     model_config = ConfigDict(from_attributes=True)
 
+    id: UUID
     name: str
     account_number: str
     api_key: str
@@ -1,6 +1,7 @@
 """Wallet request/response schemas."""
 
 from datetime import datetime
+from uuid import UUID
 
 from pydantic import BaseModel, ConfigDict, Field
 
@@ -23,6 +24,7 @@ class WalletCreateResponse(BaseModel):
 
     model_config = ConfigDict(from_attributes=True)
 
+    id: UUID
     credential_id: str
     name: str
     business_short_code: str
@@ -1,6 +1,5 @@
 """Company domain service: create, update, list, soft-delete."""
 
-import asyncio
 from datetime import datetime, timezone
 from uuid import UUID
 
@@ -31,9 +30,8 @@ class CompanyService:
         self.mpesa = mpesa_client or MpesaClient()
 
     async def _publish(self, event_type: str, payload: dict) -> None:
-        """Publish event in thread so we don't block async loop."""
-        pub = get_event_publisher()
-        await asyncio.to_thread(pub.publish, event_type, payload)
+        """Publish event and wait for the broker's confirm (failures are logged by the publisher)."""
+        await get_event_publisher().publish(event_type, payload)
 
     async def create(self, data: CompanyCreate) -> CompanyCreateResponse:
         """
@@ -63,6 +61,7 @@ class CompanyService:
         })
 
         return CompanyCreateResponse(
+            id=company.id,
             name=company.name,
             account_number=company.account_number,
             api_key=company.api_key,
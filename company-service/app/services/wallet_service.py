@@ -1,6 +1,5 @@
 """Wallet domain service: create wallet under company."""
 
-import asyncio
 from uuid import UUID
 
 from sqlalchemy import select
@@ -25,9 +24,8 @@ class WalletService:
         self.mpesa = mpesa_client or MpesaClient()
 
     async def _publish(self, event_type: str, payload: dict) -> None:
-        """Publish event in thread so we don't block async loop."""
-        pub = get_event_publisher()
-        await asyncio.to_thread(pub.publish, event_type, payload)
+        """Publish event and wait for the broker's confirm (failures are logged by the publisher)."""
+        await get_event_publisher().publish(event_type, payload)
 
     async def create(self, company_id: UUID, data: WalletCreate) -> WalletCreateResponse | None:
         """
@@ -79,6 +77,7 @@ class WalletService:
         })
 
         return WalletCreateResponse(
+            id=wallet.id,
             credential_id=wallet.credential_id,
             name=wallet.name,
             business_short_code=wallet.business_short_code,
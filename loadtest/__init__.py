@@ -0,0 +1 @@
+"""Load-test harness for the wallet platform (gateway + company/account services)."""
@@ -0,0 +1,40 @@
+"""
+Compare two load-test reports flow by flow.
+
+    python -m loadtest.compare baseline.json candidate.json
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+
+def _change(old: float | None, new: float | None) -> str:
+    if not old or new is None:
+        return "-"
+    return f"{(new - old) / old:+.1%}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    args = parser.parse_args()
+    base = json.loads(Path(args.baseline).read_text())["flows"]
+    cand = json.loads(Path(args.candidate).read_text())["flows"]
+
+    print(f"{'flow':<16} {'rps':>18} {'p50 ms':>18} {'p99 ms':>18} {'error rate':>20}")
+    for name in [n for n in base if n in cand]:
+        b, c = base[name], cand[name]
+        bl, cl = b.get("latency_ms", {}), c.get("latency_ms", {})
+        print(
+            f"{name:<16} "
+            f"{c['rps']:>9} {_change(b['rps'], c['rps']):>8} "
+            f"{cl.get('p50', '-'):>9} {_change(bl.get('p50'), cl.get('p50')):>8} "
+            f"{cl.get('p99', '-'):>9} {_change(bl.get('p99'), cl.get('p99')):>8} "
+            f"{b['error_rate']:>9.2%} -> {c['error_rate']:>6.2%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
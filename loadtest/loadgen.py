@@ -0,0 +1,99 @@
+"""Closed-loop asyncio load generator: N workers issue requests back to back and record latency and outcome."""
+
+import asyncio
+import statistics
+import time
+from collections import Counter
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+
+import httpx
+
+
+@dataclass
+class FlowResult:
+    name: str
+    latencies: list[float] = field(default_factory=list)
+    status_codes: Counter = field(default_factory=Counter)
+    errors: int = 0
+    elapsed: float = 0.0
+
+    def summary(self) -> dict:
+        requests = len(self.latencies)
+        out = {
+            "requests": requests,
+            "errors": self.errors,
+            "error_rate": round(self.errors / requests, 4) if requests else 0.0,
+            "rps": round(requests / self.elapsed, 1) if self.elapsed else 0.0,
+            "duration_s": round(self.elapsed, 3),
+            "status_codes": {str(k): v for k, v in sorted(self.status_codes.items(), key=lambda kv: str(kv[0]))},
+        }
+        if requests >= 2:
+            ms = [x * 1000.0 for x in self.latencies]
+            q = statistics.quantiles(ms, n=100, method="inclusive")
+            out["latency_ms"] = {
+                "mean": round(statistics.fmean(ms), 2),
+                "p50": round(q[49], 2),
+                "p95": round(q[94], 2),
+                "p99": round(q[98], 2),
+                "max": round(max(ms), 2),
+            }
+        return out
+
+
+RequestFn = Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]]
+CheckFn = Callable[[httpx.Response], bool]
+
+
+def status_ok(resp: httpx.Response) -> bool:
+    return resp.status_code < 400
+
+
+async def run_flow(
+    client: httpx.AsyncClient,
+    name: str,
+    request: RequestFn,
+    *,
+    concurrency: int,
+    duration: float | None = None,
+    max_requests: int | None = None,
+    ok: CheckFn = status_ok,
+    on_success: Callable[[httpx.Response], None] | None = None,
+) -> FlowResult:
+    """
+    Run one flow until duration seconds pass or max_requests have been issued (whichever comes first).
+    request(client, i) gets a per-flow sequence number so bodies can be unique.
+    """
+    result = FlowResult(name)
+    seq = 0
+    deadline = time.perf_counter() + duration if duration else None
+
+    async def worker() -> None:
+        nonlocal seq
+        while True:
+            if max_requests is not None and seq >= max_requests:
+                return
+            if deadline is not None and time.perf_counter() >= deadline:
+                return
+            i = seq
+            seq += 1
+            started = time.perf_counter()
+            try:
+                resp = await request(client, i)
+            except httpx.HTTPError as e:
+                result.latencies.append(time.perf_counter() - started)
+                result.status_codes[type(e).__name__] += 1
+                result.errors += 1
+                continue
+            result.latencies.append(time.perf_counter() - started)
+            result.status_codes[resp.status_code] += 1
+            if ok(resp):
+                if on_success is not None:
+                    on_success(resp)
+            else:
+                result.errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    result.elapsed = time.perf_counter() - started
+    return result
@@ -0,0 +1,162 @@
+"""
+In-memory stand-ins for the backends, so the gateway can be load tested without Postgres or RabbitMQ.
+
+- backend_app: company-service and account-service APIs (same paths and response shapes) on one app,
+  sharing state so wallets created through /companies are immediately usable by /accounts
+- mpesa_app: the M-PESA endpoints company-service calls (/apps, /paybills), for runs against the real services
+"""
+
+import itertools
+import uuid
+from datetime import datetime, timezone
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+_counter = itertools.count(1)
+_companies: dict[str, dict] = {}
+_wallet_prefixes: dict[str, str] = {}
+_wallet_sequences: dict[str, int] = {}
+_accounts: dict[str, list[dict]] = {}
+_active_account_nos: set[str] = set()
+_trans_ids: set[str] = set()
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+async def create_company(request: Request) -> JSONResponse:
+    body = await request.json()
+    company_id = str(uuid.uuid4())
+    n = next(_counter)
+    company = {
+        "id": company_id,
+        "name": body["name"],
+        "account_number": f"{100 + n % 900}{n:07d}",
+        "api_key": uuid.uuid4().hex,
+        "callback_url": "http://stub/callback",
+        "created_at": _now(),
+    }
+    _companies[company_id] = company
+    return JSONResponse(company)
+
+
+async def list_companies(request: Request) -> JSONResponse:
+    skip = int(request.query_params.get("skip", 0))
+    limit = int(request.query_params.get("limit", 20))
+    items = list(_companies.values())
+    return JSONResponse({"items": items[skip : skip + limit], "total": len(items), "skip": skip, "limit": limit})
+
+
+async def create_wallet(request: Request) -> JSONResponse:
+    company = _companies.get(request.path_params["company_id"])
+    if company is None:
+        return JSONResponse({"detail": "Company not found or inactive"}, status_code=404)
+    body = await request.json()
+    wallet_id = str(uuid.uuid4())
+    _wallet_prefixes[wallet_id] = company["account_number"][:3]
+    _wallet_sequences[wallet_id] = 0
+    now = _now()
+    return JSONResponse({
+        "id": wallet_id,
+        "credential_id": uuid.uuid4().hex,
+        "name": body["name"],
+        "business_short_code": body["business_short_code"],
+        "environment": body["environment"],
+        "created_at": now,
+        "updated_at": now,
+    })
+
+
+async def create_account(request: Request) -> JSONResponse:
+    body = await request.json()
+    wallet_id = body["wallet_id"]
+    if wallet_id not in _wallet_prefixes:
+        return JSONResponse({"detail": f"Wallet {wallet_id} not found in registry."}, status_code=404)
+    seq = _wallet_sequences[wallet_id] = _wallet_sequences[wallet_id] + 1
+    account = {
+        "id": str(uuid.uuid4()),
+        "wallet_id": wallet_id,
+        "fullname": body["fullname"],
+        "account_no": f"{_wallet_prefixes[wallet_id]}-{seq:06d}",
+        "sequence_no": seq,
+        "is_active": True,
+    }
+    _accounts.setdefault(wallet_id, []).append(account)
+    _active_account_nos.add(account["account_no"])
+    return JSONResponse({k: account[k] for k in ("id", "wallet_id", "fullname", "account_no")})
+
+
+async def list_accounts(request: Request) -> JSONResponse:
+    # First page only; the service sends the next cursor in X-Next-Cursor
+    accounts = _accounts.get(request.path_params["wallet_id"], [])
+    limit = request.query_params.get("limit")
+    return JSONResponse(accounts[: int(limit)] if limit else accounts)
+
+
+async def mpesa_callback(request: Request) -> JSONResponse:
+    body = await request.json()
+    trans_id, account_no = body.get("TransID"), body.get("BillRefNumber")
+    if not trans_id or not account_no:
+        return JSONResponse({"ResultCode": 1, "ResultDesc": "Missing TransID or BillRefNumber"})
+    if account_no not in _active_account_nos:
+        return JSONResponse({"ResultCode": 1, "ResultDesc": "Account not found"})
+    if trans_id in _trans_ids:
+        return JSONResponse({"ResultCode": 0, "ResultDesc": "Already processed"})
+    _trans_ids.add(trans_id)
+    return JSONResponse({"ResultCode": 0, "ResultDesc": "Success"})
+
+
+async def health(request: Request) -> JSONResponse:
+    return JSONResponse({"status": "ok", "service": "stub"})
+
+
+backend_app = Starlette(routes=[
+    Route("/health", health),
+    Route("/companies", create_company, methods=["POST"]),
+    Route("/companies", list_companies, methods=["GET"]),
+    Route("/companies/{company_id}/wallets", create_wallet, methods=["POST"]),
+    Route("/accounts", create_account, methods=["POST"]),
+    Route("/wallets/{wallet_id}/accounts", list_accounts, methods=["GET"]),
+    Route("/callbacks/mpesa", mpesa_callback, methods=["POST"]),
+])
+
+
+async def mpesa_create_app(request: Request) -> JSONResponse:
+    body = await request.json()
+    n = next(_counter)
+    return JSONResponse({
+        "name": body["name"],
+        "account_number": f"{100 + n % 900}{n:07d}",
+        "api_key": uuid.uuid4().hex,
+        "callback_url": body.get("callback_url") or "",
+        "created_at": _now(),
+    })
+
+
+async def mpesa_update_app(request: Request) -> JSONResponse:
+    return JSONResponse(await request.json())
+
+
+async def mpesa_create_paybill(request: Request) -> JSONResponse:
+    body = await request.json()
+    now = _now()
+    return JSONResponse({
+        "credential_id": uuid.uuid4().hex,
+        "name": body["name"],
+        "business_short_code": body["business_short_code"],
+        "environment": body["environment"],
+        "created_at": now,
+        "updated_at": now,
+    })
+
+
+mpesa_app = Starlette(routes=[
+    Route("/health", health),
+    Route("/apps", mpesa_create_app, methods=["POST"]),
+    Route("/apps", mpesa_update_app, methods=["PATCH"]),
+    Route("/paybills", mpesa_create_paybill, methods=["POST"]),
+])